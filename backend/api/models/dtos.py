@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -18,12 +18,45 @@ class DocumentStatusResponse(BaseModel):
     job_id: str
     total_files: int
     processed_files: int
+    skipped_files: int = 0
+    updated_files: int = 0
     status: str
     errors: List[str] = []
+    cache_hits: int = 0
+    cache_misses: int = 0
+    files: Dict[str, str] = {}
+    metrics: Dict[str, Any] = {}
+
+
+class DocumentDeletionResponse(BaseModel):
+    deleted: int
+    compaction_scheduled: bool = False
+
+
+class DocumentRebalanceResponse(BaseModel):
+    moved_files: int
+    moved_chunks: int
+
+
+class DocumentStoreStatsResponse(BaseModel):
+    live_rows: int
+    dead_rows: int
+    dead_fraction: float
+    shards: List[dict] = []
+
+
+class DocumentFilters(BaseModel):
+    job_id: Optional[str] = None
+    file_name: Optional[str] = None
+    doc_type: Optional[str] = None
 
 
 class QueryRequest(BaseModel):
     query: str
+    document_filters: Optional[DocumentFilters] = None
+    # next_cursor of the previous page, sent back with the same query.
+    cursor: Optional[str] = None
+    page_size: Optional[int] = Field(None, ge=1)
 
 
 class QueryResponse(BaseModel):
@@ -33,6 +66,8 @@ class QueryResponse(BaseModel):
     document_results: List[dict]
     performance: dict
     sql: Optional[str] = None
+    sql_plan: Optional[dict] = None
+    next_cursor: Optional[str] = None
 
 
 class SchemaResponse(BaseModel):
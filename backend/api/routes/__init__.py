@@ -1 +1 @@
-from . import ingestion, query, schema  # noqa: F401
+from . import ingestion, metrics, query, schema  # noqa: F401
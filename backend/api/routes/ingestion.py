@@ -1,20 +1,29 @@
 from __future__ import annotations
 
+import asyncio
+import shutil
+import uuid
 from pathlib import Path
-from typing import List
+from typing import List, Optional
 
 import aiofiles
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, UploadFile
 
 from api.models.dtos import (
     DatabaseConnectionRequest,
+    DocumentDeletionResponse,
     DocumentIngestionResponse,
+    DocumentRebalanceResponse,
     DocumentStatusResponse,
+    DocumentStoreStatsResponse,
 )
+from api.services.sharded_store import document_store
 from api.services.query_engine import QueryEngine
 
 router = APIRouter(tags=["ingestion"])
 
+UPLOAD_CHUNK_BYTES = 1 << 20
+
 
 @router.post("/connect-database")
 async def connect_database(request: Request, payload: DatabaseConnectionRequest):
@@ -28,6 +37,10 @@ async def connect_database(request: Request, payload: DatabaseConnectionRequest)
         schema_discovery=schema_discovery,
         cache=cache,
         document_processor=document_processor,
+        query_embedder=services["query_embedder"],
+        query_embedding_cache=services["query_embedding_cache"],
+        plan_cache=services["plan_cache"],
+        page_size=services["config"].query.page_size,
     )
     schema = await query_engine.initialize()
     services["query_engine"] = query_engine
@@ -39,41 +52,84 @@ async def connect_database(request: Request, payload: DatabaseConnectionRequest)
 async def upload_documents(
     request: Request,
     files: List[UploadFile],
-    background_tasks: BackgroundTasks,
+    replace_existing: bool = False,
 ):
     if not files:
         raise HTTPException(status_code=400, detail="No files provided")
 
     services = request.app.state.services
     document_processor = services["document_processor"]
-    uploads_dir: Path = request.app.state.uploads_dir
-
-    saved_paths: List[Path] = []
-    for upload in files:
-        destination = uploads_dir / upload.filename
-        async with aiofiles.open(destination, "wb") as out_file:  # type: ignore[name-defined]
-            content = await upload.read()
-            await out_file.write(content)
-        saved_paths.append(destination)
-
-    job_id = await document_processor.process_documents(saved_paths)
-
-    def cleanup_paths(paths: List[Path]) -> None:
-        for path in paths:
-            try:
-                path.unlink(missing_ok=True)
-            except Exception:  # noqa: BLE001
-                pass
-
-    background_tasks.add_task(cleanup_paths, saved_paths)
+    # Each request gets its own directory so equal file names never collide.
+    request_dir: Path = request.app.state.uploads_dir / uuid.uuid4().hex
+    request_dir.mkdir(parents=True)
+    try:
+        saved_paths = await save_uploads(files, request_dir, services["config"].ingestion.max_upload_bytes)
+    except BaseException:
+        shutil.rmtree(request_dir, ignore_errors=True)
+        raise
+
+    # Processing runs after this response is sent, so the job deletes the uploads.
+    job_id = await document_processor.process_documents(
+        saved_paths, delete_files=True, replace_existing=replace_existing
+    )
     return DocumentIngestionResponse(job_id=job_id, status="queued")
 
 
+async def save_uploads(files: List[UploadFile], directory: Path, max_bytes: int) -> List[Path]:
+    """Stream every upload to ``directory`` concurrently in fixed-size chunks.
+
+    Raises 413 once the request's files together exceed ``max_bytes``.
+    """
+    written = 0
+
+    async def save(upload: UploadFile, destination: Path) -> Path:
+        nonlocal written
+        async with aiofiles.open(destination, "wb") as out_file:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_BYTES)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if written > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"Upload exceeds the {max_bytes} byte limit per request",
+                    )
+                await out_file.write(chunk)
+        return destination
+
+    destinations = unique_paths(directory, [upload.filename or "upload" for upload in files])
+    tasks = [asyncio.ensure_future(save(upload, path)) for upload, path in zip(files, destinations)]
+    try:
+        return list(await asyncio.gather(*tasks))
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def unique_paths(directory: Path, file_names: List[str]) -> List[Path]:
+    """One path per name in ``directory``; repeated names become ``report (1).pdf`` and so on."""
+    taken = set()
+    paths = []
+    for file_name in file_names:
+        name = Path(file_name).name or "upload"
+        stem, suffix = Path(name).stem, Path(name).suffix
+        candidate, counter = name, 0
+        while candidate in taken:
+            counter += 1
+            candidate = f"{stem} ({counter}){suffix}"
+        taken.add(candidate)
+        paths.append(directory / candidate)
+    return paths
+
+
 @router.get("/ingestion-status/{job_id}", response_model=DocumentStatusResponse)
 async def get_status(request: Request, job_id: str):
     document_processor = request.app.state.services["document_processor"]
     try:
-        status = document_processor.get_status(job_id)
+        status = await document_processor.get_status(job_id)
     except KeyError as exc:
         raise HTTPException(status_code=404, detail=str(exc)) from exc
     return DocumentStatusResponse(**status)
@@ -82,4 +138,42 @@ async def get_status(request: Request, job_id: str):
 @router.get("/ingestion/jobs")
 async def list_jobs(request: Request):
     document_processor = request.app.state.services["document_processor"]
-    return document_processor.list_jobs()
+    return await document_processor.list_jobs()
+
+
+@router.delete("/documents", response_model=DocumentDeletionResponse)
+async def delete_documents(
+    request: Request,
+    job_id: Optional[str] = None,
+    file_name: Optional[str] = None,
+):
+    try:
+        deleted = await document_store.delete_documents(job_id=job_id, file_name=file_name)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    if deleted:
+        # Cached document answers may cite the removed chunks.
+        request.app.state.services["cache"].clear()
+    return DocumentDeletionResponse(
+        deleted=deleted,
+        compaction_scheduled=document_store.compaction_running,
+    )
+
+
+@router.post("/documents/compact", response_model=DocumentStoreStatsResponse)
+async def compact_documents(background_tasks: BackgroundTasks):
+    background_tasks.add_task(document_store.compact)
+    return DocumentStoreStatsResponse(**document_store.stats())
+
+
+@router.post("/documents/rebalance", response_model=DocumentRebalanceResponse)
+async def rebalance_documents():
+    """Move chunks to the shard they route to after the shard count or partitioning changed."""
+    if document_store.compaction_running:
+        raise HTTPException(status_code=409, detail="Compaction is running; retry once it finishes")
+    return DocumentRebalanceResponse(**await document_store.rebalance())
+
+
+@router.get("/documents/stats", response_model=DocumentStoreStatsResponse)
+async def document_store_stats():
+    return DocumentStoreStatsResponse(**document_store.stats())
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from api.utils.metrics import metrics
+
+router = APIRouter(tags=["metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics")
+async def get_metrics(format: str = "prometheus"):
+    """Prometheus text exposition by default; ``?format=json`` for a JSON snapshot."""
+    if format == "json":
+        return metrics.snapshot()
+    return PlainTextResponse(metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
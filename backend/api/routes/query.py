@@ -1,9 +1,11 @@
 from __future__ import annotations
 
+import json
 import time
-from typing import List
+from typing import AsyncIterator, List
 
 from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
 
 from api.models.dtos import QueryRequest, QueryResponse
 
@@ -17,7 +19,16 @@ async def process_query(request: Request, payload: QueryRequest):
     if query_engine is None:
         raise HTTPException(status_code=400, detail="Database connection not initialized")
 
-    response = await query_engine.process_query(payload.query)
+    filters = payload.document_filters.dict() if payload.document_filters else None
+    page_size = payload.page_size
+    if page_size is not None:
+        page_size = min(page_size, services["config"].query.max_page_size)
+    try:
+        response = await query_engine.process_query(
+            payload.query, document_filters=filters, cursor=payload.cursor, page_size=page_size
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
 
     history_entry = {
         "query": payload.query,
@@ -31,6 +42,22 @@ async def process_query(request: Request, payload: QueryRequest):
     return QueryResponse(**response)
 
 
+@router.post("/query/stream")
+async def stream_query(request: Request, payload: QueryRequest):
+    """NDJSON: a plan line, one line per SQL row as it is read, document lines, an end line."""
+    query_engine = request.app.state.services.get("query_engine")
+    if query_engine is None:
+        raise HTTPException(status_code=400, detail="Database connection not initialized")
+
+    filters = payload.document_filters.dict() if payload.document_filters else None
+
+    async def lines() -> AsyncIterator[str]:
+        async for event in query_engine.stream_query(payload.query, document_filters=filters):
+            yield json.dumps(event, default=str) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
 @router.get("/query/history")
 async def get_history(request: Request) -> List[dict]:
     return request.app.state.services["query_history"]
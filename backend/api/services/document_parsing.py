@@ -0,0 +1,274 @@
+"""File parsing and chunking, kept free of model imports.
+
+Functions here run inside the ingestion process pool, so importing this
+module must stay cheap (no torch / sentence-transformers).
+"""
+
+from __future__ import annotations
+
+import csv
+import hashlib
+import io
+import time
+from dataclasses import dataclass
+from itertools import chain, islice
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from PyPDF2 import PdfReader
+
+SUPPORTED_TYPES = {".pdf", ".docx", ".txt", ".csv"}
+# Longer runs without a blank line are cut at a line break so streamed
+# extraction never buffers more than this much unfinished paragraph.
+MAX_PARAGRAPH_CHARS = 8_000
+
+
+@dataclass(frozen=True)
+class ParseOptions:
+    csv_rows_per_chunk: int = 50
+    # e.g. "{name} ({title}) earns {salary}"; rendered per row instead of raw CSV.
+    csv_row_template: Optional[str] = None
+
+
+@dataclass
+class ParsedFile:
+    path: Path
+    doc_type: str
+    chunks: List[str]
+    size_bytes: int = 0
+    parse_seconds: float = 0.0
+
+
+def parse_file(file_path: Path, options: ParseOptions = ParseOptions()) -> ParsedFile:
+    """Read and chunk one file; the unit of work shipped to parse workers."""
+    start = time.perf_counter()
+    parsed = _parse(file_path, options)
+    parsed.size_bytes = file_path.stat().st_size
+    parsed.parse_seconds = time.perf_counter() - start
+    return parsed
+
+
+def _parse(file_path: Path, options: ParseOptions) -> ParsedFile:
+    suffix = file_path.suffix.lower()
+    # PDFs and text files are streamed; no full-document string is built.
+    if suffix == ".pdf":
+        chunks = list(chunk_stream(iter_pdf_text(file_path), "pdf"))
+        return ParsedFile(path=file_path, doc_type="pdf", chunks=chunks)
+    if suffix == ".txt":
+        chunks = list(chunk_stream(iter_text_file(file_path), "txt"))
+        return ParsedFile(path=file_path, doc_type="txt", chunks=chunks)
+    if suffix == ".csv":
+        chunks = list(iter_csv_chunks(file_path, options.csv_rows_per_chunk, options.csv_row_template))
+        return ParsedFile(path=file_path, doc_type="csv", chunks=chunks)
+    content, doc_type = read_document(file_path)
+    return ParsedFile(path=file_path, doc_type=doc_type, chunks=dynamic_chunking(content, doc_type, options))
+
+
+def content_hash(file_path: Path, block_size: int = 1 << 20) -> str:
+    """SHA-256 of the file bytes, read in blocks."""
+    digest = hashlib.sha256()
+    with file_path.open("rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def read_document(file_path: Path) -> Tuple[str, str]:
+    suffix = file_path.suffix.lower()
+    if suffix not in SUPPORTED_TYPES:
+        raise ValueError(f"Unsupported file type: {suffix}")
+
+    if suffix == ".pdf":
+        return read_pdf(file_path), "pdf"
+    if suffix == ".docx":
+        return read_docx(file_path), "docx"
+    doc_type = "csv" if suffix == ".csv" else "txt"
+    return file_path.read_text(encoding="utf-8", errors="ignore"), doc_type
+
+
+def read_pdf(file_path: Path) -> str:
+    return "".join(iter_pdf_text(file_path))
+
+
+def iter_pdf_text(file_path: Path) -> Iterator[str]:
+    """Extracted text one page at a time, newline-separated like :func:`read_pdf`."""
+    reader = PdfReader(str(file_path))
+    for number, page in enumerate(reader.pages):
+        text = page.extract_text() or ""
+        yield text if number == 0 else "\n" + text
+
+
+def iter_text_file(file_path: Path, block_chars: int = 65_536) -> Iterator[str]:
+    with file_path.open("r", encoding="utf-8", errors="ignore") as fh:
+        while True:
+            block = fh.read(block_chars)
+            if not block:
+                return
+            yield block
+
+
+def read_docx(file_path: Path) -> str:
+    import docx  # lazy import
+
+    document = docx.Document(str(file_path))
+    return "\n".join(paragraph.text for paragraph in document.paragraphs)
+
+
+def iter_csv_chunks(
+    file_path: Path,
+    rows_per_chunk: int = 50,
+    row_template: Optional[str] = None,
+) -> Iterator[str]:
+    """Header-prefixed batches of ``rows_per_chunk`` rows, read one row at a time.
+
+    With ``row_template`` each row is rendered through ``str.format_map`` on
+    its column values instead, which usually embeds more compactly than raw
+    CSV; the header line is then omitted.
+    """
+    with file_path.open("r", encoding="utf-8", errors="ignore", newline="") as fh:
+        yield from _csv_chunks(fh, rows_per_chunk, row_template)
+
+
+def _csv_chunks(lines: Iterable[str], rows_per_chunk: int, row_template: Optional[str]) -> Iterator[str]:
+    reader = csv.reader(lines)
+    header = next(reader, None)
+    if not header:
+        return
+    header_line = _csv_line(header)
+    batch: List[str] = []
+    for row in reader:
+        if not any(field.strip() for field in row):
+            continue
+        batch.append(_render_row(header, row, row_template) if row_template else _csv_line(row))
+        if len(batch) >= rows_per_chunk:
+            yield "\n".join(batch if row_template else [header_line, *batch])
+            batch = []
+    if batch:
+        yield "\n".join(batch if row_template else [header_line, *batch])
+
+
+def _csv_line(fields: Sequence[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="").writerow(fields)
+    return buffer.getvalue()
+
+
+def _render_row(header: Sequence[str], row: Sequence[str], template: str) -> str:
+    values = {column: row[i] if i < len(row) else "" for i, column in enumerate(header)}
+    try:
+        return template.format_map(values)
+    except (KeyError, IndexError) as exc:
+        raise ValueError(f"CSV row template references unknown column {exc}") from exc
+
+
+def dynamic_chunking(content: str, doc_type: str, options: ParseOptions = ParseOptions()) -> List[str]:
+    content = content.strip()
+    if not content:
+        return []
+
+    if doc_type == "csv":
+        stream = io.StringIO(content, newline="")
+        return list(_csv_chunks(stream, options.csv_rows_per_chunk, options.csv_row_template))
+
+    return list(chunk_stream([content], doc_type))
+
+
+def chunk_stream(texts: Iterable[str], doc_type: str) -> Iterator[str]:
+    """Chunk text arriving in pieces, yielding each chunk once it is complete.
+
+    Only the current partial paragraph and chunk are held in memory; the
+    chunking strategy is picked from the first three paragraphs, exactly as
+    :func:`dynamic_chunking` does for a whole document.
+    """
+    paragraphs = iter_paragraphs(texts)
+    head = list(islice(paragraphs, 3))
+    stream = chain(head, paragraphs)
+
+    if _looks_like_resume(head):
+        return _chunk_resume(stream)
+    if _looks_like_contract(head):
+        return _chunk_contract(stream)
+    return _chunk_paragraphs(stream)
+
+
+def iter_paragraphs(texts: Iterable[str], max_chars: int = MAX_PARAGRAPH_CHARS) -> Iterator[str]:
+    """Blank-line separated paragraphs of the concatenated ``texts``, stripped."""
+    buffer = ""
+    for text in texts:
+        parts = (buffer + text).split("\n\n")
+        buffer = parts.pop()
+        for part in parts:
+            yield from _split_long(part, max_chars)
+        while len(buffer) > max_chars:
+            cut = _cut_point(buffer, max_chars)
+            paragraph, buffer = buffer[:cut], buffer[cut:]
+            if paragraph.strip():
+                yield paragraph.strip()
+    yield from _split_long(buffer, max_chars)
+
+
+def _split_long(paragraph: str, max_chars: int) -> Iterator[str]:
+    while len(paragraph) > max_chars:
+        cut = _cut_point(paragraph, max_chars)
+        head, paragraph = paragraph[:cut], paragraph[cut:]
+        if head.strip():
+            yield head.strip()
+    if paragraph.strip():
+        yield paragraph.strip()
+
+
+def _cut_point(text: str, max_chars: int) -> int:
+    cut = text.rfind("\n", 0, max_chars)
+    return cut if cut > 0 else max_chars
+
+
+def _looks_like_resume(paragraphs: Sequence[str]) -> bool:
+    resume_keywords = {"experience", "education", "skills", "summary"}
+    text_sample = " ".join(paragraphs[:3]).lower()
+    return any(keyword in text_sample for keyword in resume_keywords)
+
+
+def _looks_like_contract(paragraphs: Sequence[str]) -> bool:
+    contract_keywords = {"agreement", "clause", "party", "terms"}
+    text_sample = " ".join(paragraphs[:3]).lower()
+    return any(keyword in text_sample for keyword in contract_keywords)
+
+
+def _chunk_resume(paragraphs: Iterable[str]) -> Iterator[str]:
+    current_chunk: List[str] = []
+    for paragraph in paragraphs:
+        lines = [line.strip() for line in paragraph.splitlines() if line.strip()]
+        heading = lines[0] if lines else ""
+        if heading.isupper() and len(heading.split()) <= 6:
+            if current_chunk:
+                yield "\n".join(current_chunk)
+                current_chunk = []
+        current_chunk.append("\n".join(lines))
+    if current_chunk:
+        yield "\n".join(current_chunk)
+
+
+def _chunk_contract(paragraphs: Iterable[str]) -> Iterator[str]:
+    current_chunk: List[str] = []
+    for paragraph in paragraphs:
+        if paragraph.lower().startswith("clause") and current_chunk:
+            yield "\n".join(current_chunk)
+            current_chunk = []
+        current_chunk.append(paragraph)
+    if current_chunk:
+        yield "\n".join(current_chunk)
+
+
+def _chunk_paragraphs(paragraphs: Iterable[str], target_words: int = 180) -> Iterator[str]:
+    current: List[str] = []
+    word_count = 0
+    for paragraph in paragraphs:
+        words = paragraph.split()
+        if word_count + len(words) > target_words and current:
+            yield "\n".join(current)
+            current = []
+            word_count = 0
+        current.append(paragraph)
+        word_count += len(words)
+    if current:
+        yield "\n".join(current)
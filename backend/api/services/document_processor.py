@@ -1,25 +1,62 @@
 from __future__ import annotations
 
 import asyncio
-import csv
-import io
+import contextlib
 import logging
-import mimetypes
+import multiprocessing
+import time
 import uuid
+from concurrent.futures import Executor, ProcessPoolExecutor
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Dict, List, Sequence
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-import aiofiles
-import pandas as pd
-from PyPDF2 import PdfReader
 from sentence_transformers import SentenceTransformer
 
-from .document_store import DocumentChunk, document_store
+from api.utils.metrics import metrics
+
+from .document_parsing import ParsedFile, ParseOptions, content_hash, dynamic_chunking, parse_file
+from .document_store import DocumentChunk
+from .embedding_cache import EmbeddingCache, embedding_cache
+from .embedding_executor import INGESTION, EmbeddingExecutor, embedding_executor
+from .job_registry import FINISHED_FILE_STATES, JobRecord, JobRegistry, job_registry
+from .sharded_store import ShardedDocumentStore, document_store
 
 logger = logging.getLogger(__name__)
 
-SUPPORTED_TYPES = {".pdf", ".docx", ".txt", ".csv"}
+# Parsed files / embedded files buffered between pipeline stages.
+PIPELINE_QUEUE_SIZE = 8
+
+STAGE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+PARSE_SECONDS = metrics.histogram("ingestion_parse_seconds", "Time to read and chunk one file", STAGE_BUCKETS)
+EMBED_SECONDS = metrics.histogram(
+    "ingestion_embed_batch_seconds", "Time to embed one ingestion batch, cache lookups included", STAGE_BUCKETS
+)
+STORE_SECONDS = metrics.histogram(
+    "ingestion_store_seconds", "Time to write one file's chunks to the document store", STAGE_BUCKETS
+)
+FILES_TOTAL = metrics.counter("ingestion_files_total", "Files stored by ingestion jobs")
+CHUNKS_TOTAL = metrics.counter("ingestion_chunks_total", "Chunks stored by ingestion jobs")
+BYTES_TOTAL = metrics.counter("ingestion_bytes_total", "Bytes of source files stored by ingestion jobs")
+
+
+@dataclass
+class FileMetrics:
+    size_bytes: int = 0
+    chunks: int = 0
+    parse_seconds: float = 0.0
+    # Share of each embedding batch's wall time, by the file's chunks in it.
+    embed_seconds: float = 0.0
+    store_seconds: float = 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "size_bytes": self.size_bytes,
+            "chunks": self.chunks,
+            "parse_seconds": round(self.parse_seconds, 4),
+            "embed_seconds": round(self.embed_seconds, 4),
+            "store_seconds": round(self.store_seconds, 4),
+        }
 
 
 @dataclass
@@ -29,16 +66,97 @@ class IngestionStatus:
     processed_files: int = 0
     status: str = "pending"
     errors: List[str] = field(default_factory=list)
+    cache_hits: int = 0
+    cache_misses: int = 0
+    files: Dict[str, str] = field(default_factory=dict)
+    # Uploaded copies owned by the job, removed once each file is done.
+    delete_files: bool = False
+    # Let files supersede same-named copies ingested by other jobs.
+    replace_existing: bool = False
+    # File name -> content hash, and the older jobs whose copy it replaces.
+    content_hashes: Dict[str, str] = field(default_factory=dict)
+    replaces: Dict[str, List[str]] = field(default_factory=dict)
+    # Timings of files parsed by this process; not kept in the job registry.
+    file_metrics: Dict[str, FileMetrics] = field(default_factory=dict)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @classmethod
+    def from_record(cls, record: JobRecord) -> "IngestionStatus":
+        return cls(
+            job_id=record.job_id,
+            total_files=record.total_files,
+            processed_files=sum(state in FINISHED_FILE_STATES for state in record.files.values()),
+            status=record.status,
+            errors=list(record.errors),
+            cache_hits=record.cache_hits,
+            cache_misses=record.cache_misses,
+            files={Path(path).name: state for path, state in record.files.items()},
+            delete_files=record.delete_files,
+            replace_existing=record.replace_existing,
+        )
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ("completed", "completed_with_errors", "failed")
+
+    @property
+    def skipped_files(self) -> int:
+        return sum(state == "skipped" for state in self.files.values())
+
+    @property
+    def updated_files(self) -> int:
+        return sum(state == "updated" for state in self.files.values())
 
     def to_dict(self) -> Dict[str, object]:
         return {
             "job_id": self.job_id,
             "total_files": self.total_files,
             "processed_files": self.processed_files,
+            "skipped_files": self.skipped_files,
+            "updated_files": self.updated_files,
             "status": self.status,
             "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "cache_misses": self.cache_misses,
+            "files": dict(self.files),
+            "metrics": self.metrics(),
         }
 
+    def metrics(self) -> Dict[str, object]:
+        """Wall time per stage, volume and throughput of this job so far."""
+        files = self.file_metrics.values()
+        chunks = sum(item.chunks for item in files)
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.perf_counter()) - self.started_at
+        return {
+            "elapsed_seconds": round(elapsed, 3),
+            "bytes_processed": sum(item.size_bytes for item in files),
+            "chunks": chunks,
+            "chunks_per_second": round(chunks / elapsed, 2) if elapsed > 0 else 0.0,
+            "stage_seconds": {
+                "parse": round(sum(item.parse_seconds for item in files), 4),
+                "embed": round(sum(item.embed_seconds for item in files), 4),
+                "store": round(sum(item.store_seconds for item in files), 4),
+            },
+            "files": {name: item.to_dict() for name, item in self.file_metrics.items()},
+        }
+
+
+@dataclass(eq=False)
+class _PendingFile:
+    """A parsed file waiting for all of its chunk embeddings."""
+
+    parsed: ParsedFile
+    embeddings: List[Optional[List[float]]] = field(init=False)
+    remaining: int = field(init=False)
+    failed: bool = False
+
+    def __post_init__(self) -> None:
+        self.embeddings = [None] * len(self.parsed.chunks)
+        self.remaining = len(self.parsed.chunks)
+
 
 @dataclass
 class DocumentProcessor:
@@ -46,6 +164,16 @@ class DocumentProcessor:
     batch_size: int
     _embedding_model: SentenceTransformer | None = None
     jobs: Dict[str, IngestionStatus] = field(default_factory=dict)
+    embedding_cache: EmbeddingCache | None = field(default_factory=lambda: embedding_cache)
+    document_store: ShardedDocumentStore = field(default_factory=lambda: document_store)
+    # Worker processes for parsing/chunking; 0 parses on threads in-process.
+    parse_workers: int = 0
+    parse_options: ParseOptions = field(default_factory=ParseOptions)
+    registry: JobRegistry | None = field(default_factory=lambda: job_registry)
+    # Finished jobs kept in memory; older ones are served from the registry.
+    max_finished_jobs: int = 100
+    encode_executor: EmbeddingExecutor = field(default_factory=lambda: embedding_executor)
+    _parse_pool: ProcessPoolExecutor | None = None
 
     @property
     def embedding_model(self) -> SentenceTransformer:
@@ -54,185 +182,358 @@ class DocumentProcessor:
             self._embedding_model = SentenceTransformer(self.model_name)
         return self._embedding_model
 
-    async def process_documents(self, file_paths: Sequence[Path]) -> str:
+    async def process_documents(
+        self, file_paths: Sequence[Path], delete_files: bool = False, replace_existing: bool = False
+    ) -> str:
+        """Start an ingestion job; with ``delete_files`` the job removes each file once it is done.
+
+        With ``replace_existing`` a file whose name is already indexed by another
+        job is skipped when its bytes are unchanged and replaces that copy otherwise.
+        """
         job_id = str(uuid.uuid4())
-        status = IngestionStatus(job_id=job_id, total_files=len(file_paths))
+        status = IngestionStatus(
+            job_id=job_id,
+            total_files=len(file_paths),
+            delete_files=delete_files,
+            replace_existing=replace_existing,
+        )
         self.jobs[job_id] = status
+        if self.registry is not None:
+            await self.registry.create_job(job_id, list(file_paths), delete_files, replace_existing)
 
         asyncio.create_task(self._process_job(job_id, list(file_paths)))
         return job_id
 
+    async def resume_jobs(self) -> List[str]:
+        """Restart jobs interrupted by a shutdown, skipping files already committed."""
+        if self.registry is None:
+            return []
+        resumed = []
+        for record in await self.registry.unfinished():
+            status = IngestionStatus.from_record(record)
+            self.jobs[record.job_id] = status
+            remaining = []
+            for raw_path, state in record.files.items():
+                if state in FINISHED_FILE_STATES:
+                    continue
+                path = Path(raw_path)
+                # A file may have been stored right before the crash without
+                # its state being recorded; drop those rows before redoing it.
+                await self.document_store.delete_documents(job_id=record.job_id, file_name=path.name)
+                if path.exists():
+                    remaining.append(path)
+                else:
+                    await self._fail_file(status, path, FileNotFoundError("file no longer available"))
+            logger.info("Resuming ingestion job %s with %d files left", record.job_id, len(remaining))
+            asyncio.create_task(self._process_job(record.job_id, remaining))
+            resumed.append(record.job_id)
+        return resumed
+
     async def _process_job(self, job_id: str, files: List[Path]) -> None:
+        """Run the parse -> embed -> store pipeline for one job.
+
+        Stages are connected by bounded queues, so parsing, model inference
+        and SQLite writes overlap and a slow stage applies backpressure to
+        the ones feeding it.
+        """
         status = self.jobs[job_id]
         status.status = "processing"
+        status.started_at = time.perf_counter()
+        status.files.update((path.name, "queued") for path in files)
+        await self._persist(status)
+        files = await self._skip_unchanged(status, files)
+        parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        store_queue: asyncio.Queue = asyncio.Queue(maxsize=PIPELINE_QUEUE_SIZE)
+        stages = [
+            asyncio.ensure_future(self._parse_stage(files, parsed_queue, status)),
+            asyncio.ensure_future(self._embed_stage(parsed_queue, store_queue, status)),
+            asyncio.ensure_future(self._store_stage(job_id, store_queue, status)),
+        ]
         try:
-            for index, file_path in enumerate(files, start=1):
-                try:
-                    content, doc_type = await self._read_file(file_path)
-                    chunks = self.dynamic_chunking(content, doc_type)
-                    embeddings = await self._embed_chunks(chunks)
-                    chunk_records = [
-                        DocumentChunk(
-                            file_name=file_path.name,
-                            chunk_index=i,
-                            content=chunk,
-                            embedding=embeddings[i],
-                            metadata={
-                                "doc_type": doc_type,
-                                "path": str(file_path),
-                                "word_count": len(chunk.split()),
-                            },
-                        )
-                        for i, chunk in enumerate(chunks)
-                    ]
-                    await document_store.add_chunks(job_id, chunk_records)
-                except Exception as exc:  # noqa: BLE001
-                    logger.exception("Failed to process %s", file_path)
-                    status.errors.append(f"{file_path.name}: {exc}")
-                finally:
-                    status.processed_files = index
+            await asyncio.gather(*stages)
             status.status = "completed" if not status.errors else "completed_with_errors"
         except Exception as outer:  # noqa: BLE001
+            for stage in stages:
+                stage.cancel()
             status.status = "failed"
             status.errors.append(str(outer))
             logger.exception("Ingestion job %s failed", job_id)
-
-    async def _read_file(self, file_path: Path) -> tuple[str, str]:
-        suffix = file_path.suffix.lower()
-        if suffix not in SUPPORTED_TYPES:
-            raise ValueError(f"Unsupported file type: {suffix}")
-
-        if suffix == ".pdf":
-            return await asyncio.to_thread(self._read_pdf, file_path), "pdf"
-        if suffix == ".docx":
-            return await asyncio.to_thread(self._read_docx, file_path), "docx"
-        if suffix == ".csv":
-            return await asyncio.to_thread(self._read_csv, file_path), "csv"
-
-        async with aiofiles.open(file_path, "r", encoding="utf-8", errors="ignore") as fh:
-            content = await fh.read()
-        return content, "txt"
-
-    @staticmethod
-    def _read_pdf(file_path: Path) -> str:
-        reader = PdfReader(str(file_path))
-        text = "\n".join(page.extract_text() or "" for page in reader.pages)
-        return text
-
-    @staticmethod
-    def _read_docx(file_path: Path) -> str:
-        import docx  # lazy import
-
-        document = docx.Document(str(file_path))
-        return "\n".join(paragraph.text for paragraph in document.paragraphs)
-
-    @staticmethod
-    def _read_csv(file_path: Path) -> str:
-        df = pd.read_csv(file_path)
-        buffer = io.StringIO()
-        df.to_csv(buffer, index=False)
-        return buffer.getvalue()
+        status.finished_at = time.perf_counter()
+        await self._persist(status)
+        self._evict_finished()
+
+    async def _skip_unchanged(self, status: IngestionStatus, files: List[Path]) -> List[Path]:
+        """Drop files whose bytes are already indexed and note which ones replace an older copy."""
+        changed = []
+        for path in files:
+            try:
+                digest = await asyncio.to_thread(content_hash, path)
+            except OSError:
+                changed.append(path)  # the parse stage reports the error
+                continue
+            versions: List[Tuple[str, Optional[str]]] = []
+            # A bare file name does not identify a source, so other jobs'
+            # copies are only considered when the job opted in.
+            if status.replace_existing:
+                versions = [
+                    (job_id, stored)
+                    for job_id, stored in await self.document_store.file_versions(path.name)
+                    if job_id != status.job_id
+                ]
+            if any(stored == digest for _, stored in versions):
+                logger.info("Skipping unchanged file %s", path.name)
+                await self._finish_file(status, path, "skipped")
+                continue
+            status.content_hashes[path.name] = digest
+            if versions:
+                status.replaces[path.name] = [job_id for job_id, _ in versions]
+            changed.append(path)
+        return changed
+
+    async def _commit_file(self, job_id: str, status: IngestionStatus, file_path: Path) -> str:
+        """Record the stored file's hash and drop the copies it supersedes."""
+        name = file_path.name
+        if name in status.content_hashes:
+            await self.document_store.record_file(job_id, name, status.content_hashes[name])
+        replaced = status.replaces.get(name, [])
+        for old_job in replaced:
+            await self.document_store.delete_documents(job_id=old_job, file_name=name)
+        return "updated" if replaced else "completed"
+
+    async def _persist(self, status: IngestionStatus) -> None:
+        if self.registry is not None:
+            await self.registry.update_job(
+                status.job_id, status.status, status.errors, status.cache_hits, status.cache_misses
+            )
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, status in self.jobs.items() if status.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished_jobs)]:
+            del self.jobs[job_id]
+
+    async def _parse_stage(
+        self,
+        files: Sequence[Path],
+        parsed_queue: asyncio.Queue,
+        status: IngestionStatus,
+    ) -> None:
+        async for file_path, parsed, error in self._parse_files(files):
+            if error is not None:
+                await self._fail_file(status, file_path, error)
+                continue
+            status.files[file_path.name] = "embedding"
+            status.file_metrics[file_path.name] = FileMetrics(
+                size_bytes=parsed.size_bytes, chunks=len(parsed.chunks), parse_seconds=parsed.parse_seconds
+            )
+            PARSE_SECONDS.observe(parsed.parse_seconds)
+            await parsed_queue.put(_PendingFile(parsed))
+        await parsed_queue.put(None)
+
+    async def _embed_stage(
+        self,
+        parsed_queue: asyncio.Queue,
+        store_queue: asyncio.Queue,
+        status: IngestionStatus,
+    ) -> None:
+        """Embed chunks in full ``batch_size`` batches that may span several files."""
+        batch: List[Tuple[_PendingFile, int]] = []
+        while True:
+            pending = await parsed_queue.get()
+            if pending is None:
+                break
+            if not pending.parsed.chunks:
+                await store_queue.put(pending)
+                continue
+            batch.extend((pending, index) for index in range(len(pending.parsed.chunks)))
+            while len(batch) >= self.batch_size:
+                current, batch = batch[: self.batch_size], batch[self.batch_size :]
+                await self._embed_batch(current, store_queue, status)
+        if batch:
+            await self._embed_batch(batch, store_queue, status)
+        await store_queue.put(None)
+
+    async def _embed_batch(
+        self,
+        batch: List[Tuple["_PendingFile", int]],
+        store_queue: asyncio.Queue,
+        status: IngestionStatus,
+    ) -> None:
+        texts = [pending.parsed.chunks[index] for pending, index in batch]
+        start = time.perf_counter()
+        try:
+            embeddings = await self._embed_with_cache(texts, status)
+        except Exception as exc:  # noqa: BLE001
+            for pending in dict.fromkeys(pending for pending, _ in batch):
+                await self._fail_file(status, pending.parsed.path, exc, pending)
+            return
+        elapsed = time.perf_counter() - start
+        EMBED_SECONDS.observe(elapsed)
+        for pending, _ in batch:
+            file_metrics = status.file_metrics.get(pending.parsed.path.name)
+            if file_metrics is not None:
+                file_metrics.embed_seconds += elapsed / len(batch)
+        for (pending, index), embedding in zip(batch, embeddings):
+            pending.embeddings[index] = embedding
+            pending.remaining -= 1
+            if pending.remaining == 0 and not pending.failed:
+                await store_queue.put(pending)
+
+    async def _store_stage(self, job_id: str, store_queue: asyncio.Queue, status: IngestionStatus) -> None:
+        while True:
+            pending = await store_queue.get()
+            if pending is None:
+                break
+            parsed = pending.parsed
+            status.files[parsed.path.name] = "storing"
+            chunk_records = [
+                DocumentChunk(
+                    file_name=parsed.path.name,
+                    chunk_index=i,
+                    content=chunk,
+                    embedding=pending.embeddings[i],
+                    metadata={
+                        "doc_type": parsed.doc_type,
+                        "path": str(parsed.path),
+                        "word_count": len(chunk.split()),
+                    },
+                )
+                for i, chunk in enumerate(parsed.chunks)
+            ]
+            start = time.perf_counter()
+            try:
+                await self.document_store.add_chunks(job_id, chunk_records)
+                state = await self._commit_file(job_id, status, parsed.path)
+            except Exception as exc:  # noqa: BLE001
+                await self._fail_file(status, parsed.path, exc, pending)
+                continue
+            elapsed = time.perf_counter() - start
+            STORE_SECONDS.observe(elapsed)
+            file_metrics = status.file_metrics.get(parsed.path.name)
+            if file_metrics is not None:
+                file_metrics.store_seconds = elapsed
+            FILES_TOTAL.inc()
+            CHUNKS_TOTAL.inc(len(chunk_records))
+            BYTES_TOTAL.inc(parsed.size_bytes)
+            await self._finish_file(status, parsed.path, state)
+
+    async def _fail_file(
+        self,
+        status: IngestionStatus,
+        file_path: Path,
+        exc: BaseException,
+        pending: Optional["_PendingFile"] = None,
+    ) -> None:
+        if pending is not None:
+            if pending.failed:
+                return
+            pending.failed = True
+        logger.error("Failed to process %s", file_path, exc_info=exc)
+        status.errors.append(f"{file_path.name}: {exc}")
+        await self._finish_file(status, file_path, "failed")
+
+    async def _finish_file(self, status: IngestionStatus, file_path: Path, state: str) -> None:
+        status.files[file_path.name] = state
+        status.processed_files += 1
+        if self.registry is not None:
+            await self.registry.set_file_state(status.job_id, file_path, state)
+        # Kept until now so an interrupted job can pick the file up again.
+        if status.delete_files:
+            file_path.unlink(missing_ok=True)
+            with contextlib.suppress(OSError):
+                file_path.parent.rmdir()  # the upload's own directory, once empty
+
+    async def _parse_files(
+        self, files: Sequence[Path]
+    ) -> AsyncIterator[Tuple[Path, Optional[ParsedFile], Optional[Exception]]]:
+        """Parse and chunk ``files`` concurrently, yielding each as it finishes.
+
+        At most twice the worker count is in flight, so parsed files never
+        pile up far ahead of the embedding stage.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._parse_executor()
+        window = max(1, 2 * (self.parse_workers or 1))
+
+        async def parse(path: Path) -> Tuple[Path, Optional[ParsedFile], Optional[Exception]]:
+            try:
+                return path, await loop.run_in_executor(executor, parse_file, path, self.parse_options), None
+            except Exception as exc:  # noqa: BLE001
+                return path, None, exc
+
+        remaining = list(files)
+        pending: set = set()
+        while remaining or pending:
+            while remaining and len(pending) < window:
+                pending.add(asyncio.ensure_future(parse(remaining.pop(0))))
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+    def _parse_executor(self) -> Optional[Executor]:
+        if self.parse_workers <= 0:
+            return None
+        if self._parse_pool is None:
+            # Spawned workers only import the parsing module, not the model stack.
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=self.parse_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._parse_pool
+
+    def close(self) -> None:
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(wait=False, cancel_futures=True)
+            self._parse_pool = None
+
+    async def _embed_with_cache(self, chunks: Sequence[str], status: IngestionStatus) -> List[List[float]]:
+        """Embed ``chunks``, encoding only those missing from the embedding cache."""
+        if self.embedding_cache is None:
+            status.cache_misses += len(chunks)
+            return await self._embed_chunks(chunks)
+
+        cached = await self.embedding_cache.lookup(self.model_name, chunks)
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        status.cache_hits += len(chunks) - len(missing)
+        status.cache_misses += len(missing)
+
+        embeddings: List[List[float]] = [
+            vector.tolist() if vector is not None else [] for vector in cached
+        ]
+        if missing:
+            texts = [chunks[i] for i in missing]
+            encoded = await self._embed_chunks(texts)
+            await self.embedding_cache.store(self.model_name, texts, encoded)
+            for i, vector in zip(missing, encoded):
+                embeddings[i] = vector
+        return embeddings
 
     async def _embed_chunks(self, chunks: Sequence[str]) -> List[List[float]]:
-        loop = asyncio.get_event_loop()
-        embeddings = await loop.run_in_executor(
-            None,
+        embeddings = await self.encode_executor.run(
             lambda: self.embedding_model.encode(
                 list(chunks),
                 batch_size=self.batch_size,
                 convert_to_numpy=True,
                 show_progress_bar=False,
             ),
+            priority=INGESTION,
         )
         return embeddings.tolist()
 
-    def dynamic_chunking(self, content: str, doc_type: str) -> List[str]:
-        content = content.strip()
-        if not content:
-            return []
-
-        if doc_type == "csv":
-            rows = content.splitlines()
-            header, entries = rows[0], rows[1:]
-            chunks = []
-            batch_size = 50
-            for i in range(0, len(entries), batch_size):
-                batch = entries[i : i + batch_size]
-                csv_content = "\n".join([header] + batch)
-                chunks.append(csv_content)
-            return chunks
-
-        paragraphs = [p.strip() for p in content.split("\n\n") if p.strip()]
-
-        if self._looks_like_resume(paragraphs):
-            return self._chunk_resume(paragraphs)
-        if self._looks_like_contract(paragraphs):
-            return self._chunk_contract(paragraphs)
-
-        return self._chunk_paragraphs(paragraphs)
-
     @staticmethod
-    def _looks_like_resume(paragraphs: Sequence[str]) -> bool:
-        resume_keywords = {"experience", "education", "skills", "summary"}
-        text_sample = " ".join(paragraphs[:3]).lower()
-        return any(keyword in text_sample for keyword in resume_keywords)
-
-    @staticmethod
-    def _looks_like_contract(paragraphs: Sequence[str]) -> bool:
-        contract_keywords = {"agreement", "clause", "party", "terms"}
-        text_sample = " ".join(paragraphs[:3]).lower()
-        return any(keyword in text_sample for keyword in contract_keywords)
-
-    @staticmethod
-    def _chunk_resume(paragraphs: Sequence[str]) -> List[str]:
-        chunks: List[str] = []
-        current_chunk: List[str] = []
-        for paragraph in paragraphs:
-            lines = [line.strip() for line in paragraph.splitlines() if line.strip()]
-            heading = lines[0] if lines else ""
-            if heading.isupper() and len(heading.split()) <= 6:
-                if current_chunk:
-                    chunks.append("\n".join(current_chunk))
-                    current_chunk = []
-            current_chunk.append("\n".join(lines))
-        if current_chunk:
-            chunks.append("\n".join(current_chunk))
-        return chunks
-
-    @staticmethod
-    def _chunk_contract(paragraphs: Sequence[str]) -> List[str]:
-        chunks: List[str] = []
-        current_chunk: List[str] = []
-        for paragraph in paragraphs:
-            if paragraph.lower().startswith("clause") and current_chunk:
-                chunks.append("\n".join(current_chunk))
-                current_chunk = []
-            current_chunk.append(paragraph)
-        if current_chunk:
-            chunks.append("\n".join(current_chunk))
-        return chunks
-
-    @staticmethod
-    def _chunk_paragraphs(paragraphs: Sequence[str], target_words: int = 180) -> List[str]:
-        chunks: List[str] = []
-        current: List[str] = []
-        word_count = 0
-        for paragraph in paragraphs:
-            words = paragraph.split()
-            if word_count + len(words) > target_words and current:
-                chunks.append("\n".join(current))
-                current = []
-                word_count = 0
-            current.append(paragraph)
-            word_count += len(words)
-        if current:
-            chunks.append("\n".join(current))
-        return chunks
-
-    def get_status(self, job_id: str) -> Dict[str, object]:
-        if job_id not in self.jobs:
+    def dynamic_chunking(content: str, doc_type: str) -> List[str]:
+        return dynamic_chunking(content, doc_type)
+
+    async def get_status(self, job_id: str) -> Dict[str, object]:
+        if job_id in self.jobs:
+            return self.jobs[job_id].to_dict()
+        record = await self.registry.get(job_id) if self.registry is not None else None
+        if record is None:
             raise KeyError(f"Unknown job_id: {job_id}")
-        return self.jobs[job_id].to_dict()
-
-    def list_jobs(self) -> List[Dict[str, object]]:
-        return [status.to_dict() for status in self.jobs.values()]
+        return IngestionStatus.from_record(record).to_dict()
+
+    async def list_jobs(self, limit: int = 100) -> List[Dict[str, object]]:
+        jobs = {job_id: status.to_dict() for job_id, status in self.jobs.items()}
+        if self.registry is not None:
+            for record in await self.registry.recent(limit):
+                jobs.setdefault(record.job_id, IngestionStatus.from_record(record).to_dict())
+        return list(jobs.values())
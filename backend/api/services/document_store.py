@@ -2,17 +2,32 @@ from __future__ import annotations
 
 import asyncio
 import json
+import logging
+import os
+import re
+import shutil
 import sqlite3
+import threading
+from concurrent.futures import Executor, Future
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Sequence
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import numpy as np
 
-DATA_DIR = Path(__file__).resolve().parents[3] / "data"
+from .embedding_segments import QUANTIZATIONS, EmbeddingSegments
+from .sqlite_connections import SQLiteReaderPool, SQLiteWriter, transaction
+from .vector_index import IVFIndex
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(os.getenv("APP_DATA_DIR") or Path(__file__).resolve().parents[3] / "data")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 DB_PATH = DATA_DIR / "document_index.db"
 
+INDEX_MODES = {"exact", "ivf"}
+FILTER_COLUMNS = ("job_id", "file_name", "doc_type")
+
 
 @dataclass
 class DocumentChunk:
@@ -24,21 +39,104 @@ class DocumentChunk:
 
 
 class DocumentStore:
-    def __init__(self, db_path: Path = DB_PATH) -> None:
+    def __init__(
+        self,
+        db_path: Path = DB_PATH,
+        index_mode: str = "exact",
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        quantization: str = "none",
+        rescore_factor: int = 4,
+        reader_connections: int = 4,
+        scan_batch_rows: int = 8_192,
+        compaction_threshold: float = 0.3,
+        search_executor: Optional[Executor] = None,
+    ) -> None:
         self.db_path = db_path
+        # None means the event loop's default thread pool.
+        self._search_executor = search_executor
+        self.scan_batch_rows = scan_batch_rows
+        self.compaction_threshold = compaction_threshold
         self._init_lock = asyncio.Lock()
         self._initialized = False
+        self._writer = SQLiteWriter(db_path)
+        self._readers = SQLiteReaderPool(db_path, size=reader_connections)
+        self.fts_enabled = False
+        self._matrix_lock = threading.Lock()
+        self._generation = 0
+        self._segments = EmbeddingSegments(self.segments_dir)
+        self._index_lock = threading.Lock()
+        self._ann: Optional[IVFIndex] = None
+        self._nlist: Optional[int] = None
+        self._compaction: Optional[asyncio.Task] = None
+        self.quantization = "none"
+        self.configure(
+            index_mode=index_mode,
+            nlist=nlist,
+            nprobe=nprobe,
+            quantization=quantization,
+            rescore_factor=rescore_factor,
+        )
+
+    @property
+    def segments_dir(self) -> Path:
+        return self._segments_dir_for(self._generation)
+
+    def _segments_dir_for(self, generation: int) -> Path:
+        # Compaction writes each rewrite into a fresh generation directory.
+        base = self.db_path.with_suffix(".segments")
+        return base if generation == 0 else base.with_name(f"{base.name}.{generation}")
+
+    @property
+    def ann_index_path(self) -> Path:
+        return self.db_path.with_suffix(".ivf.npz")
+
+    def configure(
+        self,
+        index_mode: str = "exact",
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        quantization: str = "none",
+        rescore_factor: int = 4,
+    ) -> None:
+        if index_mode not in INDEX_MODES:
+            raise ValueError(f"Unsupported index mode '{index_mode}'. Supported: {sorted(INDEX_MODES)}")
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization '{quantization}'. Supported: {sorted(QUANTIZATIONS)}")
+        self.index_mode = index_mode
+        self.nprobe = nprobe
+        self.rescore_factor = max(1, rescore_factor)
+        self._nlist = nlist
+        with self._index_lock:
+            self._ann = IVFIndex(nlist=nlist) if index_mode == "ivf" else None
+        if self._initialized:
+            if quantization != self.quantization:
+                self._write(lambda conn: self._convert_storage(conn, quantization), grouped=False).result()
+            if self._ann is not None:
+                self._sync_ann_index(load=True)
+        else:
+            self.quantization = quantization
 
     async def initialize(self) -> None:
         async with self._init_lock:
             if self._initialized:
                 return
-            await asyncio.to_thread(self._create_schema)
+            await asyncio.wrap_future(self._write(self._create_schema, grouped=False))
+            await asyncio.wrap_future(self._write(self._load_segments, grouped=False))
+            await asyncio.to_thread(self._sync_ann_index, True)
             self._initialized = True
 
-    def _create_schema(self) -> None:
-        conn = sqlite3.connect(self.db_path)
-        try:
+    def close(self) -> None:
+        self._writer.close()
+        self._readers.close()
+        self._initialized = False
+
+    def _write(self, fn: Callable[[sqlite3.Connection], Any], grouped: bool = True) -> Future:
+        """Run ``fn`` on the writer thread, group-committed with other writes."""
+        return self._writer.submit(fn, grouped=grouped)
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        with transaction(conn):
             conn.execute(
                 """
                 CREATE TABLE IF NOT EXISTS documents (
@@ -48,87 +146,707 @@ class DocumentStore:
                     chunk_index INTEGER,
                     content TEXT,
                     embedding BLOB,
-                    metadata TEXT
+                    metadata TEXT,
+                    segment INTEGER,
+                    row_offset INTEGER,
+                    doc_type TEXT
                 )
                 """
             )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(documents)")}
+            for column, column_type in (("segment", "INTEGER"), ("row_offset", "INTEGER"), ("doc_type", "TEXT")):
+                if column not in columns:
+                    conn.execute(f"ALTER TABLE documents ADD COLUMN {column} {column_type}")
+            if "doc_type" not in columns:
+                conn.execute(
+                    "UPDATE documents SET doc_type = json_extract(metadata, '$.doc_type') WHERE json_valid(metadata)"
+                )
             conn.execute(
                 "CREATE INDEX IF NOT EXISTS idx_documents_job_id ON documents(job_id)"
             )
-            conn.commit()
-        finally:
-            conn.close()
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_file_name ON documents(file_name)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_documents_doc_type ON documents(doc_type)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS store_meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS document_files (
+                    job_id TEXT,
+                    file_name TEXT,
+                    content_hash TEXT,
+                    PRIMARY KEY (job_id, file_name)
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_document_files_file_name ON document_files(file_name)"
+            )
+        self.fts_enabled = self._create_fts(conn)
 
     @staticmethod
-    def _serialize_embedding(embedding: Sequence[float]) -> bytes:
-        array = np.asarray(embedding, dtype=np.float32)
-        return array.tobytes()
+    def _create_fts(conn: sqlite3.Connection) -> bool:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'documents_fts'"
+        ).fetchone()
+        if exists:
+            return True
+        try:
+            with transaction(conn):
+                conn.execute(
+                    """
+                    CREATE VIRTUAL TABLE documents_fts
+                    USING fts5(content, content='documents', content_rowid='id')
+                    """
+                )
+                conn.execute("INSERT INTO documents_fts(documents_fts) VALUES ('rebuild')")
+        except sqlite3.OperationalError as exc:
+            logger.warning("SQLite FTS5 unavailable, keyword search disabled: %s", exc)
+            return False
+        return True
 
     @staticmethod
     def _deserialize_embedding(blob: bytes) -> np.ndarray:
         return np.frombuffer(blob, dtype=np.float32)
 
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (vectors / norms).astype(np.float32, copy=False)
+
+    def _load_segments(self, conn: sqlite3.Connection) -> None:
+        generation = int(self._read_meta(conn, "segments_generation") or 0)
+        if generation != self._generation:
+            with self._matrix_lock:
+                self._generation = generation
+                self._segments = EmbeddingSegments(self.segments_dir, self._segments.segment_rows)
+        self._remove_stale_generations()
+
+        dim = self._read_meta(conn, "dim")
+        if dim is None:
+            first = conn.execute(
+                "SELECT embedding FROM documents WHERE embedding IS NOT NULL LIMIT 1"
+            ).fetchone()
+            if first is None:
+                return
+            with transaction(conn):
+                dim = self._write_meta(conn, "dim", len(first[0]) // 4)
+        dim = int(dim)
+
+        stored_quantization = self._read_meta(conn, "quantization") or "none"
+        if stored_quantization != self.quantization:
+            logger.info(
+                "Converting embedding storage from %s to %s",
+                stored_quantization,
+                self.quantization,
+            )
+
+        locations = {
+            row_id: (segment, offset)
+            for row_id, segment, offset in conn.execute(
+                "SELECT id, segment, row_offset FROM documents WHERE segment IS NOT NULL"
+            )
+        }
+        with self._matrix_lock:
+            self._segments.open(dim, locations, self.quantization)
+        with transaction(conn):
+            self._write_meta(conn, "quantization", self.quantization)
+        self._migrate_blobs(conn, dim)
+
+    def _remove_stale_generations(self) -> None:
+        # Left behind when a compaction was interrupted before or after its switch.
+        base = self._segments_dir_for(0)
+        for path in base.parent.glob(f"{base.name}*"):
+            if path.is_dir() and path != self.segments_dir:
+                logger.info("Removing stale segment directory %s", path)
+                shutil.rmtree(path, ignore_errors=True)
+
+    @staticmethod
+    def _read_meta(conn: sqlite3.Connection, key: str) -> Optional[str]:
+        row = conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @staticmethod
+    def _write_meta(conn: sqlite3.Connection, key: str, value: Any) -> Any:
+        conn.execute("INSERT OR REPLACE INTO store_meta (key, value) VALUES (?, ?)", (key, str(value)))
+        return value
+
+    async def convert_storage(self, quantization: str) -> None:
+        """Re-encode the compact embedding copies in place (``none`` drops them)."""
+        if not self._initialized:
+            await self.initialize()
+        await asyncio.wrap_future(
+            self._write(lambda conn: self._convert_storage(conn, quantization), grouped=False)
+        )
+
+    def _convert_storage(self, conn: sqlite3.Connection, quantization: str) -> None:
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization '{quantization}'. Supported: {sorted(QUANTIZATIONS)}")
+        if self._segments.dim is not None:
+            with self._matrix_lock:
+                self._segments.convert(quantization)
+        with transaction(conn):
+            self._write_meta(conn, "quantization", quantization)
+        self.quantization = quantization
+
+    def _migrate_blobs(self, conn: sqlite3.Connection, dim: int, batch_rows: int = 10_000) -> None:
+        """Move embeddings still stored as per-row BLOBs into segment files."""
+        migrated = 0
+        while True:
+            rows = conn.execute(
+                """
+                SELECT id, embedding FROM documents
+                WHERE segment IS NULL AND embedding IS NOT NULL AND length(embedding) = ?
+                ORDER BY id LIMIT ?
+                """,
+                (dim * 4, batch_rows),
+            ).fetchall()
+            if not rows:
+                break
+            vectors = np.stack([self._deserialize_embedding(blob) for _, blob in rows])
+            with self._matrix_lock:
+                locations = self._segments.append(self._normalize(vectors))
+            ids = [row_id for row_id, _ in rows]
+            with transaction(conn):
+                conn.executemany(
+                    "UPDATE documents SET segment = ?, row_offset = ?, embedding = NULL WHERE id = ?",
+                    [(segment, offset, row_id) for (segment, offset), row_id in zip(locations, ids)],
+                )
+            with self._matrix_lock:
+                self._segments.register(locations, ids)
+            migrated += len(rows)
+
+        skipped = conn.execute(
+            "SELECT COUNT(*) FROM documents WHERE segment IS NULL AND embedding IS NOT NULL"
+        ).fetchone()[0]
+        if migrated:
+            logger.info("Migrated %d embeddings into %s", migrated, self.segments_dir)
+        if skipped:
+            logger.warning("Skipping %d embeddings whose dimension differs from %d", skipped, dim)
+
     async def add_chunks(self, job_id: str, chunks: List[DocumentChunk]) -> None:
         if not self._initialized:
             await self.initialize()
+        if not chunks:
+            return
 
+        vectors = self._normalize(np.asarray([chunk.embedding for chunk in chunks], dtype=np.float32))
         records = [
             (
                 job_id,
                 chunk.file_name,
                 chunk.chunk_index,
                 chunk.content,
-                self._serialize_embedding(chunk.embedding),
                 json.dumps(chunk.metadata),
+                chunk.metadata.get("doc_type"),
             )
             for chunk in chunks
         ]
 
-        await asyncio.to_thread(self._bulk_insert, records)
+        segments, locations, ids = await asyncio.wrap_future(
+            self._write(lambda conn: self._bulk_insert(conn, records, vectors))
+        )
+        # Rows only become searchable once their SQLite mapping is committed.
+        # A compaction that ran in between has already carried them over, so
+        # registering on the superseded segments is harmless.
+        with self._matrix_lock:
+            segments.register(locations, ids)
+        if self._ann is not None:
+            await asyncio.to_thread(self._sync_ann_index)
 
-    def _bulk_insert(self, records: List[Any]) -> None:
-        conn = sqlite3.connect(self.db_path)
-        try:
-            conn.executemany(
+    def _sync_ann_index(self, load: bool = False) -> None:
+        with self._matrix_lock:
+            vectors = self._segments.snapshot()
+        ids = vectors.ids
+        with self._index_lock:
+            ann = self._ann
+            if ann is None:
+                return
+            if load and ann.load(self.ann_index_path, ids, vectors.dim):
+                logger.info("Loaded IVF index covering %d embeddings", ann.size)
+            if ann.sync(vectors):
+                ann.save(self.ann_index_path, ids)
+
+    def _bulk_insert(
+        self,
+        conn: sqlite3.Connection,
+        records: List[Any],
+        vectors: np.ndarray,
+    ) -> Tuple[EmbeddingSegments, List[Tuple[int, int]], List[int]]:
+        dim = self._segments.dim
+        if dim is None:
+            dim = self._write_meta(conn, "dim", vectors.shape[1])
+            self._write_meta(conn, "quantization", self.quantization)
+            with self._matrix_lock:
+                self._segments.open(dim, {}, self.quantization)
+        if vectors.shape[1] != dim:
+            raise ValueError(
+                f"Embedding dimension {vectors.shape[1]} does not match index dimension {dim}"
+            )
+
+        with self._matrix_lock:
+            locations = self._segments.append(vectors)
+        cursor = conn.cursor()
+        ids = []
+        for record, (segment, offset) in zip(records, locations):
+            cursor.execute(
                 """
-                INSERT INTO documents (job_id, file_name, chunk_index, content, embedding, metadata)
-                VALUES (?, ?, ?, ?, ?, ?)
+                INSERT INTO documents (job_id, file_name, chunk_index, content, metadata, doc_type, segment, row_offset)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                records,
+                (*record, segment, offset),
             )
-            conn.commit()
-        finally:
-            conn.close()
+            ids.append(cursor.lastrowid)
+        if self.fts_enabled:
+            cursor.executemany(
+                "INSERT INTO documents_fts (rowid, content) VALUES (?, ?)",
+                [(row_id, record[3]) for row_id, record in zip(ids, records)],
+            )
+        return self._segments, locations, ids
+
+    async def delete_documents(
+        self,
+        job_id: Optional[str] = None,
+        file_name: Optional[str] = None,
+    ) -> int:
+        """Delete every chunk of a job and/or file; returns the number removed.
 
-    async def similarity_search(self, embedding: Sequence[float], top_k: int = 5) -> List[Dict[str, Any]]:
+        Rows disappear from SQLite and FTS immediately while their vectors are
+        only tombstoned. Once the dead fraction passes
+        ``compaction_threshold`` a background compaction reclaims the space.
+        """
+        filters = {
+            column: value
+            for column, value in (("job_id", job_id), ("file_name", file_name))
+            if value is not None
+        }
+        if not filters:
+            raise ValueError("Deleting documents requires a job_id or file_name")
         if not self._initialized:
             await self.initialize()
 
-        rows = await asyncio.to_thread(self._fetch_all)
+        segments, locations, deleted = await asyncio.wrap_future(
+            self._write(lambda conn: self._delete_rows(conn, filters))
+        )
+        with self._matrix_lock:
+            segments.tombstone(locations)
+        if deleted:
+            logger.info("Deleted %d chunks matching %s", deleted, filters)
+        if self.stats()["dead_fraction"] > self.compaction_threshold:
+            self.schedule_compaction()
+        return deleted
+
+    def _delete_rows(
+        self,
+        conn: sqlite3.Connection,
+        filters: Dict[str, str],
+    ) -> Tuple[EmbeddingSegments, List[Tuple[int, int]], int]:
+        clause, params = self._filter_clause(filters)
+        rows = conn.execute(
+            f"SELECT id, content, segment, row_offset FROM documents WHERE 1 = 1{clause}",
+            params,
+        ).fetchall()
+        if self.fts_enabled:
+            conn.executemany(
+                "INSERT INTO documents_fts (documents_fts, rowid, content) VALUES ('delete', ?, ?)",
+                [(row_id, content) for row_id, content, _, _ in rows],
+            )
+        conn.executemany("DELETE FROM documents WHERE id = ?", [(row[0],) for row in rows])
+        conn.execute(f"DELETE FROM document_files WHERE 1 = 1{clause}", params)
+        locations = [(segment, offset) for _, _, segment, offset in rows if segment is not None]
+        return self._segments, locations, len(rows)
+
+    async def record_file(self, job_id: str, file_name: str, content_hash: str) -> None:
+        """Remember the content hash a file was ingested from."""
+        if not self._initialized:
+            await self.initialize()
+        await asyncio.wrap_future(
+            self._write(
+                lambda conn: conn.execute(
+                    "INSERT OR REPLACE INTO document_files (job_id, file_name, content_hash) VALUES (?, ?, ?)",
+                    (job_id, file_name, content_hash),
+                )
+            )
+        )
+
+    async def file_versions(self, file_name: str) -> List[Tuple[str, Optional[str]]]:
+        """``(job_id, content_hash)`` of every stored copy of ``file_name``.
+
+        Copies ingested before hashes were recorded report ``None``.
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        def fetch() -> List[Tuple[str, Optional[str]]]:
+            with self._readers.connection() as conn:
+                rows = conn.execute(
+                    """
+                    SELECT job_id, content_hash FROM document_files WHERE file_name = ?
+                    UNION
+                    SELECT DISTINCT job_id, NULL FROM documents
+                    WHERE file_name = ? AND job_id NOT IN (
+                        SELECT job_id FROM document_files WHERE file_name = ?
+                    )
+                    """,
+                    (file_name, file_name, file_name),
+                ).fetchall()
+                return [(row[0], row[1]) for row in rows]
+
+        return await asyncio.to_thread(fetch)
+
+    async def document_groups(self) -> List[Tuple[str, str]]:
+        """Distinct ``(job_id, file_name)`` pairs held by this store."""
+        if not self._initialized:
+            await self.initialize()
+
+        def fetch() -> List[Tuple[str, str]]:
+            with self._readers.connection() as conn:
+                return [
+                    (row[0], row[1])
+                    for row in conn.execute("SELECT DISTINCT job_id, file_name FROM documents")
+                ]
+
+        return await asyncio.to_thread(fetch)
+
+    async def export_chunks(
+        self,
+        job_id: Optional[str] = None,
+        file_name: Optional[str] = None,
+    ) -> List[Tuple[str, DocumentChunk]]:
+        """Stored chunks with their normalized embeddings, keyed by job id.
+
+        Lets chunks move between stores without re-embedding them.
+        """
+        if not self._initialized:
+            await self.initialize()
+        filters = {
+            column: value
+            for column, value in (("job_id", job_id), ("file_name", file_name))
+            if value is not None
+        }
+        clause, params = self._filter_clause(filters)
+
+        def fetch() -> List[sqlite3.Row]:
+            with self._readers.connection() as conn:
+                return conn.execute(
+                    f"""
+                    SELECT job_id, file_name, chunk_index, content, metadata, segment, row_offset
+                    FROM documents WHERE segment IS NOT NULL{clause} ORDER BY id
+                    """,
+                    params,
+                ).fetchall()
+
+        rows = await asyncio.to_thread(fetch)
         if not rows:
             return []
+        with self._matrix_lock:
+            vectors = self._segments.snapshot()
+        embeddings = vectors[[row["segment"] * vectors.segment_rows + row["row_offset"] for row in rows]]
+        return [
+            (
+                row["job_id"],
+                DocumentChunk(
+                    file_name=row["file_name"],
+                    chunk_index=row["chunk_index"],
+                    content=row["content"],
+                    embedding=embedding,
+                    metadata=json.loads(row["metadata"] or "{}"),
+                ),
+            )
+            for row, embedding in zip(rows, embeddings)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Live and dead (deleted or never committed) rows in embedding storage."""
+        with self._matrix_lock:
+            ids = self._segments.snapshot().ids
+        total = len(ids)
+        live = int(np.count_nonzero(ids >= 0))
+        return {
+            "live_rows": live,
+            "dead_rows": total - live,
+            "dead_fraction": (total - live) / total if total else 0.0,
+            "generation": self._generation,
+        }
+
+    @property
+    def compaction_running(self) -> bool:
+        return self._compaction is not None and not self._compaction.done()
+
+    def schedule_compaction(self) -> Optional[asyncio.Task]:
+        """Start a background compaction unless one is already running."""
+        if not self.compaction_running:
+            self._compaction = asyncio.create_task(self.compact())
+        return self._compaction
+
+    async def compact(self) -> Dict[str, Any]:
+        """Rewrite embedding storage without dead rows, then VACUUM the database."""
+        if not self._initialized:
+            await self.initialize()
+        return await asyncio.wrap_future(self._write(self._compact, grouped=False))
+
+    def _compact(self, conn: sqlite3.Connection) -> Dict[str, Any]:
+        old = self._segments
+        with self._matrix_lock:
+            total = len(old.snapshot())
+        # SQLite is the source of truth: rows committed but not yet registered
+        # in memory are live too.
+        rows = conn.execute(
+            "SELECT id, segment, row_offset FROM documents WHERE segment IS NOT NULL ORDER BY segment, row_offset"
+        ).fetchall()
+        if old.dim is None or len(rows) == total:
+            return {"live_rows": len(rows), "reclaimed_rows": 0}
+
+        generation = self._generation + 1
+        target = EmbeddingSegments(self._segments_dir_for(generation), old.segment_rows)
+        shutil.rmtree(target.directory, ignore_errors=True)
+        target.open(old.dim, {}, self.quantization)
+        with self._matrix_lock:
+            source = old.snapshot()
+        updates: List[Tuple[int, int, int]] = []
+        for start in range(0, len(rows), self.scan_batch_rows):
+            batch = rows[start : start + self.scan_batch_rows]
+            positions = [segment * old.segment_rows + offset for _, segment, offset in batch]
+            ids = [row_id for row_id, _, _ in batch]
+            locations = target.append(source[positions])
+            target.register(locations, ids)
+            updates.extend((segment, offset, row_id) for (segment, offset), row_id in zip(locations, ids))
+
+        with transaction(conn):
+            conn.executemany("UPDATE documents SET segment = ?, row_offset = ? WHERE id = ?", updates)
+            self._write_meta(conn, "segments_generation", generation)
+        with self._matrix_lock:
+            self._segments = target
+            self._generation = generation
+        # Open mappings held by in-flight searches survive the unlink.
+        shutil.rmtree(old.directory, ignore_errors=True)
+
+        if self._ann is not None:
+            with self._index_lock:
+                self._ann = IVFIndex(nlist=self._nlist)
+                self.ann_index_path.unlink(missing_ok=True)
+            self._sync_ann_index()
+        if self.fts_enabled:
+            conn.execute("INSERT INTO documents_fts (documents_fts) VALUES ('optimize')")
+        try:
+            conn.execute("VACUUM")
+        except sqlite3.OperationalError as exc:
+            logger.warning("VACUUM after compaction failed: %s", exc)
+
+        reclaimed = total - len(rows)
+        logger.info("Compacted embedding storage: %d rows kept, %d reclaimed", len(rows), reclaimed)
+        return {"live_rows": len(rows), "reclaimed_rows": reclaimed}
+
+    async def similarity_search(
+        self,
+        embedding: Sequence[float],
+        top_k: int = 5,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        job_id: Optional[str] = None,
+        file_name: Optional[str] = None,
+        doc_type: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return the ``top_k`` most similar chunks.
+
+        When an IVF index is configured and trained, only the ``nprobe``
+        closest inverted lists are scored (higher is slower but more
+        accurate); ``exact=True`` always scans the full matrix.
+
+        ``job_id``, ``file_name``, ``doc_type`` and an explicit ``ids`` list
+        (e.g. keyword candidates) restrict the search before any scoring:
+        matching rows are looked up through indexed columns and only those
+        vectors are scored, exhaustively.
+        """
+        if not self._initialized:
+            await self.initialize()
+
+        with self._matrix_lock:
+            vectors = self._segments.snapshot()
+        row_ids = vectors.ids
+        if not len(row_ids) or (ids is not None and not len(ids)):
+            return []
 
         query_vec = np.asarray(embedding, dtype=np.float32)
+        # Check dimension compatibility
+        if query_vec.shape != (vectors.dim,):
+            return []
+
+        query_vec = self._normalize(query_vec)
+        filters = {
+            column: value
+            for column, value in zip(FILTER_COLUMNS, (job_id, file_name, doc_type))
+            if value is not None
+        }
+        if filters or ids is not None:
+            positions = await asyncio.to_thread(
+                self._filtered_positions, filters, ids, vectors.segment_rows
+            )
+            positions = positions[positions < len(row_ids)]
+            if not len(positions):
+                return []
+        else:
+            positions = None if exact else self._probe_ann(query_vec, nprobe or self.nprobe, len(row_ids))
+        if positions is not None:
+            positions = positions[row_ids[positions] >= 0]
+
+        candidates = top_k * self.rescore_factor if vectors.quantized else top_k
+        loop = asyncio.get_running_loop()
+        if positions is None:
+            positions, scores = await loop.run_in_executor(
+                self._search_executor, vectors.scan_top_k, query_vec, candidates, self.scan_batch_rows
+            )
+        else:
+            scores = await loop.run_in_executor(
+                self._search_executor, vectors.approximate_scores, query_vec, positions
+            )
+        if vectors.quantized:
+            # Rescore a shortlist from the compact scan at full precision.
+            shortlist = top_k_indices(scores, candidates)
+            positions = positions[shortlist]
+            scores = vectors[positions] @ query_vec
+        best = top_k_indices(scores, top_k)
+        if not len(best):
+            return []
+
+        winners = positions[best]
+        rows = await asyncio.to_thread(self._fetch_by_ids, row_ids[winners].tolist())
         results = []
-        for row in rows:
-            emb = self._deserialize_embedding(row["embedding"])
-            # Check dimension compatibility
-            if query_vec.shape != emb.shape:
-                continue
-            similarity = float(query_vec.dot(emb) / (np.linalg.norm(query_vec) * np.linalg.norm(emb) + 1e-8))
-            results.append({**row, "similarity": similarity})
-
-        results.sort(key=lambda x: x["similarity"], reverse=True)
-        return results[:top_k]
-
-    def _fetch_all(self) -> List[Dict[str, Any]]:
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        for index, similarity in zip(winners, scores[best]):
+            row = rows.get(int(row_ids[index]))
+            if row is not None:
+                results.append({**row, "similarity": float(similarity)})
+        return results
+
+    def _probe_ann(self, query_vec: np.ndarray, nprobe: int, size: int) -> Optional[np.ndarray]:
+        # Never block a query behind index training; fall back to exact scan.
+        if self._ann is None or not self._index_lock.acquire(blocking=False):
+            return None
         try:
-            rows = conn.execute("SELECT * FROM documents").fetchall()
-            return [dict(row) for row in rows]
+            ann = self._ann
+            if ann is None or not ann.trained:
+                return None
+            positions = ann.probe(query_vec, nprobe)
+            covered = ann.size
         finally:
-            conn.close()
+            self._index_lock.release()
+        positions = positions[positions < size]
+        if covered < size:
+            # Rows appended since the last index sync are scored exhaustively.
+            positions = np.concatenate([positions, np.arange(covered, size)])
+        return positions
+
+    @staticmethod
+    def _filter_clause(
+        filters: Dict[str, str],
+        ids: Optional[Sequence[int]] = None,
+        alias: str = "",
+    ) -> Tuple[str, List[Any]]:
+        clauses = [f"{alias}{column} = ?" for column in filters]
+        params: List[Any] = list(filters.values())
+        if ids is not None:
+            clauses.append(f"{alias}id IN ({', '.join('?' for _ in ids)})")
+            params.extend(int(row_id) for row_id in ids)
+        return "".join(f" AND {clause}" for clause in clauses), params
+
+    def _filtered_positions(
+        self,
+        filters: Dict[str, str],
+        ids: Optional[Sequence[int]],
+        segment_rows: int,
+    ) -> np.ndarray:
+        clause, params = self._filter_clause(filters, ids)
+        with self._readers.connection() as conn:
+            rows = conn.execute(
+                f"SELECT segment, row_offset FROM documents WHERE segment IS NOT NULL{clause}",
+                params,
+            ).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        locations = np.array([tuple(row) for row in rows], dtype=np.int64)
+        return np.sort(locations[:, 0] * segment_rows + locations[:, 1])
+
+    async def keyword_search(
+        self,
+        query: str,
+        limit: int = 20,
+        job_id: Optional[str] = None,
+        file_name: Optional[str] = None,
+        doc_type: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """BM25-ranked chunks matching any term of ``query`` (best first)."""
+        if not self._initialized:
+            await self.initialize()
+        match = fts_match_expression(query)
+        if not self.fts_enabled or not match:
+            return []
+        filters = {
+            column: value
+            for column, value in zip(FILTER_COLUMNS, (job_id, file_name, doc_type))
+            if value is not None
+        }
+        return await asyncio.to_thread(self._keyword_search, match, limit, filters)
+
+    def _keyword_search(self, match: str, limit: int, filters: Dict[str, str]) -> List[Dict[str, Any]]:
+        clause, params = self._filter_clause(filters, alias="d.")
+        with self._readers.connection() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT d.id, d.job_id, d.file_name, d.chunk_index, d.content, d.metadata, d.doc_type,
+                       bm25(documents_fts) AS rank
+                FROM documents_fts JOIN documents d ON d.id = documents_fts.rowid
+                WHERE documents_fts MATCH ? AND d.segment IS NOT NULL{clause}
+                ORDER BY rank LIMIT ?
+                """,
+                [match, *params, limit],
+            ).fetchall()
+
+        results = []
+        for row in rows:
+            record = dict(row)
+            record["metadata"] = json.loads(record["metadata"] or "{}")
+            record["bm25"] = -record.pop("rank")
+            results.append(record)
+        return results
+
+    def _fetch_by_ids(self, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        placeholders = ", ".join("?" for _ in ids)
+        with self._readers.connection() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT id, job_id, file_name, chunk_index, content, metadata, doc_type
+                FROM documents WHERE id IN ({placeholders})
+                """,
+                ids,
+            ).fetchall()
+
+        results = {}
+        for row in rows:
+            record = dict(row)
+            record["metadata"] = json.loads(record["metadata"] or "{}")
+            results[record["id"]] = record
+        return results
+
+
+def fts_match_expression(text: str) -> str:
+    """Turn free text into an FTS5 query matching any of its terms."""
+    terms = dict.fromkeys(term.lower() for term in re.findall(r"\w+", text))
+    return " OR ".join(f'"{term}"' for term in terms)
+
 
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the ``top_k`` highest scores, best first."""
+    if top_k <= 0 or not len(scores):
+        return np.empty(0, dtype=np.int64)
+    if top_k < len(scores):
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
 
-document_store = DocumentStore()
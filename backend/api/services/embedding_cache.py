@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .document_store import DATA_DIR
+from .sqlite_connections import SQLiteReaderPool, SQLiteWriter, transaction
+
+CACHE_PATH = DATA_DIR / "embedding_cache.db"
+
+
+def content_hash(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Persistent chunk-embedding cache keyed by (model name, sha256 of text)."""
+
+    def __init__(self, db_path: Path = CACHE_PATH) -> None:
+        self.db_path = db_path
+        self._writer = SQLiteWriter(db_path)
+        self._readers = SQLiteReaderPool(db_path, size=2)
+        self._init_lock = asyncio.Lock()
+        self._initialized = False
+
+    async def initialize(self) -> None:
+        async with self._init_lock:
+            if self._initialized:
+                return
+            await asyncio.wrap_future(self._writer.submit(self._create_schema, grouped=False))
+            self._initialized = True
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection) -> None:
+        with transaction(conn):
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    model TEXT NOT NULL,
+                    text_hash BLOB NOT NULL,
+                    embedding BLOB NOT NULL,
+                    PRIMARY KEY (model, text_hash)
+                ) WITHOUT ROWID
+                """
+            )
+
+    def close(self) -> None:
+        self._writer.close()
+        self._readers.close()
+        self._initialized = False
+
+    async def lookup(self, model: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached embedding per text, ``None`` for misses."""
+        if not self._initialized:
+            await self.initialize()
+        hashes = [content_hash(text) for text in texts]
+        found = await asyncio.to_thread(self._lookup, model, list(dict.fromkeys(hashes)))
+        return [found.get(text_hash) for text_hash in hashes]
+
+    def _lookup(self, model: str, hashes: List[bytes], batch: int = 500) -> Dict[bytes, np.ndarray]:
+        found: Dict[bytes, np.ndarray] = {}
+        with self._readers.connection() as conn:
+            for start in range(0, len(hashes), batch):
+                chunk = hashes[start : start + batch]
+                placeholders = ", ".join("?" for _ in chunk)
+                rows = conn.execute(
+                    f"SELECT text_hash, embedding FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk],
+                )
+                for text_hash, blob in rows:
+                    found[bytes(text_hash)] = np.frombuffer(blob, dtype=np.float32)
+        return found
+
+    async def store(self, model: str, texts: Sequence[str], embeddings: Sequence[Sequence[float]]) -> None:
+        if not texts:
+            return
+        if not self._initialized:
+            await self.initialize()
+        records = [
+            (model, content_hash(text), np.asarray(embedding, dtype=np.float32).tobytes())
+            for text, embedding in zip(texts, embeddings)
+        ]
+        await asyncio.wrap_future(
+            self._writer.submit(
+                lambda conn: conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, text_hash, embedding) VALUES (?, ?, ?)",
+                    records,
+                )
+            )
+        )
+
+
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+QUERY = "query"
+INGESTION = "ingestion"
+
+_Task = Tuple[Future, Callable[..., Any], tuple, dict]
+
+
+class EmbeddingExecutor:
+    """Dedicated encode threads where query work always runs before ingestion.
+
+    Idle threads take the oldest query encode first; ingestion batches only
+    start when no query is waiting, and at most ``ingestion_workers`` of them
+    run at once so a thread stays free for queries. A batch already on the
+    model is not interrupted, so a query waits at most for a free thread.
+    """
+
+    def __init__(self, workers: int = 2, ingestion_workers: int = 1) -> None:
+        self._pending: Dict[str, Deque[_Task]] = {QUERY: deque(), INGESTION: deque()}
+        self._condition = threading.Condition()
+        self._threads: List[threading.Thread] = []
+        self._ingestion_running = 0
+        self._closed = False
+        self.configure(workers=workers, ingestion_workers=ingestion_workers)
+
+    def configure(self, workers: Optional[int] = None, ingestion_workers: Optional[int] = None) -> None:
+        """Resize the pool; only takes effect before the first submit or after :meth:`close`."""
+        with self._condition:
+            if workers is not None:
+                self.workers = max(1, workers)
+            if ingestion_workers is not None:
+                self.ingestion_workers = ingestion_workers
+            self.ingestion_workers = max(1, min(self.ingestion_workers, self.workers))
+
+    def submit(self, fn: Callable[..., Any], *args: Any, priority: str = QUERY, **kwargs: Any) -> Future:
+        if priority not in self._pending:
+            raise ValueError(f"Unsupported encode priority '{priority}'")
+        future: Future = Future()
+        with self._condition:
+            self._closed = False
+            self._start()
+            self._pending[priority].append((future, fn, args, kwargs))
+            self._condition.notify()
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args: Any, priority: str = QUERY) -> Any:
+        return await asyncio.wrap_future(self.submit(fn, *args, priority=priority))
+
+    def queued(self, priority: str) -> int:
+        with self._condition:
+            return len(self._pending[priority])
+
+    def close(self) -> None:
+        with self._condition:
+            self._closed = True
+            threads, self._threads = self._threads, []
+            pending = [task for tasks in self._pending.values() for task in tasks]
+            for tasks in self._pending.values():
+                tasks.clear()
+            self._condition.notify_all()
+        for future, *_ in pending:
+            future.cancel()
+        for thread in threads:
+            thread.join()
+
+    def _start(self) -> None:
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(
+                target=self._run, name=f"embedding-encode-{len(self._threads)}", daemon=True
+            )
+            self._threads.append(thread)
+            thread.start()
+
+    def _next(self) -> Optional[Tuple[str, _Task]]:
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                if self._pending[QUERY]:
+                    return QUERY, self._pending[QUERY].popleft()
+                if self._pending[INGESTION] and self._ingestion_running < self.ingestion_workers:
+                    self._ingestion_running += 1
+                    return INGESTION, self._pending[INGESTION].popleft()
+                self._condition.wait()
+
+    def _run(self) -> None:
+        while True:
+            item = self._next()
+            if item is None:
+                return
+            priority, (future, fn, args, kwargs) = item
+            try:
+                if future.set_running_or_notify_cancel():
+                    try:
+                        future.set_result(fn(*args, **kwargs))
+                    except BaseException as exc:  # noqa: BLE001
+                        future.set_exception(exc)
+            finally:
+                if priority == INGESTION:
+                    with self._condition:
+                        self._ingestion_running -= 1
+                        self._condition.notify()
+
+
+def set_torch_threads(threads: Optional[int]) -> None:
+    """Cap torch intra-op parallelism for every encode in this process."""
+    if not threads:
+        return
+    import torch  # lazy import
+
+    torch.set_num_threads(threads)
+    logger.info("Torch intra-op threads set to %d", threads)
+
+
+embedding_executor = EmbeddingExecutor()
@@ -0,0 +1,367 @@
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_ROWS = 65_536
+SEGMENT_SUFFIX = ".f32"
+
+# Compact companions scanned in the first pass; ".f32" stays the exact copy.
+QUANTIZATIONS = {
+    "none": None,
+    "float16": (".f16", np.float16),
+    "int8": (".i8", np.int8),
+}
+SCALE_SUFFIX = ".i8s"
+
+
+def quantize(vectors: np.ndarray, quantization: str) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Return the compact form of ``vectors`` plus per-row scales for int8."""
+    if quantization == "float16":
+        return vectors.astype(np.float16), None
+    if quantization == "int8":
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        codes = np.round(vectors / scales[:, None]).astype(np.int8)
+        return codes, scales.astype(np.float32)
+    raise ValueError(f"Unsupported quantization '{quantization}'. Supported: {sorted(QUANTIZATIONS)}")
+
+
+class SegmentView:
+    """Read-only, point-in-time view over memory-mapped embedding segments.
+
+    Rows are addressed by global position ``segment * segment_rows + offset``.
+    Indexing with a slice or an integer array gathers full-precision rows into
+    a new array; ``dot`` scores every row in place over the mapped pages.
+    ``approximate_scores`` scans the quantized companions when present.
+    """
+
+    def __init__(
+        self,
+        ids: np.ndarray,
+        segments: Sequence[np.ndarray],
+        dim: int,
+        segment_rows: int,
+        compact: Optional[Sequence[np.ndarray]] = None,
+        scales: Optional[Sequence[np.ndarray]] = None,
+    ) -> None:
+        self.ids = ids
+        self.segments = segments
+        self.dim = dim
+        self.segment_rows = segment_rows
+        self.compact = compact
+        self.scales = scales
+
+    @property
+    def quantized(self) -> bool:
+        return self.compact is not None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.ids), self.dim
+
+    def __getitem__(self, key) -> np.ndarray:
+        if isinstance(key, slice):
+            key = np.arange(*key.indices(len(self)))
+        positions = np.asarray(key, dtype=np.int64)
+        out = np.empty((len(positions), self.dim), dtype=np.float32)
+        segment_ids = positions // self.segment_rows
+        for segment_id in np.unique(segment_ids):
+            mask = segment_ids == segment_id
+            out[mask] = self.segments[segment_id][positions[mask] - segment_id * self.segment_rows]
+        return out
+
+    def approximate_scores(self, query: np.ndarray, positions: np.ndarray) -> np.ndarray:
+        """Score ``positions`` against the compact copies (exact if unquantized)."""
+        if self.compact is None:
+            return self[positions] @ query
+
+        scores = np.empty(len(positions), dtype=np.float32)
+        segment_ids = positions // self.segment_rows
+        for segment_id in np.unique(segment_ids):
+            mask = np.flatnonzero(segment_ids == segment_id)
+            offsets = positions[mask] - segment_id * self.segment_rows
+            block_scores = self.compact[segment_id][offsets].astype(np.float32) @ query
+            if self.scales is not None:
+                block_scores *= self.scales[segment_id][offsets]
+            scores[mask] = block_scores
+        return scores
+
+    def scan_top_k(
+        self,
+        query: np.ndarray,
+        top_k: int,
+        batch_rows: int = 8_192,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Stream every row in fixed-size batches, keeping only a running top-k.
+
+        Scores come from the compact copies when quantized. Peak memory is one
+        batch plus ``top_k`` entries, independent of corpus size. Rows without
+        a committed id are never returned.
+        """
+        running = RunningTopK(top_k)
+        for segment_id, segment in enumerate(self.segments):
+            base = segment_id * self.segment_rows
+            rows = min(len(segment), len(self) - base)
+            for start in range(0, rows, batch_rows):
+                stop = min(start + batch_rows, rows)
+                if self.compact is None:
+                    block_scores = segment[start:stop] @ query
+                else:
+                    block_scores = self.compact[segment_id][start:stop].astype(np.float32) @ query
+                    if self.scales is not None:
+                        block_scores *= self.scales[segment_id][start:stop]
+                block_scores[self.ids[base + start : base + stop] < 0] = -np.inf
+                running.push(np.arange(base + start, base + stop), block_scores)
+        return running.result()
+
+
+class RunningTopK:
+    """Bounded top-k accumulator fed with vectorized batches of scores."""
+
+    def __init__(self, k: int) -> None:
+        self.k = k
+        self.positions = np.empty(0, dtype=np.int64)
+        self.scores = np.empty(0, dtype=np.float32)
+
+    def push(self, positions: np.ndarray, scores: np.ndarray) -> None:
+        if self.k <= 0 or not len(scores):
+            return
+        if len(scores) > self.k:
+            keep = np.argpartition(-scores, self.k - 1)[: self.k]
+            positions, scores = positions[keep], scores[keep]
+        positions = np.concatenate([self.positions, positions])
+        scores = np.concatenate([self.scores, scores])
+        if len(scores) > self.k:
+            keep = np.argpartition(-scores, self.k - 1)[: self.k]
+            positions, scores = positions[keep], scores[keep]
+        self.positions, self.scores = positions, scores
+
+    def result(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions and scores, best first, excluding masked (``-inf``) rows."""
+        order = np.argsort(-self.scores, kind="stable")
+        valid = order[np.isfinite(self.scores[order])]
+        return self.positions[valid], self.scores[valid]
+
+
+class EmbeddingSegments:
+    """Append-only, fixed-stride float32 segment files mapped with ``np.memmap``.
+
+    Each segment holds up to ``segment_rows`` vectors of ``dim`` floats, so a
+    row's location is fully described by ``(segment, offset)``. Files are only
+    ever appended to, which keeps existing mappings valid and lets several
+    processes share the same page-cache pages.
+    """
+
+    def __init__(self, directory: Path, segment_rows: int = SEGMENT_ROWS) -> None:
+        self.directory = directory
+        self.segment_rows = segment_rows
+        self.dim: Optional[int] = None
+        self.quantization = "none"
+        self._maps: List[np.ndarray] = []
+        self._compact_maps: List[np.ndarray] = []
+        self._scale_maps: List[np.ndarray] = []
+        self._ids = np.empty(0, dtype=np.int64)
+        self._size = 0
+
+    def _segment_path(self, segment_id: int, suffix: str = SEGMENT_SUFFIX) -> Path:
+        return self.directory / f"seg-{segment_id:05d}{suffix}"
+
+    def _segment_length(self, segment_id: int) -> int:
+        path = self._segment_path(segment_id)
+        if not path.exists():
+            return 0
+        row_bytes = 4 * self.dim  # type: ignore[operator]
+        size = path.stat().st_size
+        rows = size // row_bytes
+        if size != rows * row_bytes:
+            # A crashed append left a partial row; appends go to the end of
+            # the file, so it has to go before new rows land behind it.
+            logger.warning("Truncating %d torn bytes from %s", size - rows * row_bytes, path.name)
+            os.truncate(path, rows * row_bytes)
+        return rows
+
+    def _map(
+        self,
+        segment_id: int,
+        rows: int,
+        suffix: str = SEGMENT_SUFFIX,
+        dtype=np.float32,
+        width: Optional[int] = -1,
+    ) -> np.ndarray:
+        shape = (rows,) if width is None else (rows, self.dim if width == -1 else width)
+        if rows == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self._segment_path(segment_id, suffix), dtype=dtype, mode="r", shape=shape)
+
+    def open(
+        self,
+        dim: int,
+        locations: Dict[int, Tuple[int, int]],
+        quantization: str = "none",
+    ) -> None:
+        """Map existing segment files; ``locations`` maps row id to (segment, offset)."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self._maps = []
+        segment_id = 0
+        while self._segment_path(segment_id).exists():
+            self._maps.append(self._map(segment_id, self._segment_length(segment_id)))
+            segment_id += 1
+        self.convert(quantization, rebuild=False)
+
+        # Rows written to a segment whose SQLite insert never committed keep
+        # id -1 and are skipped when results are resolved.
+        self._size = self._position_count()
+        self._ids = np.full(max(self._size, 1_024), -1, dtype=np.int64)
+        for row_id, (segment, offset) in locations.items():
+            self._ids[segment * self.segment_rows + offset] = row_id
+
+    def _position_count(self) -> int:
+        if not self._maps:
+            return 0
+        return (len(self._maps) - 1) * self.segment_rows + len(self._maps[-1])
+
+    def convert(self, quantization: str, rebuild: bool = True) -> None:
+        """Switch the compact representation, rewriting companions from ``.f32``.
+
+        With ``rebuild=False`` only companions that are missing or out of step
+        with their ``.f32`` segment (e.g. after a crash) are regenerated.
+        """
+        if quantization not in QUANTIZATIONS:
+            raise ValueError(f"Unsupported quantization '{quantization}'. Supported: {sorted(QUANTIZATIONS)}")
+        for stale in QUANTIZATIONS.values():
+            if stale is not None and stale != QUANTIZATIONS[quantization]:
+                for path in self.directory.glob(f"seg-*{stale[0]}"):
+                    path.unlink()
+        if quantization != "int8":
+            for path in self.directory.glob(f"seg-*{SCALE_SUFFIX}"):
+                path.unlink()
+
+        self.quantization = quantization
+        self._compact_maps = []
+        self._scale_maps = []
+        if QUANTIZATIONS[quantization] is None:
+            return
+        for segment_id, segment in enumerate(self._maps):
+            if rebuild or not self._compact_matches(segment_id, len(segment)):
+                self._rewrite_compact(segment_id, segment)
+            self._map_compact(segment_id, len(segment))
+
+    def _compact_matches(self, segment_id: int, rows: int) -> bool:
+        suffix, dtype = QUANTIZATIONS[self.quantization]  # type: ignore[misc]
+        path = self._segment_path(segment_id, suffix)
+        if not path.exists() or path.stat().st_size != rows * self.dim * np.dtype(dtype).itemsize:  # type: ignore[operator]
+            return False
+        if self.quantization == "int8":
+            scales = self._segment_path(segment_id, SCALE_SUFFIX)
+            return scales.exists() and scales.stat().st_size == rows * 4
+        return True
+
+    def _compact_paths(self, segment_id: int) -> List[Path]:
+        suffix, _dtype = QUANTIZATIONS[self.quantization]  # type: ignore[misc]
+        paths = [self._segment_path(segment_id, suffix)]
+        if self.quantization == "int8":
+            paths.append(self._segment_path(segment_id, SCALE_SUFFIX))
+        return paths
+
+    def _write_compact(self, segment_id: int, vectors: np.ndarray, tmp: bool = False) -> None:
+        codes, scales = quantize(np.asarray(vectors, dtype=np.float32), self.quantization)
+        for path, data in zip(self._compact_paths(segment_id), (codes, scales)):
+            if tmp:
+                path = path.with_name(path.name + ".tmp")
+            with path.open("ab") as fh:
+                fh.write(data.tobytes())
+
+    def _rewrite_compact(self, segment_id: int, segment: np.ndarray, batch_rows: int = 8_192) -> None:
+        # Build next to the live file and swap it in, so mappings held by
+        # in-flight searches keep pointing at the old inode.
+        paths = self._compact_paths(segment_id)
+        for path in paths:
+            path.with_name(path.name + ".tmp").unlink(missing_ok=True)
+        for start in range(0, len(segment), batch_rows):
+            self._write_compact(segment_id, segment[start : start + batch_rows], tmp=True)
+        for path in paths:
+            tmp_path = path.with_name(path.name + ".tmp")
+            if tmp_path.exists():
+                os.replace(tmp_path, path)
+            else:
+                path.unlink(missing_ok=True)
+
+    def _map_compact(self, segment_id: int, rows: int) -> None:
+        suffix, dtype = QUANTIZATIONS[self.quantization]  # type: ignore[misc]
+        compact = self._map(segment_id, rows, suffix, dtype)
+        scales = (
+            self._map(segment_id, rows, SCALE_SUFFIX, np.float32, width=None)
+            if self.quantization == "int8"
+            else None
+        )
+        if segment_id < len(self._compact_maps):
+            self._compact_maps[segment_id] = compact
+            if scales is not None:
+                self._scale_maps[segment_id] = scales
+        else:
+            self._compact_maps.append(compact)
+            if scales is not None:
+                self._scale_maps.append(scales)
+
+    def append(self, vectors: np.ndarray) -> List[Tuple[int, int]]:
+        """Append normalized vectors and return each row's (segment, offset)."""
+        if self.dim is None:
+            raise RuntimeError("Segments are not open")
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        locations: List[Tuple[int, int]] = []
+        start = 0
+        while start < len(vectors):
+            if not self._maps or len(self._maps[-1]) >= self.segment_rows:
+                self._maps.append(self._map(len(self._maps), 0))
+            segment_id = len(self._maps) - 1
+            offset = len(self._maps[-1])
+            take = min(self.segment_rows - offset, len(vectors) - start)
+            with self._segment_path(segment_id).open("ab") as fh:
+                fh.write(vectors[start : start + take].tobytes())
+                fh.flush()
+                os.fsync(fh.fileno())
+            self._maps[-1] = self._map(segment_id, offset + take)
+            if self.quantization != "none":
+                self._write_compact(segment_id, vectors[start : start + take])
+                self._map_compact(segment_id, offset + take)
+            locations.extend((segment_id, offset + i) for i in range(take))
+            start += take
+
+        required = self._position_count()
+        if required > len(self._ids):
+            grown = np.full(max(required, 2 * len(self._ids)), -1, dtype=np.int64)
+            grown[: self._size] = self._ids[: self._size]
+            self._ids = grown
+        self._size = required
+        return locations
+
+    def register(self, locations: Sequence[Tuple[int, int]], ids: Sequence[int]) -> None:
+        for (segment, offset), row_id in zip(locations, ids):
+            self._ids[segment * self.segment_rows + offset] = row_id
+
+    def tombstone(self, locations: Sequence[Tuple[int, int]]) -> None:
+        """Mark rows deleted; their vectors stay on disk until compaction."""
+        for segment, offset in locations:
+            self._ids[segment * self.segment_rows + offset] = -1
+
+    def snapshot(self) -> SegmentView:
+        # Segment files only grow, so mappings captured here stay valid.
+        return SegmentView(
+            ids=self._ids[: self._size],
+            segments=list(self._maps),
+            dim=self.dim or 0,
+            segment_rows=self.segment_rows,
+            compact=list(self._compact_maps) if self.quantization != "none" else None,
+            scales=list(self._scale_maps) if self.quantization == "int8" else None,
+        )
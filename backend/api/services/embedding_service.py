@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from api.utils.metrics import metrics
+
+from .embedding_executor import QUERY, EmbeddingExecutor, embedding_executor
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+QUEUE_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class QueryEmbeddingService:
+    """Coalesces concurrent single-text encodes into batched model calls.
+
+    The first request of a batch waits at most ``max_wait_ms`` for company;
+    requests arriving while a batch is being encoded are picked up by the
+    next one without further delay.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[List[str]], np.ndarray],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        executor: Optional[EmbeddingExecutor] = None,
+    ) -> None:
+        self._encode = encode
+        self._executor = executor or embedding_executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self._queue: List[Tuple[str, asyncio.Future, float]] = []
+        self._arrived: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.batch_sizes = metrics.histogram(
+            "query_embedding_batch_size", "Texts per query-embedding encode call", BATCH_SIZE_BUCKETS
+        )
+        self.queue_wait = metrics.histogram(
+            "query_embedding_queue_wait_seconds",
+            "Time a query embedding request waited before its batch was encoded",
+            QUEUE_WAIT_BUCKETS,
+        )
+
+    async def embed(self, text: str) -> np.ndarray:
+        if self._worker is None or self._worker.done():
+            self._arrived = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+        future = asyncio.get_running_loop().create_future()
+        self._queue.append((text, future, time.perf_counter()))
+        self._arrived.set()  # type: ignore[union-attr]
+        return await future
+
+    def close(self) -> None:
+        if self._worker is not None:
+            self._worker.cancel()
+            self._worker = None
+        for _, future, _ in self._queue:
+            if not future.done():
+                future.cancel()
+        self._queue = []
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        arrived = self._arrived
+        assert arrived is not None
+        backlog = False
+        while True:
+            await arrived.wait()
+            # Requests left over from the previous batch have already waited
+            # through an encode, so only a fresh batch waits for company.
+            deadline = loop.time() + (0 if backlog else self.max_wait)
+            while len(self._queue) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                arrived.clear()
+                try:
+                    await asyncio.wait_for(arrived.wait(), remaining)
+                except asyncio.TimeoutError:
+                    break
+            batch, self._queue = self._queue[: self.max_batch_size], self._queue[self.max_batch_size :]
+            if not self._queue:
+                arrived.clear()
+            await self._encode_batch(batch)
+            backlog = bool(self._queue)
+
+    async def _encode_batch(self, batch: List[Tuple[str, asyncio.Future, float]]) -> None:
+        batch = [item for item in batch if not item[1].cancelled()]
+        if not batch:
+            return
+        now = time.perf_counter()
+        for _, _, enqueued in batch:
+            self.queue_wait.observe(now - enqueued)
+        self.batch_sizes.observe(len(batch))
+        texts = [text for text, _, _ in batch]
+        try:
+            embeddings = await self._executor.run(self._encode, texts, priority=QUERY)
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Query embedding batch of %d failed", len(batch))
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for (_, future, _), embedding in zip(batch, embeddings):
+            if not future.done():
+                future.set_result(embedding)
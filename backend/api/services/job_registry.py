@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import sqlite3
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .document_store import DATA_DIR
+from .sqlite_connections import SQLiteReaderPool, SQLiteWriter, transaction
+
+REGISTRY_PATH = DATA_DIR / "ingestion_jobs.db"
+FINISHED_FILE_STATES = ("completed", "updated", "skipped", "failed")
+
+
+@dataclass
+class JobRecord:
+    job_id: str
+    status: str
+    total_files: int
+    delete_files: bool
+    replace_existing: bool
+    errors: List[str]
+    cache_hits: int
+    cache_misses: int
+    # File path -> state, in upload order.
+    files: Dict[str, str]
+
+
+class JobRegistry:
+    """Durable ingestion job and per-file state, used to resume after restarts."""
+
+    def __init__(self, db_path: Path = REGISTRY_PATH) -> None:
+        self.db_path = db_path
+        self._writer = SQLiteWriter(db_path)
+        self._readers = SQLiteReaderPool(db_path, size=2)
+        self._init_lock = asyncio.Lock()
+        self._initialized = False
+
+    async def initialize(self) -> None:
+        async with self._init_lock:
+            if self._initialized:
+                return
+            await asyncio.wrap_future(self._writer.submit(self._create_schema, grouped=False))
+            self._initialized = True
+
+    @staticmethod
+    def _create_schema(conn: sqlite3.Connection) -> None:
+        with transaction(conn):
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    job_id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    total_files INTEGER NOT NULL,
+                    delete_files INTEGER NOT NULL DEFAULT 0,
+                    replace_existing INTEGER NOT NULL DEFAULT 0,
+                    errors TEXT NOT NULL DEFAULT '[]',
+                    cache_hits INTEGER NOT NULL DEFAULT 0,
+                    cache_misses INTEGER NOT NULL DEFAULT 0,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS job_files (
+                    job_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    path TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    PRIMARY KEY (job_id, position)
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "replace_existing" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN replace_existing INTEGER NOT NULL DEFAULT 0")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+
+    def close(self) -> None:
+        self._writer.close()
+        self._readers.close()
+        self._initialized = False
+
+    async def _submit(self, fn) -> Any:
+        if not self._initialized:
+            await self.initialize()
+        return await asyncio.wrap_future(self._writer.submit(fn))
+
+    async def create_job(
+        self, job_id: str, files: List[Path], delete_files: bool, replace_existing: bool = False
+    ) -> None:
+        now = time.time()
+
+        def write(conn: sqlite3.Connection) -> None:
+            conn.execute(
+                """
+                INSERT INTO jobs (
+                    job_id, status, total_files, delete_files, replace_existing, created_at, updated_at
+                )
+                VALUES (?, 'pending', ?, ?, ?, ?, ?)
+                """,
+                (job_id, len(files), int(delete_files), int(replace_existing), now, now),
+            )
+            conn.executemany(
+                "INSERT INTO job_files (job_id, position, path, state) VALUES (?, ?, ?, 'queued')",
+                [(job_id, position, str(path)) for position, path in enumerate(files)],
+            )
+
+        await self._submit(write)
+
+    async def set_file_state(self, job_id: str, path: Path, state: str) -> None:
+        await self._submit(
+            lambda conn: conn.execute(
+                "UPDATE job_files SET state = ? WHERE job_id = ? AND path = ?",
+                (state, job_id, str(path)),
+            )
+        )
+
+    async def update_job(
+        self,
+        job_id: str,
+        status: str,
+        errors: List[str],
+        cache_hits: int,
+        cache_misses: int,
+    ) -> None:
+        await self._submit(
+            lambda conn: conn.execute(
+                """
+                UPDATE jobs SET status = ?, errors = ?, cache_hits = ?, cache_misses = ?, updated_at = ?
+                WHERE job_id = ?
+                """,
+                (status, json.dumps(errors), cache_hits, cache_misses, time.time(), job_id),
+            )
+        )
+
+    async def get(self, job_id: str) -> Optional[JobRecord]:
+        records = await self._load("WHERE job_id = ?", [job_id])
+        return records[0] if records else None
+
+    async def recent(self, limit: int = 100) -> List[JobRecord]:
+        return await self._load("ORDER BY created_at DESC LIMIT ?", [limit])
+
+    async def unfinished(self) -> List[JobRecord]:
+        return await self._load(
+            "WHERE status NOT IN ('completed', 'completed_with_errors', 'failed') ORDER BY created_at",
+            [],
+        )
+
+    async def _load(self, where: str, params: List[Any]) -> List[JobRecord]:
+        if not self._initialized:
+            await self.initialize()
+
+        def fetch() -> List[JobRecord]:
+            with self._readers.connection() as conn:
+                jobs = conn.execute(f"SELECT * FROM jobs {where}", params).fetchall()
+                records = []
+                for job in jobs:
+                    files = conn.execute(
+                        "SELECT path, state FROM job_files WHERE job_id = ? ORDER BY position",
+                        (job["job_id"],),
+                    ).fetchall()
+                    records.append(
+                        JobRecord(
+                            job_id=job["job_id"],
+                            status=job["status"],
+                            total_files=job["total_files"],
+                            delete_files=bool(job["delete_files"]),
+                            replace_existing=bool(job["replace_existing"]),
+                            errors=json.loads(job["errors"]),
+                            cache_hits=job["cache_hits"],
+                            cache_misses=job["cache_misses"],
+                            files={row["path"]: row["state"] for row in files},
+                        )
+                    )
+                return records
+
+        return await asyncio.to_thread(fetch)
+
+
+job_registry = JobRegistry()
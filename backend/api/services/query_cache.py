@@ -3,7 +3,7 @@ from __future__ import annotations
 import time
 from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Any, Optional
+from typing import Any, Hashable, Optional
 
 
 @dataclass
@@ -44,3 +44,75 @@ class QueryCache:
         expired_keys = [key for key, entry in self._store.items() if entry.expires_at < now]
         for key in expired_keys:
             self._store.pop(key)
+
+
+class LRUCache:
+    """Bounded LRU without expiry that counts hits and misses."""
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._store: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self._store.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._store.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._store[key] = value
+        self._store.move_to_end(key)
+        while len(self._store) > self.max_size:
+            self._store.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        self._store.clear()
+        self.hits = self.misses = 0
+
+
+class EmbeddingLRU(LRUCache):
+    """Bounded LRU of query embeddings keyed by model name and normalized text.
+
+    Unlike :class:`QueryCache` entries never expire: an embedding only depends
+    on the model and the text, so it stays valid across reconnects and corpus
+    changes.
+    """
+
+    def __init__(self, max_size: int = 10_000) -> None:
+        super().__init__(max_size)
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        return " ".join(text.split()).lower()
+
+    def get(self, model_name: str, text: str) -> Optional[Any]:  # type: ignore[override]
+        return super().get((model_name, self.normalize(text)))
+
+    def set(self, model_name: str, text: str, vector: Any) -> None:  # type: ignore[override]
+        super().set((model_name, self.normalize(text)), vector)
+
+
+class PlanCache(LRUCache):
+    """LRU of NL-to-SQL plans keyed by ``(query template, schema fingerprint)``.
+
+    Hits and misses are counted separately from :class:`QueryCache`, whose
+    entries hold whole responses.
+    """
+
+    def __init__(self, max_size: int = 1_000) -> None:
+        super().__init__(max_size)
+
+    def retain(self, fingerprint: str) -> None:
+        """Drop plans compiled against any schema other than ``fingerprint``."""
+        for key in [key for key in self._store if key[1] != fingerprint]:  # type: ignore[index]
+            del self._store[key]
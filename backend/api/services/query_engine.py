@@ -1,21 +1,62 @@
 from __future__ import annotations
 
 import asyncio
+import base64
+import hashlib
+import json
 import logging
+import re
 import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
+from datetime import date, datetime, time as time_of_day
+from decimal import Decimal
 from enum import Enum
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
 
 from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
 
 from .document_processor import DocumentProcessor
-from .document_store import document_store
-from .query_cache import QueryCache
+from .embedding_executor import QUERY
+from .embedding_service import QueryEmbeddingService
+from .query_cache import EmbeddingLRU, PlanCache, QueryCache
 from .schema_discovery import SchemaDiscovery
+from .sharded_store import document_store
 
 logger = logging.getLogger(__name__)
 
+DOCUMENT_TOP_K = 5
+HYBRID_CANDIDATES = 50
+RRF_K = 60
+
+
+# ":name" placeholders, not "::type" casts.
+BIND_PARAMETER = re.compile(r"(?<![:\w]):(\w+)")
+
+
+# Query words whose following word is bound as a filter value rather than
+# shaping the SQL; plan templates replace that value with a slot.
+SLOT_KEYWORDS = ("department", "role")
+
+# Key values JSON cannot carry natively travel in cursors as
+# {"$type": name, "value": text}: (name, types, to text, from text). Checked
+# in order, so datetime precedes date.
+CURSOR_TYPES: Tuple[Tuple[str, Any, Callable[[Any], str], Callable[[str], Any]], ...] = (
+    ("decimal", Decimal, str, Decimal),
+    ("datetime", datetime, datetime.isoformat, datetime.fromisoformat),
+    ("date", date, date.isoformat, date.fromisoformat),
+    ("time", time_of_day, time_of_day.isoformat, time_of_day.fromisoformat),
+    ("uuid", UUID, str, UUID),
+    (
+        "bytes",
+        (bytes, bytearray, memoryview),
+        lambda value: base64.b64encode(bytes(value)).decode("ascii"),
+        base64.b64decode,
+    ),
+)
+
 
 class QueryType(str, Enum):
     SQL = "sql"
@@ -23,21 +64,202 @@ class QueryType(str, Enum):
     HYBRID = "hybrid"
 
 
+@dataclass
+class SQLPlan:
+    """A generated statement after optimization, ready to bind and execute once."""
+
+    sql: str
+    params: Dict[str, Any]
+    table: str
+    optimizations: List[str] = field(default_factory=list)
+    # Bind parameter -> slot keyword whose value the parameter is filled from.
+    slots: Dict[str, str] = field(default_factory=dict)
+    # Key columns pages are ordered and resumed by; empty pages by offset.
+    order_by: List[str] = field(default_factory=list)
+    # Without a key, offset pages are sorted by these (every selected column).
+    sort_by: List[str] = field(default_factory=list)
+    # Aggregates return one row and are never paged.
+    paginated: bool = True
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "sql": self.sql,
+            "table": self.table,
+            "parameters": sorted(self.params),
+            "optimizations": list(self.optimizations),
+            "order_by": list(self.order_by),
+        }
+
+    @property
+    def signature(self) -> str:
+        """Identifies the statement and its values; cursors only resume the plan they came from."""
+        payload = json.dumps([self.sql, self.params], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def page_statement(self, position: Dict[str, Any], limit: int) -> Tuple[str, Dict[str, Any]]:
+        """The statement and values fetching ``limit`` rows from cursor ``position``."""
+        if not self.paginated:
+            return self.sql, dict(self.params)
+        params = {**self.params, "page_limit": limit}
+        if not self.order_by:
+            params["page_offset"] = position.get("offset", 0)
+            order = ", ".join(self.sort_by)
+            return (
+                f"SELECT * FROM ({self.sql}) AS page ORDER BY {order} LIMIT :page_limit OFFSET :page_offset",
+                params,
+            )
+        keys = ", ".join(self.order_by)
+        where = ""
+        after = position.get("after")
+        if after is not None:
+            if len(after) != len(self.order_by):
+                raise ValueError("Cursor does not match this query")
+            binds = ", ".join(f":after_{i}" for i in range(len(after)))
+            where = f" WHERE ({keys}) > ({binds})"
+            params.update((f"after_{i}", value) for i, value in enumerate(after))
+        return f"SELECT * FROM ({self.sql}) AS page{where} ORDER BY {keys} LIMIT :page_limit", params
+
+    def next_position(self, position: Dict[str, Any], rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        if self.order_by:
+            return {"after": [rows[-1][column] for column in self.order_by]}
+        return {"offset": position.get("offset", 0) + len(rows)}
+
+    def bind(self, query: str) -> Optional["SQLPlan"]:
+        """The same statement with slot values taken from ``query``; None if one is missing."""
+        tokens = query.lower()
+        params = dict(self.params)
+        for name, keyword in self.slots.items():
+            value = extract_value(tokens, keyword)
+            if not value:
+                return None
+            params[name] = f"%{value}%"
+        return replace(self, params=params)
+
+
+@dataclass(frozen=True)
+class CachedPlan:
+    query_type: QueryType
+    # None when the query produced no SQL (or is document-only).
+    plan: Optional[SQLPlan]
+
+
+def extract_value(tokens: str, keyword: str) -> str:
+    """The word following ``keyword`` in ``tokens``."""
+    if keyword not in tokens:
+        return ""
+    parts = tokens.split(keyword, 1)[1].split()
+    return parts[0] if parts else ""
+
+
+def mentions(text: str, *phrases: str) -> bool:
+    """Whether any of ``phrases`` appears in ``text`` as whole words."""
+    return any(re.search(rf"\b{re.escape(phrase)}\b", text) for phrase in phrases)
+
+
+def query_template(query: str) -> str:
+    """Lowercased, whitespace-collapsed ``query`` with slot values replaced by ``{keyword}``."""
+    template = " ".join(query.lower().split())
+    for keyword in SLOT_KEYWORDS:
+        value = extract_value(template, keyword)
+        if value:
+            head, rest = template.split(keyword, 1)
+            template = head + keyword + rest.replace(value, "{" + keyword + "}", 1)
+    return template
+
+
+def schema_fingerprint(schema: Dict[str, Any]) -> str:
+    """Digest of table columns, their types and primary keys; changes when discovery finds a new shape.
+
+    Primary keys decide how plans page, so a changed key invalidates plans too.
+    """
+    shape = {
+        table: {
+            "columns": [(column["name"], column["type"]) for column in details.get("columns", [])],
+            "primary_key": list(details.get("primary_key", [])),
+        }
+        for table, details in schema.get("tables", {}).items()
+    }
+    return hashlib.sha256(json.dumps(shape, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _encode_cursor_value(value: Any) -> Dict[str, str]:
+    for name, kinds, to_text, _ in CURSOR_TYPES:
+        if isinstance(value, kinds):
+            return {"$type": name, "value": to_text(value)}
+    raise TypeError(f"{type(value).__name__} values cannot be stored in a cursor")
+
+
+def _decode_cursor_value(payload: Dict[str, Any]) -> Any:
+    if set(payload) != {"$type", "value"}:
+        return payload
+    for name, _, _, parse in CURSOR_TYPES:
+        if payload["$type"] == name:
+            return parse(payload["value"])
+    raise ValueError(f"Unknown cursor value type '{payload['$type']}'")
+
+
+def encode_cursor(plan: SQLPlan, position: Dict[str, Any]) -> str:
+    """Opaque token for ``position``; key values keep their Python type when decoded."""
+    payload = json.dumps({"plan": plan.signature, **position}, default=_encode_cursor_value)
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(plan: SQLPlan, token: str) -> Dict[str, Any]:
+    """The page position in ``token``; ValueError if it is malformed or from another query."""
+    try:
+        payload = json.loads(
+            base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)), object_hook=_decode_cursor_value
+        )
+    except (ValueError, TypeError) as exc:
+        raise ValueError("Malformed cursor") from exc
+    if not isinstance(payload, dict) or payload.pop("plan", None) != plan.signature:
+        raise ValueError("Cursor does not match this query")
+    return payload
+
+
+@lru_cache(maxsize=256)
+def compiled_statement(sql: str) -> TextClause:
+    """One ``text()`` construct per statement shape; values are bound at execution."""
+    return text(sql)
+
+
 @dataclass
 class QueryEngine:
     connection_string: str
     schema_discovery: SchemaDiscovery
     cache: QueryCache
     document_processor: DocumentProcessor
+    query_embedder: Optional[QueryEmbeddingService] = None
+    query_embedding_cache: Optional[EmbeddingLRU] = None
+    plan_cache: Optional[PlanCache] = None
+    page_size: int = 100
 
     schema: Optional[Dict[str, Any]] = None
+    schema_fingerprint: Optional[str] = None
 
     async def initialize(self) -> Dict[str, Any]:
         self.schema = await self.schema_discovery.analyze_database(self.connection_string)
+        fingerprint = schema_fingerprint(self.schema)
+        if self.plan_cache is not None:
+            # Plans from any other schema can no longer hit; drop them now.
+            self.plan_cache.retain(fingerprint)
+        self.schema_fingerprint = fingerprint
         return self.schema
 
-    async def process_query(self, user_query: str) -> Dict[str, Any]:
+    async def process_query(
+        self,
+        user_query: str,
+        document_filters: Optional[Dict[str, str]] = None,
+        cursor: Optional[str] = None,
+        page_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Answer ``user_query``; SQL rows come one page at a time, resumed with ``cursor``."""
+        document_filters = {k: v for k, v in (document_filters or {}).items() if v}
+        page_size = page_size or self.page_size
         cache_key = user_query.strip().lower()
+        if document_filters:
+            cache_key += "|" + "|".join(f"{k}={v}" for k, v in sorted(document_filters.items()))
+        cache_key += f"|page={page_size}|{cursor or ''}"
         cached = self.cache.get(cache_key)
         if cached is not None:
             logger.info("Cache hit for query '%s'", user_query)
@@ -48,26 +270,31 @@ class QueryEngine:
             await self.initialize()
 
         start = time.perf_counter()
-        query_type = self._classify_query(user_query)
+        plan_key, cached_plan, query_type = self._lookup_plan(user_query)
 
         sql_task = (
-            self._run_sql_query(user_query)
+            self._run_sql_query(user_query, cached_plan, cursor=cursor, page_size=page_size)
             if query_type in {QueryType.SQL, QueryType.HYBRID}
             else self._empty_sql_result()
         )
         doc_task = (
-            self._run_document_query(user_query)
+            self._run_document_query(user_query, **document_filters)
             if query_type in {QueryType.DOCUMENT, QueryType.HYBRID}
             else self._empty_doc_result()
         )
 
         sql_result, doc_result = await asyncio.gather(sql_task, doc_task)
+        # Document-only queries cache just their classification.
+        template_plan = sql_result.pop("template", None) if sql_result else None
+        self._store_plan(plan_key, cached_plan, query_type, template_plan)
 
         elapsed = time.perf_counter() - start
         response = {
             "query": user_query,
             "query_type": query_type.value,
             "sql": sql_result.get("sql") if sql_result else None,
+            "sql_plan": sql_result.get("plan") if sql_result else None,
+            "next_cursor": sql_result.get("next_cursor") if sql_result else None,
             "table_results": sql_result.get("rows") if sql_result else [],
             "document_results": doc_result.get("documents") if doc_result else [],
             "performance": {
@@ -75,12 +302,86 @@ class QueryEngine:
                 "cache_hit": False,
                 "rows_returned": len(sql_result.get("rows", [])) if sql_result else 0,
                 "documents_returned": len(doc_result.get("documents", [])) if doc_result else 0,
+                "embedding_cache_hit": doc_result.get("embedding_cache_hit") if doc_result else None,
+                "plan_cache_hit": cached_plan is not None,
+                "plan_cache_hit_rate": (
+                    round(self.plan_cache.hit_rate, 3) if self.plan_cache is not None else None
+                ),
+                "embedding_cache_hit_rate": (
+                    round(self.query_embedding_cache.hit_rate, 3) if self.query_embedding_cache is not None else None
+                ),
             },
         }
 
         self.cache.set(cache_key, response.copy())
         return response
 
+    async def stream_query(
+        self,
+        user_query: str,
+        document_filters: Optional[Dict[str, str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield the plan, then every SQL row as the database produces it, then document hits.
+
+        SQL rows are read through a server-side cursor, so the full result
+        set is never held in memory.
+        """
+        if not self.schema:
+            await self.initialize()
+        plan_key, cached_plan, query_type = self._lookup_plan(user_query)
+
+        plan: Optional[SQLPlan] = None
+        rejected = None
+        template_plan: Any = None
+        if query_type in {QueryType.SQL, QueryType.HYBRID}:
+            prepared = await self._prepare_plan(user_query, cached_plan)
+            plan, rejected, template_plan = prepared["plan"], prepared.get("rejected"), prepared["template"]
+        self._store_plan(plan_key, cached_plan, query_type, template_plan)
+        yield {
+            "type": "plan",
+            "query": user_query,
+            "query_type": query_type.value,
+            "sql": plan.sql if plan is not None else None,
+            "sql_plan": plan.describe() if plan is not None else rejected,
+        }
+
+        rows = 0
+        if plan is not None:
+            engine = self._sql_engine()
+            async with engine.connect() as conn:
+                result = await conn.stream(compiled_statement(plan.sql), plan.params)
+                async for row in result:
+                    rows += 1
+                    yield {"type": "row", "data": dict(row._mapping)}
+
+        documents = 0
+        if query_type in {QueryType.DOCUMENT, QueryType.HYBRID}:
+            filters = {k: v for k, v in (document_filters or {}).items() if v}
+            for document in (await self._run_document_query(user_query, **filters))["documents"]:
+                documents += 1
+                yield {"type": "document", "data": document}
+        yield {"type": "end", "rows_returned": rows, "documents_returned": documents}
+
+    def _lookup_plan(self, user_query: str) -> Tuple[Tuple[str, str], Optional[CachedPlan], QueryType]:
+        """Plan cache key, cached entry (if any) and query type for ``user_query``."""
+        template = query_template(user_query)
+        plan_key = (template, self.schema_fingerprint or "")
+        cached_plan = self.plan_cache.get(plan_key) if self.plan_cache is not None else None
+        # Classified from the template so a slot value cannot change what is cached.
+        query_type = cached_plan.query_type if cached_plan is not None else self._classify_query(template)
+        return plan_key, cached_plan, query_type
+
+    def _store_plan(
+        self,
+        plan_key: Tuple[str, str],
+        cached_plan: Optional[CachedPlan],
+        query_type: QueryType,
+        template_plan: Any,
+    ) -> None:
+        """Cache ``template_plan`` (None meaning "no SQL") after a miss; False caches nothing."""
+        if cached_plan is None and self.plan_cache is not None and template_plan is not False:
+            self.plan_cache.set(plan_key, CachedPlan(query_type=query_type, plan=template_plan))
+
     def _classify_query(self, query: str) -> QueryType:
         q = query.lower()
         doc_keywords = {"document", "resume", "policy", "review"}
@@ -95,34 +396,105 @@ class QueryEngine:
             return QueryType.DOCUMENT
         return QueryType.SQL
 
-    async def _run_sql_query(self, query: str) -> Dict[str, Any]:
+    async def _run_sql_query(
+        self,
+        query: str,
+        cached: Optional[CachedPlan] = None,
+        cursor: Optional[str] = None,
+        page_size: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """Execute one page of the SQL for ``query``; ``template`` is the plan worth caching."""
+        prepared = await self._prepare_plan(query, cached)
+        plan = prepared["plan"]
+        if plan is None:
+            return {"sql": None, "rows": [], "plan": prepared.get("rejected"), "template": prepared["template"]}
+        page = await self._execute_page(plan, cursor, page_size or self.page_size)
+        return {**page, "template": prepared["template"]}
+
+    async def _prepare_plan(self, query: str, cached: Optional[CachedPlan] = None) -> Dict[str, Any]:
+        """Bound plan for ``query``, from ``cached`` when possible.
+
+        ``template`` is the plan to cache (None caches "no SQL"), or False
+        when nothing should be cached: the cached plan was used, or the new
+        one was rejected.
+        """
         if not self.schema:
             raise RuntimeError("Schema not initialized")
 
-        mapping = await self.schema_discovery.map_natural_language_to_schema(query, self.schema)
-        primary_table = mapping.get("primary_table")
-        if not primary_table:
-            return {"sql": None, "rows": []}
-
-        statement = self._generate_sql(query, mapping)
-        if not statement:
-            return {"sql": None, "rows": []}
-
+        if cached is not None:
+            if cached.plan is None:
+                return {"plan": None, "template": False}
+            plan = cached.plan.bind(query)
+            if plan is not None:
+                return {"plan": plan, "template": False}
+
+        # The statement is planned from the template, with slot values as
+        # placeholders, so every query sharing the template gets the same
+        # shape; only the values are bound from ``query``.
+        template = query_template(query)
+        mapping = await self.schema_discovery.map_natural_language_to_schema(template, self.schema)
+        template_plan = self._plan_sql(template, mapping)
+        if template_plan is None:
+            return {"plan": None, "template": None}
+        plan = template_plan.bind(query)
+        if plan is None:
+            return {"plan": None, "template": False}
+        try:
+            self._validate_plan(plan)
+        except ValueError as exc:
+            logger.warning("Rejected SQL plan for '%s': %s", query, exc)
+            return {"plan": None, "template": False, "rejected": {**plan.describe(), "rejected": str(exc)}}
+        return {"plan": plan, "template": template_plan if cached is None else False}
+
+    def _sql_engine(self) -> Any:
         engine = self.schema_discovery.db.engine
         if engine is None:
             raise RuntimeError("Database engine unavailable")
-
-        async with engine.connect() as conn:
-            result = await conn.execute(text(statement["sql"]), statement["params"])
+        return engine
+
+    async def _execute_page(self, plan: SQLPlan, cursor: Optional[str], page_size: int) -> Dict[str, Any]:
+        position = decode_cursor(plan, cursor) if cursor else {}
+        # One extra row tells whether another page exists.
+        sql, params = plan.page_statement(position, page_size + 1)
+        async with self._sql_engine().connect() as conn:
+            result = await conn.execute(compiled_statement(sql), params)
             rows = [dict(row._mapping) for row in result]
-
-        optimized_sql = self.optimize_sql_query(statement["sql"])
-
-        if optimized_sql != statement["sql"]:
-            async with engine.connect() as conn:
-                result = await conn.execute(text(optimized_sql), statement["params"])
-                rows = [dict(row._mapping) for row in result]
-        return {"sql": optimized_sql, "rows": rows}
+        next_cursor = None
+        if plan.paginated and len(rows) > page_size:
+            rows = rows[:page_size]
+            next_cursor = encode_cursor(plan, plan.next_position(position, rows))
+        return {"sql": sql, "rows": rows, "plan": plan.describe(), "next_cursor": next_cursor}
+
+    def _plan_sql(self, query: str, mapping: Dict[str, Any]) -> Optional[SQLPlan]:
+        """Generate the statement and apply every rewrite before it is executed."""
+        statement = self._generate_sql(query, mapping)
+        if not statement:
+            return None
+        plan = SQLPlan(
+            sql=self.optimize_sql_query(statement["sql"]),
+            params=statement["params"],
+            table=mapping["primary_table"],
+            slots=statement.get("slots", {}),
+            order_by=statement.get("order_by", []),
+            sort_by=statement.get("sort_by", []),
+            paginated=not statement.get("aggregate", False),
+        )
+        if plan.paginated:
+            plan.optimizations.append("keyset_pagination" if plan.order_by else "offset_pagination")
+        return plan
+
+    def _validate_plan(self, plan: SQLPlan) -> None:
+        if not re.match(r"\s*select\b", plan.sql, re.IGNORECASE) or ";" in plan.sql:
+            raise ValueError("only single SELECT statements are executed")
+        if plan.table not in (self.schema or {}).get("tables", {}):
+            raise ValueError(f"unknown table '{plan.table}'")
+        bind_names = set(BIND_PARAMETER.findall(plan.sql))
+        if bind_names != set(plan.params):
+            raise ValueError(
+                f"bind parameters {sorted(bind_names)} do not match values {sorted(plan.params)}"
+            )
+        if plan.paginated and not (plan.order_by or plan.sort_by):
+            raise ValueError("no columns to order pages by")
 
     def _generate_sql(self, query: str, mapping: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         table = mapping.get("primary_table")
@@ -133,24 +505,41 @@ class QueryEngine:
         candidate_columns = mapping.get("candidate_columns", {}).get(table, [])
         selected_columns = [col for col, _ in candidate_columns[:4]] or ["*"]
 
-        if "count" in tokens or "how many" in tokens:
-            return {"sql": f"SELECT COUNT(*) AS count FROM {table}", "params": {} }
+        if mentions(tokens, "count", "how many"):
+            return {"sql": f"SELECT COUNT(*) AS count FROM {table}", "params": {}, "aggregate": True}
 
-        if "average" in tokens or "avg" in tokens:
+        if mentions(tokens, "average", "avg"):
             target_col = self._find_numeric_column(candidate_columns)
             if target_col:
                 return {
                     "sql": f"SELECT AVG({target_col}) AS average_{target_col} FROM {table}",
                     "params": {},
+                    "aggregate": True,
                 }
 
-        where_clause, params = self._build_where_clause(tokens, candidate_columns)
+        # Rows are paged by primary key, so the key has to be selected.
+        table_schema = (self.schema or {}).get("tables", {}).get(table, {})
+        primary_key = table_schema.get("primary_key", [])
+        if selected_columns != ["*"]:
+            selected_columns += [column for column in primary_key if column not in selected_columns]
+        where_clause, params, slots = self._build_where_clause(tokens, candidate_columns)
         column_list = ", ".join(selected_columns)
         sql = f"SELECT {column_list} FROM {table}"
         if where_clause:
             sql += f" WHERE {where_clause}"
-        sql += " LIMIT 100"
-        return {"sql": sql, "params": params}
+        # Keyless tables page by offset, which is only stable under a total order.
+        sort_by = (
+            [column["name"] for column in table_schema.get("columns", [])]
+            if selected_columns == ["*"]
+            else list(selected_columns)
+        )
+        return {
+            "sql": sql,
+            "params": params,
+            "slots": slots,
+            "order_by": list(primary_key),
+            "sort_by": [] if primary_key else sort_by,
+        }
 
     def _find_numeric_column(self, columns: List[Any]) -> Optional[str]:
         numeric_keywords = {"salary", "pay", "compensation", "rate", "amount"}
@@ -159,9 +548,12 @@ class QueryEngine:
                 return name
         return None
 
-    def _build_where_clause(self, tokens: str, columns: List[Any]) -> tuple[str, Dict[str, Any]]:
+    def _build_where_clause(
+        self, tokens: str, columns: List[Any]
+    ) -> tuple[str, Dict[str, Any], Dict[str, str]]:
         filters = []
         params: Dict[str, Any] = {}
+        slots: Dict[str, str] = {}
         for column, _score in columns:
             column_lower = column.lower()
             if column_lower in tokens:
@@ -172,49 +564,120 @@ class QueryEngine:
                     param_name = f"param_{column_lower}_dept"
                     filters.append(f"LOWER({column}) LIKE :{param_name}")
                     params[param_name] = f"%{value.lower()}%"
+                    slots[param_name] = "department"
             elif column_lower in {"role", "position", "title"}:
                 value = self._extract_value(tokens, "role")
                 if value:
                     param_name = f"param_{column_lower}_role"
                     filters.append(f"LOWER({column}) LIKE :{param_name}")
                     params[param_name] = f"%{value.lower()}%"
-        return " AND ".join(filter for filter in filters if filter), params
+                    slots[param_name] = "role"
+        return " AND ".join(filter for filter in filters if filter), params, slots
 
     def _extract_value(self, tokens: str, keyword: str) -> str:
-        if keyword not in tokens:
-            return ""
-        parts = tokens.split(keyword, 1)[1].split()
-        return parts[0] if parts else ""
-
-    async def _run_document_query(self, query: str) -> Dict[str, Any]:
-        embedding = await asyncio.get_event_loop().run_in_executor(
-            None,
-            lambda: self.document_processor.embedding_model.encode(
-                [query],
-                convert_to_numpy=True,
-                normalize_embeddings=True,
-            )[0],
+        return extract_value(tokens, keyword)
+
+    async def _run_document_query(
+        self,
+        query: str,
+        job_id: Optional[str] = None,
+        file_name: Optional[str] = None,
+        doc_type: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        filters = {"job_id": job_id, "file_name": file_name, "doc_type": doc_type}
+        cached_embedding = (
+            self.query_embedding_cache.get(self.document_processor.model_name, query)
+            if self.query_embedding_cache is not None
+            else None
+        )
+        embedding, keyword_hits = await asyncio.gather(
+            self._embed_query(query) if cached_embedding is None else self._cached(cached_embedding),
+            document_store.keyword_search(query, limit=HYBRID_CANDIDATES, **filters),
         )
-        results = await document_store.similarity_search(embedding)
+        if cached_embedding is None and self.query_embedding_cache is not None:
+            self.query_embedding_cache.set(self.document_processor.model_name, query, embedding)
+        keyword_ids = [hit["id"] for hit in keyword_hits]
+
+        if keyword_hits and self._is_keyword_query(query):
+            # Lexically selective queries only score the BM25 candidates.
+            vector_hits = await document_store.similarity_search(
+                embedding, top_k=len(keyword_ids), ids=keyword_ids, **filters
+            )
+            scored = vector_hits
+        else:
+            vector_hits = await document_store.similarity_search(
+                embedding, top_k=HYBRID_CANDIDATES, **filters
+            )
+            seen = {hit["id"] for hit in vector_hits}
+            missing = [row_id for row_id in keyword_ids if row_id not in seen]
+            scored = vector_hits + (
+                await document_store.similarity_search(
+                    embedding, top_k=len(missing), ids=missing, **filters
+                )
+                if missing
+                else []
+            )
+
+        similarity = {hit["id"]: hit["similarity"] for hit in scored}
+        results = reciprocal_rank_fusion([vector_hits, keyword_hits])[:DOCUMENT_TOP_K]
         documents = [
             {
                 "file_name": item["file_name"],
                 "chunk_index": item["chunk_index"],
                 "content": item["content"],
-                "similarity": round(item["similarity"], 3),
+                "similarity": round(similarity.get(item["id"], 0.0), 3),
             }
             for item in results
         ]
-        return {"documents": documents}
+        return {"documents": documents, "embedding_cache_hit": cached_embedding is not None}
+
+    @staticmethod
+    async def _cached(value: Any) -> Any:
+        return value
+
+    async def _embed_query(self, query: str) -> Any:
+        if self.query_embedder is not None:
+            return await self.query_embedder.embed(query)
+        return await self.document_processor.encode_executor.run(
+            lambda: self.document_processor.embedding_model.encode(
+                [query],
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+            )[0],
+            priority=QUERY,
+        )
+
+    @staticmethod
+    def _is_keyword_query(query: str) -> bool:
+        """Identifiers, numbers and quoted phrases are better served lexically."""
+        if re.search(r'"[^"]+"', query):
+            return True
+        return any(
+            re.search(r"\d", token) or re.search(r"\w[-_/]\w", token)
+            for token in query.split()
+        )
 
     def optimize_sql_query(self, sql: str) -> str:
-        optimized = sql.strip()
-        if "limit" not in optimized.lower():
-            optimized += " LIMIT 100"
-        return optimized
+        # Row counts are bounded by pagination, not by a fixed LIMIT.
+        return " ".join(sql.split()).rstrip(";")
 
     async def _empty_sql_result(self) -> Dict[str, Any]:
         return {"sql": None, "rows": []}
 
     async def _empty_doc_result(self) -> Dict[str, Any]:
         return {"documents": []}
+
+
+def reciprocal_rank_fusion(
+    result_lists: Sequence[Sequence[Dict[str, Any]]],
+    k: int = RRF_K,
+) -> List[Dict[str, Any]]:
+    """Merge ranked lists by summing ``1 / (k + rank)`` per document id."""
+    scores: Dict[int, float] = {}
+    items: Dict[int, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, item in enumerate(results, start=1):
+            scores[item["id"]] = scores.get(item["id"], 0.0) + 1.0 / (k + rank)
+            items.setdefault(item["id"], item)
+    ranked = sorted(scores, key=scores.__getitem__, reverse=True)
+    return [{**items[row_id], "rrf_score": scores[row_id]} for row_id in ranked]
@@ -45,8 +45,11 @@ class SchemaDiscovery:
                                 "nullable": column.get("nullable", True),
                             }
                         )
+                    primary_key = inspector.get_pk_constraint(table_name) or {}
                     schema["tables"][table_name] = {
                         "columns": columns,
+                        # Orders keyset-paginated results; empty when the table has none.
+                        "primary_key": list(primary_key.get("constrained_columns") or []),
                         "sample_rows": [],
                     }
 
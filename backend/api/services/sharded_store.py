@@ -0,0 +1,335 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import logging
+import re
+import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from .document_store import DB_PATH, DocumentChunk, DocumentStore
+
+logger = logging.getLogger(__name__)
+
+PARTITIONS = {"hash", "job"}
+# Row ids handed out by the sharded store encode the shard: local_id * stride + shard.
+SHARD_ID_STRIDE = 1_024
+
+
+def encode_id(shard: int, local_id: int) -> int:
+    return local_id * SHARD_ID_STRIDE + shard
+
+
+def decode_id(row_id: int) -> Tuple[int, int]:
+    local_id, shard = divmod(int(row_id), SHARD_ID_STRIDE)
+    return shard, local_id
+
+
+class ShardedDocumentStore:
+    """Partitions chunks across N :class:`DocumentStore` files and fans out searches.
+
+    Shard 0 lives at ``db_path`` so a single-shard deployment keeps its
+    existing index; shard ``i`` uses ``<stem>.shard-<i>.db``. New chunks are
+    routed by ``partition`` (``hash`` of job and file name, or ``job``), and
+    every search runs on all shards concurrently on a shared thread pool,
+    where the numpy scans release the GIL, before the per-shard top-k lists
+    are merged. Shard files beyond the configured count stay searchable until
+    :meth:`rebalance` moves their chunks, vectors included, to their routed
+    shard.
+    """
+
+    def __init__(
+        self,
+        db_path: Path = DB_PATH,
+        shards: int = 1,
+        partition: str = "hash",
+        **store_options: Any,
+    ) -> None:
+        self.db_path = db_path
+        self._store_options = store_options
+        self._stores: Dict[int, DocumentStore] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._init_lock = asyncio.Lock()
+        self._initialized = False
+        self.configure(shards=shards, partition=partition)
+
+    def configure(
+        self,
+        shards: Optional[int] = None,
+        partition: Optional[str] = None,
+        **store_options: Any,
+    ) -> None:
+        """Set the shard layout and forward index options to every shard."""
+        if shards is not None:
+            if not 1 <= shards <= SHARD_ID_STRIDE:
+                raise ValueError(f"Shard count must be between 1 and {SHARD_ID_STRIDE}")
+            self.shards = shards
+        if partition is not None:
+            if partition not in PARTITIONS:
+                raise ValueError(f"Unsupported partition '{partition}'. Supported: {sorted(PARTITIONS)}")
+            self.partition = partition
+        if store_options:
+            self._store_options.update(store_options)
+            for store in self._stores.values():
+                store.configure(**self._shard_config())
+
+    def _shard_config(self) -> Dict[str, Any]:
+        keys = ("index_mode", "nlist", "nprobe", "quantization", "rescore_factor")
+        return {key: self._store_options[key] for key in keys if key in self._store_options}
+
+    def shard_path(self, shard: int) -> Path:
+        if shard == 0:
+            return self.db_path
+        return self.db_path.with_name(f"{self.db_path.stem}.shard-{shard:02d}{self.db_path.suffix}")
+
+    def _existing_shards(self) -> List[int]:
+        pattern = re.compile(rf"{re.escape(self.db_path.stem)}\.shard-(\d+){re.escape(self.db_path.suffix)}$")
+        found = []
+        for path in self.db_path.parent.glob(f"{self.db_path.stem}.shard-*{self.db_path.suffix}"):
+            match = pattern.match(path.name)
+            if match:
+                found.append(int(match.group(1)))
+        return found
+
+    def _shard(self, shard: int) -> DocumentStore:
+        store = self._stores.get(shard)
+        if store is None:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=max(self.shards, 2), thread_name_prefix="shard-search"
+                )
+            store = DocumentStore(
+                db_path=self.shard_path(shard),
+                search_executor=self._executor,
+                **self._store_options,
+            )
+            self._stores[shard] = store
+        return store
+
+    def _all_shards(self) -> List[Tuple[int, DocumentStore]]:
+        for shard in range(self.shards):
+            self._shard(shard)
+        return sorted(self._stores.items())
+
+    def route(self, job_id: str, file_name: str) -> int:
+        """Shard that new chunks of ``file_name`` in ``job_id`` are written to."""
+        key = job_id if self.partition == "job" else f"{job_id}/{file_name}"
+        return zlib.crc32(key.encode("utf-8")) % self.shards
+
+    async def initialize(self) -> None:
+        async with self._init_lock:
+            if self._initialized:
+                return
+            extra = [shard for shard in self._existing_shards() if shard >= self.shards]
+            for shard in extra:
+                self._shard(shard)
+            if extra:
+                logger.warning(
+                    "Shards %s exceed the configured %d shards; POST /api/documents/rebalance to drain them",
+                    extra,
+                    self.shards,
+                )
+            await asyncio.gather(*(store.initialize() for _, store in self._all_shards()))
+            self._initialized = True
+
+    def close(self) -> None:
+        for store in self._stores.values():
+            store.close()
+        self._stores = {}
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        self._initialized = False
+
+    async def add_chunks(self, job_id: str, chunks: List[DocumentChunk]) -> None:
+        if not self._initialized:
+            await self.initialize()
+        by_shard: Dict[int, List[DocumentChunk]] = {}
+        for chunk in chunks:
+            by_shard.setdefault(self.route(job_id, chunk.file_name), []).append(chunk)
+        await asyncio.gather(
+            *(self._shard(shard).add_chunks(job_id, shard_chunks) for shard, shard_chunks in by_shard.items())
+        )
+
+    async def similarity_search(
+        self,
+        embedding: Sequence[float],
+        top_k: int = 5,
+        exact: bool = False,
+        nprobe: Optional[int] = None,
+        job_id: Optional[str] = None,
+        file_name: Optional[str] = None,
+        doc_type: Optional[str] = None,
+        ids: Optional[Sequence[int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Top ``top_k`` chunks across all shards; see :meth:`DocumentStore.similarity_search`."""
+        if not self._initialized:
+            await self.initialize()
+        local_ids = self._split_ids(ids)
+        searches = [
+            (
+                shard,
+                store.similarity_search(
+                    embedding,
+                    top_k=top_k,
+                    exact=exact,
+                    nprobe=nprobe,
+                    job_id=job_id,
+                    file_name=file_name,
+                    doc_type=doc_type,
+                    ids=None if local_ids is None else local_ids[shard],
+                ),
+            )
+            for shard, store in self._all_shards()
+            if local_ids is None or local_ids.get(shard)
+        ]
+        if not searches:
+            return []
+        return self._merge(await self._gather(searches), "similarity", top_k)
+
+    async def keyword_search(
+        self,
+        query: str,
+        limit: int = 20,
+        job_id: Optional[str] = None,
+        file_name: Optional[str] = None,
+        doc_type: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """BM25 hits merged across shards (scores use per-shard term statistics)."""
+        if not self._initialized:
+            await self.initialize()
+        searches = [
+            (
+                shard,
+                store.keyword_search(query, limit=limit, job_id=job_id, file_name=file_name, doc_type=doc_type),
+            )
+            for shard, store in self._all_shards()
+        ]
+        return self._merge(await self._gather(searches), "bm25", limit)
+
+    @staticmethod
+    def _split_ids(ids: Optional[Sequence[int]]) -> Optional[Dict[int, List[int]]]:
+        if ids is None:
+            return None
+        local: Dict[int, List[int]] = {}
+        for row_id in ids:
+            shard, local_id = decode_id(row_id)
+            local.setdefault(shard, []).append(local_id)
+        return local
+
+    @staticmethod
+    async def _gather(searches: List[Tuple[int, Any]]) -> List[List[Dict[str, Any]]]:
+        results = await asyncio.gather(*(search for _, search in searches))
+        return [
+            [{**hit, "id": encode_id(shard, hit["id"])} for hit in hits]
+            for (shard, _), hits in zip(searches, results)
+        ]
+
+    @staticmethod
+    def _merge(per_shard: List[List[Dict[str, Any]]], score: str, limit: int) -> List[Dict[str, Any]]:
+        return heapq.nlargest(limit, (hit for hits in per_shard for hit in hits), key=lambda hit: hit[score])
+
+    async def delete_documents(
+        self,
+        job_id: Optional[str] = None,
+        file_name: Optional[str] = None,
+    ) -> int:
+        if job_id is None and file_name is None:
+            raise ValueError("Deleting documents requires a job_id or file_name")
+        if not self._initialized:
+            await self.initialize()
+        deleted = await asyncio.gather(
+            *(store.delete_documents(job_id=job_id, file_name=file_name) for _, store in self._all_shards())
+        )
+        return sum(deleted)
+
+    async def record_file(self, job_id: str, file_name: str, content_hash: str) -> None:
+        if not self._initialized:
+            await self.initialize()
+        await self._shard(self.route(job_id, file_name)).record_file(job_id, file_name, content_hash)
+
+    async def file_versions(self, file_name: str) -> List[Tuple[str, Optional[str]]]:
+        if not self._initialized:
+            await self.initialize()
+        per_shard = await asyncio.gather(*(store.file_versions(file_name) for _, store in self._all_shards()))
+        return [version for versions in per_shard for version in versions]
+
+    @property
+    def compaction_running(self) -> bool:
+        return any(store.compaction_running for store in self._stores.values())
+
+    async def compact(self) -> Dict[str, Any]:
+        if not self._initialized:
+            await self.initialize()
+        summaries = await asyncio.gather(*(store.compact() for _, store in self._all_shards()))
+        return {
+            "live_rows": sum(summary["live_rows"] for summary in summaries),
+            "reclaimed_rows": sum(summary["reclaimed_rows"] for summary in summaries),
+        }
+
+    async def convert_storage(self, quantization: str) -> None:
+        if not self._initialized:
+            await self.initialize()
+        await asyncio.gather(*(store.convert_storage(quantization) for _, store in self._all_shards()))
+        self._store_options["quantization"] = quantization
+
+    def stats(self) -> Dict[str, Any]:
+        shards = [{"shard": shard, **store.stats()} for shard, store in self._all_shards()]
+        live = sum(shard["live_rows"] for shard in shards)
+        dead = sum(shard["dead_rows"] for shard in shards)
+        return {
+            "live_rows": live,
+            "dead_rows": dead,
+            "dead_fraction": dead / (live + dead) if live + dead else 0.0,
+            "shards": shards,
+        }
+
+    async def rebalance(self) -> Dict[str, int]:
+        """Move chunks whose shard no longer matches :meth:`route`.
+
+        Embeddings are copied from the source shard's segment files, so
+        nothing is re-embedded. Each file is added to its target before it is
+        deleted from its source; shard files beyond the configured count are
+        removed once drained.
+        """
+        if not self._initialized:
+            await self.initialize()
+        moved_files = moved_chunks = 0
+        for shard, store in self._all_shards():
+            for job_id, file_name in await store.document_groups():
+                target = self.route(job_id, file_name)
+                if target == shard:
+                    continue
+                exported = await store.export_chunks(job_id=job_id, file_name=file_name)
+                await self._shard(target).add_chunks(job_id, [chunk for _, chunk in exported])
+                for version_job, content_hash in await store.file_versions(file_name):
+                    if version_job == job_id and content_hash is not None:
+                        await self._shard(target).record_file(job_id, file_name, content_hash)
+                await store.delete_documents(job_id=job_id, file_name=file_name)
+                moved_files += 1
+                moved_chunks += len(exported)
+
+        for shard in [shard for shard in self._stores if shard >= self.shards]:
+            self._remove_shard(shard)
+        if moved_chunks:
+            logger.info("Rebalanced %d chunks from %d files across %d shards", moved_chunks, moved_files, self.shards)
+        return {"moved_files": moved_files, "moved_chunks": moved_chunks}
+
+    def _remove_shard(self, shard: int) -> None:
+        store = self._stores.pop(shard)
+        store.close()
+        for path in (
+            store.db_path,
+            store.db_path.with_name(store.db_path.name + "-wal"),
+            store.db_path.with_name(store.db_path.name + "-shm"),
+            store.ann_index_path,
+        ):
+            path.unlink(missing_ok=True)
+        shutil.rmtree(store.segments_dir, ignore_errors=True)
+        logger.info("Removed drained shard %d", shard)
+
+
+document_store = ShardedDocumentStore()
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, InvalidStateError
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def transaction(conn: sqlite3.Connection) -> Iterator[sqlite3.Connection]:
+    """Explicit transaction for connections opened with ``isolation_level=None``."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+
+
+@dataclass
+class _WriteOp:
+    fn: Callable[[sqlite3.Connection], Any]
+    grouped: bool
+    future: Future = field(default_factory=Future)
+
+
+class SQLiteWriter:
+    """Dedicated thread owning the only write connection to a WAL database.
+
+    Grouped operations that queue up while a commit is in flight are run
+    together, each inside its own savepoint, and committed once. A failing
+    operation only rolls back its own savepoint. Ungrouped operations run
+    alone and manage their own transactions (see :func:`transaction`).
+    """
+
+    def __init__(self, db_path: Path, max_batch: int = 64) -> None:
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Optional[_WriteOp]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f"sqlite-writer:{self.db_path.name}", daemon=True
+                )
+                self._thread.start()
+
+    def close(self) -> None:
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+
+    def submit(self, fn: Callable[[sqlite3.Connection], Any], grouped: bool = True) -> Future:
+        self.start()
+        op = _WriteOp(fn=fn, grouped=grouped)
+        self._queue.put(op)
+        return op.future
+
+    def _run(self) -> None:
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        deferred: Optional[_WriteOp] = None
+        try:
+            while True:
+                op = deferred if deferred is not None else self._queue.get()
+                deferred = None
+                if op is None:
+                    break
+                if not op.grouped:
+                    self._run_single(conn, op)
+                    continue
+
+                batch: List[_WriteOp] = [op]
+                while len(batch) < self.max_batch:
+                    try:
+                        queued = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if queued is None or not queued.grouped:
+                        deferred = queued
+                        break
+                    batch.append(queued)
+                self._run_batch(conn, batch)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _run_single(conn: sqlite3.Connection, op: _WriteOp) -> None:
+        # A waiter that gave up cancels its future; its write is skipped.
+        if not op.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = op.fn(conn)
+        except BaseException as exc:  # noqa: BLE001
+            _resolve(op.future, False, exc)
+        else:
+            _resolve(op.future, True, result)
+
+    @staticmethod
+    def _run_batch(conn: sqlite3.Connection, batch: List[_WriteOp]) -> None:
+        batch = [op for op in batch if op.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        outcomes: List[tuple[bool, Any]] = []
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for op in batch:
+                conn.execute("SAVEPOINT write_op")
+                try:
+                    outcomes.append((True, op.fn(conn)))
+                    conn.execute("RELEASE write_op")
+                except Exception as exc:  # noqa: BLE001
+                    conn.execute("ROLLBACK TO write_op")
+                    conn.execute("RELEASE write_op")
+                    outcomes.append((False, exc))
+            conn.execute("COMMIT")
+        except Exception as exc:  # noqa: BLE001
+            logger.exception("Group commit of %d writes failed", len(batch))
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            outcomes = [(False, exc)] * len(batch)
+
+        for op, (ok, value) in zip(batch, outcomes):
+            _resolve(op.future, ok, value)
+
+
+def _resolve(future: Future, ok: bool, value: Any) -> None:
+    """Set a write's outcome without letting one bad future stop the writer thread."""
+    try:
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+    except InvalidStateError:
+        logger.warning("Dropped the result of a write whose future was already resolved")
+
+
+class SQLiteReaderPool:
+    """Small pool of read-only connections shared by search threads."""
+
+    def __init__(self, db_path: Path, size: int = 4) -> None:
+        self.db_path = db_path
+        self.size = size
+        self._pool: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            f"{self.db_path.resolve().as_uri()}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+        )
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                create = self._created < self.size
+                if create:
+                    self._created += 1
+            if not create:
+                conn = self._pool.get()
+            else:
+                try:
+                    conn = self._connect()
+                except sqlite3.Error:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    def close(self) -> None:
+        with self._lock:
+            while True:
+                try:
+                    self._pool.get_nowait().close()
+                except queue.Empty:
+                    break
+            self._created = 0
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def spherical_kmeans(
+    vectors: np.ndarray,
+    n_clusters: int,
+    iterations: int = 20,
+    seed: int = 0,
+) -> np.ndarray:
+    """Cluster unit vectors by cosine similarity and return unit centroids."""
+    rng = np.random.default_rng(seed)
+    n_clusters = min(n_clusters, len(vectors))
+    centroids = vectors[rng.choice(len(vectors), size=n_clusters, replace=False)].copy()
+
+    for _ in range(iterations):
+        assignments = np.argmax(vectors @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignments, vectors)
+        counts = np.bincount(assignments, minlength=n_clusters)
+
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters with random points so nlist stays intact.
+            sums[empty] = vectors[rng.choice(len(vectors), size=int(empty.sum()))]
+
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        updated = (sums / norms).astype(np.float32)
+        if np.allclose(updated, centroids, atol=1e-6):
+            break
+        centroids = updated
+    return centroids
+
+
+class IVFIndex:
+    """Inverted-file (IVF-flat) index over the rows of a normalized matrix.
+
+    The index stores only a coarse-cluster assignment per matrix row; the
+    vectors themselves stay in the caller's matrix, so probing a list means
+    gathering and scoring exactly those rows.
+    """
+
+    def __init__(
+        self,
+        nlist: Optional[int] = None,
+        train_threshold: int = 1_024,
+        retrain_growth: float = 4.0,
+        max_training_rows: int = 50_000,
+    ) -> None:
+        self.nlist = nlist
+        self.train_threshold = train_threshold
+        self.retrain_growth = retrain_growth
+        self.max_training_rows = max_training_rows
+        self.centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._trained_size = 0
+        self._lists: Optional[tuple[np.ndarray, np.ndarray]] = None
+
+    @property
+    def trained(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def size(self) -> int:
+        return len(self._assignments)
+
+    def sync(self, vectors: np.ndarray) -> bool:
+        """Bring the index up to date with ``vectors``; returns True if it changed."""
+        total = len(vectors)
+        if total == self.size and self.trained:
+            return False
+
+        if not self.trained:
+            if total < self.train_threshold:
+                return False
+            self._train(vectors)
+        elif total >= self._trained_size * self.retrain_growth:
+            self._train(vectors)
+        else:
+            new_rows = vectors[self.size :]
+            self._assignments = np.concatenate([self._assignments, self._assign(new_rows)])
+            self._lists = None
+        return True
+
+    def _train(self, vectors: np.ndarray) -> None:
+        nlist = self.nlist or max(1, int(np.sqrt(len(vectors))))
+        if len(vectors) > self.max_training_rows:
+            rng = np.random.default_rng(len(vectors))
+            sample = vectors[np.sort(rng.choice(len(vectors), size=self.max_training_rows, replace=False))]
+        else:
+            sample = vectors[:]
+        logger.info("Training IVF index with %d lists on %d vectors", nlist, len(sample))
+        self.centroids = spherical_kmeans(np.ascontiguousarray(sample), nlist)
+        self._assignments = self._assign(vectors)
+        self._trained_size = len(vectors)
+        self._lists = None
+
+    def _assign(self, vectors: np.ndarray, batch_rows: int = 16_384) -> np.ndarray:
+        assert self.centroids is not None
+        parts = [
+            np.argmax(vectors[start : start + batch_rows] @ self.centroids.T, axis=1).astype(np.int32)
+            for start in range(0, len(vectors), batch_rows)
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int32)
+
+    def _inverted_lists(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._lists is None:
+            assert self.centroids is not None
+            order = np.argsort(self._assignments, kind="stable")
+            offsets = np.searchsorted(
+                self._assignments[order], np.arange(len(self.centroids) + 1)
+            )
+            self._lists = (order, offsets)
+        return self._lists
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Row positions stored in the ``nprobe`` lists closest to ``query``."""
+        assert self.centroids is not None
+        order, offsets = self._inverted_lists()
+        nprobe = max(1, min(nprobe, len(self.centroids)))
+        closest = np.argpartition(-(self.centroids @ query), nprobe - 1)[:nprobe]
+        return np.concatenate([order[offsets[c] : offsets[c + 1]] for c in closest])
+
+    def save(self, path: Path, ids: np.ndarray) -> None:
+        if not self.trained:
+            return
+        tmp_path = path.with_name(path.name + ".tmp")
+        with tmp_path.open("wb") as fh:
+            np.savez(
+                fh,
+                centroids=self.centroids,
+                assignments=self._assignments,
+                ids=ids[: self.size],
+                trained_size=np.int64(self._trained_size),
+            )
+        os.replace(tmp_path, path)
+
+    def load(self, path: Path, ids: np.ndarray, dim: Optional[int]) -> bool:
+        """Restore a saved index if it still describes a prefix of ``ids``."""
+        if not path.exists():
+            return False
+        try:
+            with np.load(path) as data:
+                centroids = data["centroids"]
+                assignments = data["assignments"]
+                saved_ids = data["ids"]
+                trained_size = int(data["trained_size"])
+        except (OSError, KeyError, ValueError):
+            logger.warning("Ignoring unreadable IVF index at %s", path)
+            return False
+
+        # Rows deleted since the save are tombstoned (-1) and still line up.
+        current = ids[: len(saved_ids)]
+        live = current >= 0
+        if (
+            centroids.shape[1] != dim
+            or len(current) != len(saved_ids)
+            or not np.array_equal(saved_ids[live], current[live])
+        ):
+            logger.info("IVF index at %s is stale; it will be retrained", path)
+            return False
+
+        self.centroids = centroids.astype(np.float32, copy=False)
+        self._assignments = assignments.astype(np.int32, copy=False)
+        self._trained_size = trained_size
+        self._lists = None
+        return True
@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 import yaml
 from pydantic import BaseModel, Field
@@ -22,17 +22,53 @@ class DatabaseConfig(BaseModel):
 class EmbeddingConfig(BaseModel):
     model: str = "sentence-transformers/all-MiniLM-L6-v2"
     batch_size: int = 32
+    # Concurrent query encodes are coalesced into one call within this window.
+    query_max_batch: int = 32
+    query_max_wait_ms: float = 5.0
+    # Dedicated encode threads; query encodes always run before ingestion batches,
+    # which may occupy at most ingestion_workers of them.
+    encode_workers: int = 2
+    ingestion_workers: int = 1
+    torch_threads: Optional[int] = None  # intra-op threads per encode; None keeps torch's default
+
+
+class IngestionConfig(BaseModel):
+    # Processes parsing and chunking files; None uses every core, 0 parses in-process.
+    parse_workers: Optional[int] = None
+    csv_rows_per_chunk: int = 50
+    csv_row_template: Optional[str] = None  # e.g. "{name} works in {department}"
+    max_upload_bytes: int = 512 * 1024 * 1024  # total size of one upload request
 
 
 class CacheConfig(BaseModel):
     ttl_seconds: int = 300
     max_size: int = 1_000
+    embedding_max_size: int = 10_000  # query embeddings kept in memory, LRU
+    plan_max_size: int = 1_000  # NL-to-SQL plans, keyed by query template and schema
+
+
+class QueryConfig(BaseModel):
+    page_size: int = 100  # SQL rows per response page
+    max_page_size: int = 1_000  # larger page_size requests are clamped
+
+
+class VectorIndexConfig(BaseModel):
+    mode: str = "exact"  # "exact" or "ivf"
+    nlist: Optional[int] = None  # IVF lists; defaults to sqrt(corpus size)
+    nprobe: int = 8
+    quantization: str = "none"  # "none", "float16" or "int8"
+    rescore_factor: int = 4  # candidates rescored at full precision per result
+    shards: int = 1  # document_index shard files searched in parallel
+    partition: str = "hash"  # "hash" (job + file name) or "job"
 
 
 class AppConfig(BaseModel):
     database: DatabaseConfig = DatabaseConfig()
     embeddings: EmbeddingConfig = EmbeddingConfig()
+    ingestion: IngestionConfig = IngestionConfig()
     cache: CacheConfig = CacheConfig()
+    query: QueryConfig = QueryConfig()
+    vector_index: VectorIndexConfig = VectorIndexConfig()
 
 
 def _load_yaml(path: Path) -> Dict[str, Any]:
@@ -1,10 +1,11 @@
 import logging
+import os
 from logging.handlers import RotatingFileHandler
 from pathlib import Path
 
 
 def configure_logging(log_level: int = logging.INFO) -> None:
-    logs_dir = Path(__file__).resolve().parents[3] / "logs"
+    logs_dir = Path(os.getenv("APP_LOG_DIR") or Path(__file__).resolve().parents[3] / "logs")
     logs_dir.mkdir(parents=True, exist_ok=True)
 
     log_file = logs_dir / "app.log"
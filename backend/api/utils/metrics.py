@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import threading
+from typing import Dict, List, Sequence, Union
+
+
+class Histogram:
+    """Fixed-bucket histogram; safe to observe from worker threads."""
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float]) -> None:
+        self.name = name
+        self.description = description
+        self.buckets: List[float] = sorted(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def snapshot(self) -> Dict[str, object]:
+        """Cumulative bucket counts keyed by upper bound, plus sum and count."""
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        cumulative: Dict[str, int] = {}
+        running = 0
+        for bound, bucket_count in zip([*map(str, self.buckets), "+Inf"], counts):
+            running += bucket_count
+            cumulative[bound] = running
+        return {"description": self.description, "buckets": cumulative, "sum": total, "count": count}
+
+    def render(self) -> List[str]:
+        snapshot = self.snapshot()
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for bound, count in snapshot["buckets"].items():  # type: ignore[union-attr]
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {count}')
+        lines.append(f"{self.name}_sum {snapshot['sum']}")
+        lines.append(f"{self.name}_count {snapshot['count']}")
+        return lines
+
+
+class Counter:
+    """Monotonic total; safe to increment from worker threads."""
+
+    def __init__(self, name: str, description: str) -> None:
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self) -> float:
+        with self._lock:
+            return self._value
+
+    def snapshot(self) -> Dict[str, object]:
+        return {"description": self.description, "value": self.value}
+
+    def render(self) -> List[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} counter",
+            f"{self.name} {self.value}",
+        ]
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Union[Histogram, Counter]] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float]) -> Histogram:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Histogram(name, description, buckets)
+            return self._metrics[name]  # type: ignore[return-value]
+
+    def counter(self, name: str, description: str) -> Counter:
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = Counter(name, description)
+            return self._metrics[name]  # type: ignore[return-value]
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            registered = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in registered}
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            registered = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return "".join(line + "\n" for metric in registered for line in metric.render())
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,94 @@
+"""Recall/latency benchmark for the IVF index against exact search.
+
+Run from ``backend/``::
+
+    python -m benchmarks.ann_recall --rows 50000 --dim 384 --nprobe 1 4 8 16
+
+Ground truth comes from ``DocumentStore.similarity_search(exact=True)``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from api.services.document_store import DocumentChunk, DocumentStore
+
+
+def clustered_vectors(rows: int, dim: int, clusters: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim))
+    labels = rng.integers(clusters, size=rows)
+    return (centers[labels] + 0.5 * rng.normal(size=(rows, dim))).astype(np.float32)
+
+
+async def load_store(store: DocumentStore, vectors: np.ndarray, batch: int = 5_000) -> None:
+    for start in range(0, len(vectors), batch):
+        chunks = [
+            DocumentChunk(
+                file_name=f"bench-{start // batch}.txt",
+                chunk_index=i,
+                content=f"row {start + i}",
+                embedding=vector,
+                metadata={},
+            )
+            for i, vector in enumerate(vectors[start : start + batch])
+        ]
+        await store.add_chunks("benchmark", chunks)
+
+
+async def run(args: argparse.Namespace) -> None:
+    vectors = clustered_vectors(args.rows, args.dim, args.clusters, args.seed)
+    queries = clustered_vectors(args.queries, args.dim, args.clusters, args.seed + 1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = DocumentStore(
+            db_path=Path(tmp) / "bench.db",
+            index_mode="ivf",
+            nlist=args.nlist,
+            quantization=args.quantization,
+        )
+        started = time.perf_counter()
+        await load_store(store, vectors)
+        print(f"loaded {args.rows} x {args.dim} in {time.perf_counter() - started:.1f}s")
+
+        truth: List[set] = []
+        started = time.perf_counter()
+        for query in queries:
+            results = await store.similarity_search(query, top_k=args.top_k, exact=True)
+            truth.append({r["id"] for r in results})
+        exact_ms = 1000 * (time.perf_counter() - started) / len(queries)
+        print(f"{'exact':>8}  recall@{args.top_k}=1.000  {exact_ms:7.2f} ms/query")
+
+        for nprobe in args.nprobe:
+            hits = 0
+            started = time.perf_counter()
+            for query, expected in zip(queries, truth):
+                results = await store.similarity_search(query, top_k=args.top_k, nprobe=nprobe)
+                hits += len(expected & {r["id"] for r in results})
+            elapsed_ms = 1000 * (time.perf_counter() - started) / len(queries)
+            recall = hits / (args.top_k * len(queries))
+            print(f"nprobe={nprobe:<2}  recall@{args.top_k}={recall:.3f}  {elapsed_ms:7.2f} ms/query")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    parser.add_argument("--quantization", choices=["none", "float16", "int8"], default="none")
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
 import logging
-from pathlib import Path
+import os
 from typing import Any, Dict
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from api.routes import ingestion, query, schema
+from api.routes import ingestion, metrics, query, schema
+from api.services.document_parsing import ParseOptions
 from api.services.document_processor import DocumentProcessor
-from api.services.query_cache import QueryCache
+from api.services.document_store import DATA_DIR
+from api.services.embedding_cache import embedding_cache
+from api.services.embedding_executor import embedding_executor, set_torch_threads
+from api.services.embedding_service import QueryEmbeddingService
+from api.services.job_registry import job_registry
+from api.services.query_cache import EmbeddingLRU, PlanCache, QueryCache
 from api.services.schema_discovery import SchemaDiscovery
+from api.services.sharded_store import document_store
 from api.utils.config import get_config
 from api.utils.logger import configure_logging
 
@@ -30,34 +37,77 @@ app.add_middleware(
 app.include_router(ingestion.router, prefix="/api")
 app.include_router(query.router, prefix="/api")
 app.include_router(schema.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
 
 
 @app.on_event("startup")
 async def startup_event() -> None:
     config = get_config()
+    set_torch_threads(config.embeddings.torch_threads)
+    embedding_executor.configure(
+        workers=config.embeddings.encode_workers,
+        ingestion_workers=config.embeddings.ingestion_workers,
+    )
+    document_store.configure(
+        shards=config.vector_index.shards,
+        partition=config.vector_index.partition,
+        index_mode=config.vector_index.mode,
+        nlist=config.vector_index.nlist,
+        nprobe=config.vector_index.nprobe,
+        quantization=config.vector_index.quantization,
+        rescore_factor=config.vector_index.rescore_factor,
+    )
+    document_processor = DocumentProcessor(
+        model_name=config.embeddings.model,
+        batch_size=config.embeddings.batch_size,
+        parse_workers=(
+            config.ingestion.parse_workers
+            if config.ingestion.parse_workers is not None
+            else os.cpu_count() or 1
+        ),
+        parse_options=ParseOptions(
+            csv_rows_per_chunk=config.ingestion.csv_rows_per_chunk,
+            csv_row_template=config.ingestion.csv_row_template,
+        ),
+    )
     services: Dict[str, Any] = {
         "config": config,
         "schema_discovery": SchemaDiscovery(),
-        "document_processor": DocumentProcessor(
-            model_name=config.embeddings.model,
-            batch_size=config.embeddings.batch_size,
+        "document_processor": document_processor,
+        "query_embedder": QueryEmbeddingService(
+            encode=lambda texts: document_processor.embedding_model.encode(
+                texts, convert_to_numpy=True, normalize_embeddings=True
+            ),
+            max_batch_size=config.embeddings.query_max_batch,
+            max_wait_ms=config.embeddings.query_max_wait_ms,
         ),
         "cache": QueryCache(
             ttl_seconds=config.cache.ttl_seconds,
             max_size=config.cache.max_size,
         ),
+        "query_embedding_cache": EmbeddingLRU(max_size=config.cache.embedding_max_size),
+        "plan_cache": PlanCache(max_size=config.cache.plan_max_size),
         "query_engine": None,
         "query_history": [],
     }
 
-    uploads_dir = Path(__file__).resolve().parents[1] / "data" / "uploads"
+    uploads_dir = DATA_DIR / "uploads"
     uploads_dir.mkdir(parents=True, exist_ok=True)
 
     app.state.services = services
     app.state.uploads_dir = uploads_dir
+    await services["document_processor"].resume_jobs()
     logger.info("Application startup completed")
 
 
 @app.on_event("shutdown")
 async def shutdown_event() -> None:
     logger.info("Shutting down application")
+    services = getattr(app.state, "services", None)
+    if services:
+        services["document_processor"].close()
+        services["query_embedder"].close()
+    document_store.close()
+    embedding_cache.close()
+    embedding_executor.close()
+    job_registry.close()
@@ -1,9 +1,12 @@
 from __future__ import annotations
 
 import asyncio
+import os
 from pathlib import Path
+import shutil
 import sys
-from typing import AsyncIterator, Generator
+import tempfile
+from typing import AsyncIterator, Generator, List
 
 import numpy as np
 import pytest
@@ -16,10 +19,35 @@ for path in (str(ROOT_DIR), str(BACKEND_DIR)):
     if path not in sys.path:
         sys.path.insert(0, path)
 
+# The document store, job registry, uploads and logs are module singletons
+# rooted at these directories on import, so redirect them before the app loads.
+RUNTIME_DIR = Path(tempfile.mkdtemp(prefix="infra-tests-"))
+os.environ["APP_DATA_DIR"] = str(RUNTIME_DIR / "data")
+os.environ["APP_LOG_DIR"] = str(RUNTIME_DIR / "logs")
+
 from api.services.document_processor import DocumentProcessor
+from api.services.embedding_cache import EmbeddingCache
 from backend.main import app
 
 
+class CountingModel:
+    """Embedding model stand-in that records what it was asked to encode."""
+
+    def __init__(self) -> None:
+        self.encoded: List[str] = []
+        self.batches: List[int] = []
+
+    def encode(self, sentences, **kwargs):
+        self.batches.append(len(sentences))
+        self.encoded.extend(sentences)
+        return np.array([[len(sentence), 1.0] for sentence in sentences], dtype=np.float32)
+
+
+@pytest.fixture()
+def counting_model() -> CountingModel:
+    return CountingModel()
+
+
 @pytest.fixture(scope="session")
 def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
     loop = asyncio.new_event_loop()
@@ -27,6 +55,14 @@ def event_loop() -> Generator[asyncio.AbstractEventLoop, None, None]:
     loop.close()
 
 
+@pytest.fixture(scope="session", autouse=True)
+def runtime_dir(event_loop: asyncio.AbstractEventLoop) -> Generator[Path, None, None]:
+    yield RUNTIME_DIR
+    if hasattr(app.state, "services"):
+        event_loop.run_until_complete(app.router.shutdown())
+    shutil.rmtree(RUNTIME_DIR, ignore_errors=True)
+
+
 @pytest_asyncio.fixture(autouse=True)
 async def stub_embeddings(tmp_path: Path) -> AsyncIterator[None]:
     if not hasattr(app.state, "services"):
@@ -38,8 +74,13 @@ async def stub_embeddings(tmp_path: Path) -> AsyncIterator[None]:
         def encode(self, sentences, **kwargs):
             return np.zeros((len(sentences), 8), dtype=np.float32)
 
+    original_cache = processor.embedding_cache
     processor._embedding_model = StubModel()  # type: ignore[attr-defined]
+    # Keep stub vectors out of the persistent embedding cache.
+    processor.embedding_cache = EmbeddingCache(tmp_path / "embedding_cache.db")
     yield
+    processor.embedding_cache.close()
+    processor.embedding_cache = original_cache
     processor._embedding_model = None  # reset
 
 
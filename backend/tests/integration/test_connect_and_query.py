@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import json
 import sqlite3
 from pathlib import Path
 
@@ -28,6 +29,44 @@ async def test_connect_and_run_query(client, tmp_path):
     payload = query_response.json()
     assert payload["query_type"] == "sql"
     assert payload["table_results"][0]["count"] == 3
+    assert payload["sql_plan"]["table"] == "employees"
+    assert payload["sql_plan"]["sql"] == payload["sql"]
+
+
+@pytest.mark.asyncio
+async def test_sql_results_are_paged_and_streamed(client, tmp_path):
+    db_path = tmp_path / "company.db"
+    create_demo_database(db_path)
+    response = await client.post("/api/connect-database", json={"connection_string": f"sqlite:///{db_path}"})
+    assert response.status_code == 200
+    assert response.json()["schema"]["tables"]["employees"]["primary_key"] == ["emp_id"]
+
+    ids, cursor = [], None
+    for _ in range(5):
+        body = {"query": "list employees", "page_size": 2}
+        if cursor:
+            body["cursor"] = cursor
+        page = (await client.post("/api/query", json=body)).json()
+        assert len(page["table_results"]) <= 2
+        ids += [row["emp_id"] for row in page["table_results"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert ids == [1, 2, 3]
+    assert page["sql_plan"]["optimizations"] == ["keyset_pagination"]
+
+    bad = await client.post("/api/query", json={"query": "list employees", "cursor": "not-a-cursor"})
+    assert bad.status_code == 400
+
+    async with client.stream("POST", "/api/query/stream", json={"query": "list employees"}) as stream:
+        assert stream.headers["content-type"].startswith("application/x-ndjson")
+        events = [json.loads(line) async for line in stream.aiter_lines() if line]
+    assert events[0]["type"] == "plan" and events[-1] == {
+        "type": "end",
+        "rows_returned": 3,
+        "documents_returned": 0,
+    }
+    assert [event["data"]["emp_id"] for event in events if event["type"] == "row"] == [1, 2, 3]
 
 
 def create_demo_database(path: Path) -> None:
@@ -50,3 +89,17 @@ def create_demo_database(path: Path) -> None:
         conn.commit()
     finally:
         conn.close()
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_histograms(client):
+    response = await client.get("/api/metrics", params={"format": "json"})
+    assert response.status_code == 200
+    assert "query_embedding_batch_size" in response.json()
+
+    response = await client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE ingestion_parse_seconds histogram" in response.text
+    assert 'query_embedding_batch_size_bucket{le="+Inf"}' in response.text
+    assert "# TYPE ingestion_chunks_total counter" in response.text
@@ -25,3 +25,59 @@ async def test_document_ingestion_flow(client):
         await asyncio.sleep(0.2)
     else:
         pytest.fail("Ingestion job did not complete in time")
+
+    delete_response = await client.delete("/api/documents", params={"job_id": job_id})
+    assert delete_response.status_code == 200
+    assert delete_response.json()["deleted"] >= 1
+
+    assert (await client.delete("/api/documents")).status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_upload_over_size_limit_is_rejected(client, monkeypatch):
+    from backend.main import app
+
+    uploads_dir = app.state.uploads_dir
+    before = set(uploads_dir.iterdir())
+    monkeypatch.setattr(app.state.services["config"].ingestion, "max_upload_bytes", 16)
+    files = [
+        ("files", ("a.txt", b"x" * 10, "text/plain")),
+        ("files", ("b.txt", b"y" * 10, "text/plain")),
+    ]
+    response = await client.post("/api/upload-documents", files=files)
+    assert response.status_code == 413
+    assert set(uploads_dir.iterdir()) == before
+
+
+@pytest.mark.asyncio
+async def test_rebalance_endpoint_refuses_during_compaction(client, monkeypatch):
+    from api.services.sharded_store import ShardedDocumentStore
+
+    response = await client.post("/api/documents/rebalance")
+    assert response.status_code == 200
+    assert set(response.json()) == {"moved_files", "moved_chunks"}
+
+    monkeypatch.setattr(ShardedDocumentStore, "compaction_running", property(lambda self: True))
+    assert (await client.post("/api/documents/rebalance")).status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_same_named_uploads_are_all_ingested(client):
+    files = [
+        ("files", ("report.txt", b"First quarter report", "text/plain")),
+        ("files", ("report.txt", b"Second quarter report", "text/plain")),
+    ]
+    response = await client.post("/api/upload-documents", files=files)
+    assert response.status_code == 200
+    job_id = response.json()["job_id"]
+
+    for _ in range(10):
+        status = (await client.get(f"/api/ingestion-status/{job_id}")).json()
+        if status["status"].startswith("completed"):
+            break
+        await asyncio.sleep(0.2)
+    else:
+        pytest.fail("Ingestion job did not complete in time")
+
+    assert status["files"] == {"report.txt": "completed", "report (1).txt": "completed"}
+    await client.delete("/api/documents", params={"job_id": job_id})
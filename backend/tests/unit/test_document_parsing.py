@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import pytest
+
+from api.services.document_parsing import (
+    ParseOptions,
+    chunk_stream,
+    dynamic_chunking,
+    iter_csv_chunks,
+    iter_paragraphs,
+    parse_file,
+)
+
+
+def test_streamed_chunks_match_whole_document_chunking():
+    paragraphs = [" ".join(f"word{p}_{w}" for w in range(40 + p)) for p in range(30)]
+    document = "\n\n".join(paragraphs) + "\n\n\n"
+    pieces = [document[i : i + 37] for i in range(0, len(document), 37)]
+
+    streamed = list(chunk_stream(iter(pieces), "pdf"))
+    assert streamed == dynamic_chunking(document, "pdf")
+    assert len(streamed) > 5
+
+
+def test_chunks_are_emitted_before_input_is_exhausted():
+    consumed = []
+
+    def pages():
+        for number in range(100):
+            consumed.append(number)
+            yield ("\n" if number else "") + " ".join(["text"] * 100) + "\n\n"
+
+    chunks = chunk_stream(pages(), "pdf")
+    next(chunks)
+    assert len(consumed) < 10
+
+
+def test_overlong_paragraphs_are_cut_at_line_breaks():
+    lines = ["x" * 90] * 30
+    paragraphs = list(iter_paragraphs(["\n".join(lines[:15]), "\n" + "\n".join(lines[15:])], max_chars=1_000))
+    assert all(len(paragraph) <= 1_000 for paragraph in paragraphs)
+    assert "".join(paragraphs).replace("\n", "") == "x" * 90 * 30
+
+
+def test_csv_is_streamed_in_header_prefixed_batches(tmp_path):
+    path = tmp_path / "people.csv"
+    rows = "".join(f'{i},"Name {i}, Jr.",Sales\n' for i in range(7))
+    path.write_text("id,name,dept\n" + rows + ",,\n")
+
+    chunks = list(iter_csv_chunks(path, rows_per_chunk=3))
+    assert len(chunks) == 3
+    assert chunks[0] == 'id,name,dept\n0,"Name 0, Jr.",Sales\n1,"Name 1, Jr.",Sales\n2,"Name 2, Jr.",Sales'
+    assert chunks[2] == 'id,name,dept\n6,"Name 6, Jr.",Sales'
+
+    parsed = parse_file(path, ParseOptions(csv_rows_per_chunk=5, csv_row_template="{name} works in {dept}"))
+    assert parsed.doc_type == "csv"
+    assert parsed.chunks[1] == "Name 5, Jr. works in Sales\nName 6, Jr. works in Sales"
+
+    with pytest.raises(ValueError):
+        parse_file(path, ParseOptions(csv_row_template="{salary}"))
+
+
+def test_in_memory_csv_chunking_matches_the_streamed_path(tmp_path):
+    path = tmp_path / "people.csv"
+    path.write_text("id,name\n" + "".join(f'{i},"Name {i}, Jr."\n' for i in range(7)))
+    options = ParseOptions(csv_rows_per_chunk=4)
+
+    assert dynamic_chunking(path.read_text(), "csv", options) == list(iter_csv_chunks(path, 4))
+    assert len(dynamic_chunking(path.read_text(), "csv")) == 1
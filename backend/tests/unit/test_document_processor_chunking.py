@@ -1,8 +1,21 @@
 from __future__ import annotations
 
+import asyncio
 from textwrap import dedent
 
-from api.services.document_processor import DocumentProcessor
+import pytest
+
+from api.services.document_processor import DocumentProcessor, IngestionStatus
+from api.services.job_registry import JobRegistry
+from api.services.sharded_store import ShardedDocumentStore
+
+
+def make_processor(store, model, registry=None, **kwargs) -> DocumentProcessor:
+    processor = DocumentProcessor(
+        model_name="stub", batch_size=8, embedding_cache=None, document_store=store, registry=registry, **kwargs
+    )
+    processor._embedding_model = model  # type: ignore[assignment]
+    return processor
 
 
 def build_processor() -> DocumentProcessor:
@@ -42,3 +55,142 @@ def test_contract_chunking_uses_clauses():
     chunks = processor.dynamic_chunking(contract_text, "txt")
     assert any("Clause 1" in chunk for chunk in chunks)
     assert any("Clause 2" in chunk for chunk in chunks)
+
+
+@pytest.mark.asyncio
+async def test_files_are_parsed_in_worker_processes(tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"notes-{index}.txt"
+        path.write_text(f"Paragraph {index} one.\n\nParagraph {index} two.")
+        paths.append(path)
+    unsupported = tmp_path / "image.png"
+    unsupported.write_bytes(b"\x89PNG")
+
+    processor = DocumentProcessor(model_name="stub", batch_size=4, parse_workers=2)
+    try:
+        results = {path.name: (parsed, error) async for path, parsed, error in processor._parse_files([*paths, unsupported])}
+    finally:
+        processor.close()
+
+    assert set(results) == {"notes-0.txt", "notes-1.txt", "notes-2.txt", "image.png"}
+    parsed, error = results["notes-1.txt"]
+    assert error is None and parsed.doc_type == "txt"
+    assert parsed.chunks == ["Paragraph 1 one.\nParagraph 1 two."]
+    assert isinstance(results["image.png"][1], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_pipeline_embeds_full_batches_across_files(tmp_path, counting_model):
+    paths = []
+    for index in range(5):
+        path = tmp_path / f"notes-{index}.txt"
+        path.write_text("\n\n".join(" ".join([f"w{index}{p}"] * 150) for p in range(3)))
+        paths.append(path)
+    (tmp_path / "broken.bin").write_bytes(b"\x00")
+
+    store = ShardedDocumentStore(db_path=tmp_path / "index.db")
+    processor = make_processor(store, counting_model)
+    processor.jobs["job"] = IngestionStatus(job_id="job", total_files=6)
+    await processor._process_job("job", [*paths, tmp_path / "broken.bin"])
+
+    status = await processor.get_status("job")
+    assert counting_model.batches == [8, 7]
+    assert status["status"] == "completed_with_errors" and status["processed_files"] == 6
+    assert status["files"]["notes-4.txt"] == "completed" and status["files"]["broken.bin"] == "failed"
+    job_metrics = status["metrics"]
+    assert job_metrics["chunks"] == 15 and job_metrics["chunks_per_second"] > 0
+    assert job_metrics["bytes_processed"] == sum(path.stat().st_size for path in paths)
+    assert set(job_metrics["stage_seconds"]) == {"parse", "embed", "store"}
+    assert job_metrics["files"]["notes-0.txt"]["chunks"] == 3
+    assert store.stats()["live_rows"] == 15
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_interrupted_job_resumes_without_redoing_committed_files(tmp_path, counting_model):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"file-{index}.txt"
+        path.write_text(f"Contents of file {index}.")
+        paths.append(path)
+
+    registry = JobRegistry(tmp_path / "jobs.db")
+    store = ShardedDocumentStore(db_path=tmp_path / "index.db")
+    first = make_processor(store, counting_model, registry)
+    # Simulate a crash: file-0 was committed and recorded, file-1 was stored
+    # but its state never reached the registry.
+    await registry.create_job("job", paths, delete_files=True)
+    first.jobs["job"] = IngestionStatus(job_id="job", total_files=3, delete_files=True)
+    await first._process_job("job", paths[:2])
+    await registry.set_file_state("job", paths[1], "queued")
+    paths[1].write_text("Contents of file 1.")
+    await registry.update_job("job", "processing", [], 0, 0)
+    counting_model.encoded.clear()
+
+    resumed = make_processor(store, counting_model, registry, max_finished_jobs=0)
+    assert await resumed.resume_jobs() == ["job"]
+    for _ in range(50):
+        if "job" not in resumed.jobs:
+            break
+        await asyncio.sleep(0.05)
+
+    status = await resumed.get_status("job")
+    assert status["status"] == "completed" and status["processed_files"] == 3
+    assert sorted(counting_model.encoded) == ["Contents of file 1.", "Contents of file 2."]
+    hits = await store.keyword_search("contents", limit=10)
+    assert sorted(hit["file_name"] for hit in hits) == ["file-0.txt", "file-1.txt", "file-2.txt"]
+    assert not any(path.exists() for path in paths)
+    registry.close()
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_reingestion_skips_unchanged_and_replaces_changed_files(tmp_path, counting_model):
+    same = tmp_path / "same.txt"
+    edited = tmp_path / "edited.txt"
+    same.write_text("Unchanged handbook text.")
+    edited.write_text("Original policy text.")
+
+    store = ShardedDocumentStore(db_path=tmp_path / "index.db", shards=2)
+    processor = make_processor(store, counting_model)
+    processor.jobs["first"] = IngestionStatus(job_id="first", total_files=2)
+    await processor._process_job("first", [same, edited])
+
+    counting_model.encoded.clear()
+    edited.write_text("Revised policy text.")
+    processor.jobs["second"] = IngestionStatus(job_id="second", total_files=2, replace_existing=True)
+    await processor._process_job("second", [same, edited])
+
+    status = await processor.get_status("second")
+    assert status["status"] == "completed" and status["processed_files"] == 2
+    assert status["skipped_files"] == 1 and status["updated_files"] == 1
+    assert status["files"] == {"same.txt": "skipped", "edited.txt": "updated"}
+    assert counting_model.encoded == ["Revised policy text."]
+    hits = await store.keyword_search("policy", limit=10)
+    assert [(hit["file_name"], hit["content"]) for hit in hits] == [("edited.txt", "Revised policy text.")]
+    assert sorted(job for job, _ in await store.file_versions("edited.txt")) == ["second"]
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_reingestion_leaves_other_jobs_files_alone_by_default(tmp_path, counting_model):
+    first_dir, second_dir = tmp_path / "team-a", tmp_path / "team-b"
+    first_dir.mkdir()
+    second_dir.mkdir()
+    (first_dir / "notes.txt").write_text("Team A roadmap notes.")
+    (second_dir / "notes.txt").write_text("Team B budget notes.")
+
+    store = ShardedDocumentStore(db_path=tmp_path / "index.db", shards=2)
+    processor = make_processor(store, counting_model)
+    processor.jobs["a"] = IngestionStatus(job_id="a", total_files=1)
+    await processor._process_job("a", [first_dir / "notes.txt"])
+    processor.jobs["b"] = IngestionStatus(job_id="b", total_files=1)
+    await processor._process_job("b", [second_dir / "notes.txt"])
+
+    status = await processor.get_status("b")
+    assert status["files"] == {"notes.txt": "completed"} and status["updated_files"] == 0
+    assert sorted(job for job, _ in await store.file_versions("notes.txt")) == ["a", "b"]
+    hits = await store.keyword_search("notes", limit=10)
+    assert sorted(hit["content"] for hit in hits) == ["Team A roadmap notes.", "Team B budget notes."]
+    store.close()
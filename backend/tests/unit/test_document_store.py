@@ -0,0 +1,323 @@
+from __future__ import annotations
+
+import json
+import sqlite3
+
+import numpy as np
+import pytest
+
+from api.services.document_store import DocumentChunk, DocumentStore
+from api.services.embedding_segments import RunningTopK
+
+
+def make_chunks(vectors: np.ndarray, file_name: str = "doc.txt") -> list[DocumentChunk]:
+    return [
+        DocumentChunk(
+            file_name=file_name,
+            chunk_index=i,
+            content=f"chunk {i}",
+            embedding=vector.tolist(),
+            metadata={"doc_type": "txt"},
+        )
+        for i, vector in enumerate(vectors)
+    ]
+
+
+def brute_force(vectors: np.ndarray, query: np.ndarray, top_k: int) -> list[int]:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:top_k])
+
+
+@pytest.mark.asyncio
+async def test_similarity_search_matches_brute_force(tmp_path):
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(200, 16)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db")
+    await store.add_chunks("job-1", make_chunks(vectors[:120]))
+    await store.add_chunks("job-2", make_chunks(vectors[120:], file_name="other.txt"))
+
+    query = rng.normal(size=16).astype(np.float32)
+    results = await store.similarity_search(query, top_k=5)
+
+    expected = brute_force(vectors, query, 5)
+    assert [r["content"] for r in results] == [
+        f"chunk {i if i < 120 else i - 120}" for i in expected
+    ]
+    assert results[0]["similarity"] >= results[-1]["similarity"]
+    assert "embedding" not in results[0]
+
+
+@pytest.mark.asyncio
+async def test_resident_matrix_reloads_from_disk(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = rng.normal(size=(10, 8)).astype(np.float32)
+    await DocumentStore(db_path=tmp_path / "index.db").add_chunks("job", make_chunks(vectors))
+
+    reopened = DocumentStore(db_path=tmp_path / "index.db")
+    results = await reopened.similarity_search(vectors[3], top_k=1)
+    assert results[0]["chunk_index"] == 3
+    assert results[0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+
+
+@pytest.mark.asyncio
+async def test_dimension_mismatch_returns_no_results(tmp_path):
+    store = DocumentStore(db_path=tmp_path / "index.db")
+    await store.add_chunks("job", make_chunks(np.ones((3, 8), dtype=np.float32)))
+    assert await store.similarity_search(np.ones(4, dtype=np.float32)) == []
+
+
+@pytest.mark.asyncio
+async def test_ivf_index_matches_exact_when_probing_all_lists(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = rng.normal(size=(600, 16)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db", index_mode="ivf", nlist=8)
+    store._ann.train_threshold = 256  # type: ignore[union-attr]
+    await store.add_chunks("job", make_chunks(vectors[:300]))
+    await store.add_chunks("job", make_chunks(vectors[300:], file_name="more.txt"))
+    assert store._ann.trained and store.ann_index_path.exists()  # type: ignore[union-attr]
+
+    query = rng.normal(size=16).astype(np.float32)
+    exact = await store.similarity_search(query, top_k=10, exact=True)
+    approx = await store.similarity_search(query, top_k=10, nprobe=8)
+    assert [r["id"] for r in approx] == [r["id"] for r in exact]
+
+
+@pytest.mark.asyncio
+async def test_ivf_index_is_reloaded_from_disk(tmp_path):
+    rng = np.random.default_rng(3)
+    vectors = rng.normal(size=(300, 8)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db", index_mode="ivf", nlist=4)
+    store._ann.train_threshold = 100  # type: ignore[union-attr]
+    await store.add_chunks("job", make_chunks(vectors))
+
+    reopened = DocumentStore(db_path=tmp_path / "index.db", index_mode="ivf", nlist=4)
+    await reopened.initialize()
+    assert reopened._ann.trained  # type: ignore[union-attr]
+    np.testing.assert_array_equal(reopened._ann.centroids, store._ann.centroids)  # type: ignore[union-attr]
+
+
+@pytest.mark.asyncio
+async def test_embeddings_span_memory_mapped_segments(tmp_path):
+    rng = np.random.default_rng(4)
+    vectors = rng.normal(size=(10, 8)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db")
+    store._segments.segment_rows = 4
+    await store.add_chunks("job", make_chunks(vectors))
+
+    assert len(list(store.segments_dir.glob("seg-*.f32"))) == 3
+    results = await store.similarity_search(vectors[9], top_k=1)
+    assert results[0]["chunk_index"] == 9
+
+    conn = sqlite3.connect(tmp_path / "index.db")
+    try:
+        rows = conn.execute("SELECT segment, row_offset, embedding FROM documents ORDER BY id").fetchall()
+    finally:
+        conn.close()
+    assert rows[9] == (2, 1, None)
+
+
+@pytest.mark.asyncio
+async def test_torn_segment_tail_is_truncated_on_reopen(tmp_path):
+    rng = np.random.default_rng(12)
+    vectors = rng.normal(size=(6, 8)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db")
+    await store.add_chunks("job", make_chunks(vectors[:4]))
+    store.close()
+    segment = next(store.segments_dir.glob("seg-*.f32"))
+    with segment.open("ab") as fh:
+        fh.write(b"\x00" * 12)  # partial row left by a crashed append
+
+    reopened = DocumentStore(db_path=tmp_path / "index.db")
+    await reopened.add_chunks("job", make_chunks(vectors[4:], file_name="new.txt"))
+    assert segment.stat().st_size == 6 * 8 * 4
+    results = await reopened.similarity_search(vectors[5], top_k=1)
+    assert (results[0]["file_name"], results[0]["chunk_index"]) == ("new.txt", 1)
+    assert results[0]["similarity"] == pytest.approx(1.0, abs=1e-5)
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_legacy_blob_embeddings_are_migrated(tmp_path):
+    db_path = tmp_path / "index.db"
+    vectors = np.eye(4, dtype=np.float32)
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(
+            """
+            CREATE TABLE documents (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, job_id TEXT, file_name TEXT,
+                chunk_index INTEGER, content TEXT, embedding BLOB, metadata TEXT
+            )
+            """
+        )
+        conn.executemany(
+            "INSERT INTO documents (job_id, file_name, chunk_index, content, embedding, metadata) VALUES (?, ?, ?, ?, ?, ?)",
+            [("old", "legacy.txt", i, f"chunk {i}", v.tobytes(), json.dumps({})) for i, v in enumerate(vectors)],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    store = DocumentStore(db_path=db_path)
+    results = await store.similarity_search(vectors[2], top_k=1)
+    assert results[0]["content"] == "chunk 2"
+
+    conn = sqlite3.connect(db_path)
+    try:
+        remaining = conn.execute("SELECT COUNT(*) FROM documents WHERE embedding IS NOT NULL").fetchone()[0]
+    finally:
+        conn.close()
+    assert remaining == 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("quantization", ["float16", "int8"])
+async def test_quantized_search_rescores_at_full_precision(tmp_path, quantization):
+    rng = np.random.default_rng(5)
+    vectors = rng.normal(size=(500, 32)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db", quantization=quantization)
+    await store.add_chunks("job", make_chunks(vectors))
+
+    query = rng.normal(size=32).astype(np.float32)
+    results = await store.similarity_search(query, top_k=5)
+    assert [r["chunk_index"] for r in results] == brute_force(vectors, query, 5)
+    assert results[0]["similarity"] == pytest.approx(
+        float(vectors[results[0]["chunk_index"]] @ query / np.linalg.norm(vectors[results[0]["chunk_index"]]) / np.linalg.norm(query)),
+        abs=1e-5,
+    )
+
+
+@pytest.mark.asyncio
+async def test_existing_index_is_converted_in_place(tmp_path):
+    rng = np.random.default_rng(6)
+    vectors = rng.normal(size=(20, 8)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db")
+    await store.add_chunks("job", make_chunks(vectors))
+
+    await store.convert_storage("int8")
+    assert list(store.segments_dir.glob("*.i8")) and list(store.segments_dir.glob("*.i8s"))
+
+    reopened = DocumentStore(db_path=tmp_path / "index.db", quantization="float16")
+    results = await reopened.similarity_search(vectors[7], top_k=1)
+    assert results[0]["chunk_index"] == 7
+    assert list(reopened.segments_dir.glob("*.f16")) and not list(reopened.segments_dir.glob("*.i8"))
+
+    conn = sqlite3.connect(tmp_path / "index.db")
+    try:
+        mode = conn.execute("SELECT value FROM store_meta WHERE key = 'quantization'").fetchone()[0]
+    finally:
+        conn.close()
+    assert mode == "float16"
+
+
+@pytest.mark.asyncio
+async def test_filters_restrict_search_before_scoring(tmp_path):
+    rng = np.random.default_rng(7)
+    vectors = rng.normal(size=(40, 8)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db")
+    await store.add_chunks("job-a", make_chunks(vectors[:20], file_name="a.txt"))
+    csv_chunks = make_chunks(vectors[20:], file_name="b.csv")
+    for chunk in csv_chunks:
+        chunk.metadata["doc_type"] = "csv"
+    await store.add_chunks("job-b", csv_chunks)
+
+    query = vectors[5]
+    by_job = await store.similarity_search(query, top_k=3, job_id="job-b")
+    assert by_job and {r["job_id"] for r in by_job} == {"job-b"}
+    assert [r["chunk_index"] for r in by_job] == brute_force(vectors[20:], query, 3)
+
+    by_type = await store.similarity_search(query, top_k=50, doc_type="txt")
+    assert len(by_type) == 20 and by_type[0]["file_name"] == "a.txt"
+
+    assert await store.similarity_search(query, job_id="job-a", file_name="b.csv") == []
+
+
+@pytest.mark.asyncio
+async def test_keyword_search_ranks_with_bm25(tmp_path):
+    store = DocumentStore(db_path=tmp_path / "index.db")
+    chunks = make_chunks(np.eye(3, dtype=np.float32))
+    chunks[0].content = "Remote work policy for engineers"
+    chunks[1].content = "Policy number POL-1234 covers travel"
+    chunks[2].content = "Quarterly review notes"
+    await store.add_chunks("job", chunks)
+
+    hits = await store.keyword_search("policy POL-1234")
+    assert [hit["chunk_index"] for hit in hits] == [1, 0]
+    assert hits[0]["bm25"] > hits[1]["bm25"]
+    assert await store.keyword_search("review", job_id="other") == []
+
+    scoped = await store.similarity_search(np.array([1, 0, 0], dtype=np.float32), ids=[hits[0]["id"]])
+    assert [r["chunk_index"] for r in scoped] == [1]
+
+
+@pytest.mark.asyncio
+async def test_streaming_scan_matches_brute_force_across_batches(tmp_path):
+    rng = np.random.default_rng(8)
+    vectors = rng.normal(size=(100, 8)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db", scan_batch_rows=7)
+    store._segments.segment_rows = 16
+    await store.add_chunks("job", make_chunks(vectors))
+
+    query = rng.normal(size=8).astype(np.float32)
+    results = await store.similarity_search(query, top_k=10)
+    assert [r["chunk_index"] for r in results] == brute_force(vectors, query, 10)
+
+
+def test_running_top_k_skips_masked_rows():
+    running = RunningTopK(3)
+    running.push(np.arange(4), np.array([0.1, 0.9, -np.inf, 0.5], dtype=np.float32))
+    running.push(np.arange(4, 6), np.array([0.7, -np.inf], dtype=np.float32))
+    positions, scores = running.result()
+    assert positions.tolist() == [1, 4, 3]
+    assert scores.tolist() == pytest.approx([0.9, 0.7, 0.5])
+
+    sparse = RunningTopK(5)
+    sparse.push(np.arange(2), np.array([-np.inf, 0.2], dtype=np.float32))
+    assert sparse.result()[0].tolist() == [1]
+
+
+@pytest.mark.asyncio
+async def test_deleted_documents_are_tombstoned_until_compaction(tmp_path):
+    rng = np.random.default_rng(9)
+    vectors = rng.normal(size=(30, 8)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db", compaction_threshold=1.0)
+    store._segments.segment_rows = 8
+    await store.add_chunks("job-a", make_chunks(vectors[:10], file_name="a.txt"))
+    await store.add_chunks("job-b", make_chunks(vectors[10:], file_name="b.txt"))
+
+    assert await store.delete_documents(file_name="a.txt") == 10
+    assert store.stats()["dead_rows"] == 10
+    results = await store.similarity_search(vectors[3], top_k=5)
+    assert {r["file_name"] for r in results} == {"b.txt"}
+    assert await store.keyword_search("chunk", file_name="a.txt") == []
+
+    old_dir = store.segments_dir
+    summary = await store.compact()
+    assert summary == {"live_rows": 20, "reclaimed_rows": 10}
+    assert not old_dir.exists() and store.stats()["dead_rows"] == 0
+    results = await store.similarity_search(vectors[12], top_k=1)
+    assert (results[0]["file_name"], results[0]["chunk_index"]) == ("b.txt", 2)
+
+    reopened = DocumentStore(db_path=tmp_path / "index.db")
+    reopened._segments.segment_rows = 8
+    results = await reopened.similarity_search(vectors[25], top_k=1)
+    assert results[0]["chunk_index"] == 15
+    assert reopened.stats()["live_rows"] == 20
+
+
+@pytest.mark.asyncio
+async def test_delete_schedules_compaction_past_threshold(tmp_path):
+    vectors = np.random.default_rng(10).normal(size=(10, 4)).astype(np.float32)
+    store = DocumentStore(db_path=tmp_path / "index.db", compaction_threshold=0.5)
+    await store.add_chunks("job-a", make_chunks(vectors[:6]))
+    await store.add_chunks("job-b", make_chunks(vectors[6:]))
+
+    await store.delete_documents(job_id="job-b")
+    assert store._compaction is None
+    await store.delete_documents(job_id="job-a")
+    await store._compaction
+    assert store.stats() == {"live_rows": 0, "dead_rows": 0, "dead_fraction": 0.0, "generation": 1}
+
+    with pytest.raises(ValueError):
+        await store.delete_documents()
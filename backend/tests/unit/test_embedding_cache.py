@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import pytest
+
+from api.services.document_processor import DocumentProcessor, IngestionStatus
+from api.services.embedding_cache import EmbeddingCache
+
+
+@pytest.mark.asyncio
+async def test_cache_is_keyed_by_model_and_text(tmp_path):
+    cache = EmbeddingCache(tmp_path / "cache.db")
+    await cache.store("model-a", ["hello"], [[1.0, 2.0]])
+
+    hits = await cache.lookup("model-a", ["hello", "other"])
+    assert hits[0].tolist() == [1.0, 2.0] and hits[1] is None
+    assert await cache.lookup("model-b", ["hello"]) == [None]
+    cache.close()
+
+
+@pytest.mark.asyncio
+async def test_only_cache_misses_are_encoded(tmp_path, counting_model):
+    processor = DocumentProcessor(
+        model_name="stub",
+        batch_size=4,
+        _embedding_model=counting_model,
+        embedding_cache=EmbeddingCache(tmp_path / "cache.db"),
+    )
+    first = IngestionStatus(job_id="a", total_files=1)
+    await processor._embed_with_cache(["alpha", "beta"], first)
+
+    second = IngestionStatus(job_id="b", total_files=1)
+    embeddings = await processor._embed_with_cache(["beta", "gamma", "alpha"], second)
+
+    assert counting_model.encoded == ["alpha", "beta", "gamma"]
+    assert (second.cache_hits, second.cache_misses) == (2, 1)
+    assert embeddings == [[4.0, 1.0], [5.0, 1.0], [5.0, 1.0]]
+    processor.embedding_cache.close()
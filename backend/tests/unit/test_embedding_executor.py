@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import threading
+
+from api.services.embedding_executor import INGESTION, QUERY, EmbeddingExecutor
+
+
+def test_queries_run_before_queued_ingestion_batches():
+    executor = EmbeddingExecutor(workers=1, ingestion_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def blocking():
+        started.set()
+        release.wait(5)
+
+    first = executor.submit(blocking, priority=INGESTION)
+    assert started.wait(5)
+    futures = [
+        executor.submit(order.append, "ingest-1", priority=INGESTION),
+        executor.submit(order.append, "ingest-2", priority=INGESTION),
+        executor.submit(order.append, "query-1", priority=QUERY),
+        executor.submit(order.append, "query-2", priority=QUERY),
+    ]
+    release.set()
+    for future in [first, *futures]:
+        future.result(5)
+    executor.close()
+
+    assert order == ["query-1", "query-2", "ingest-1", "ingest-2"]
+
+
+def test_ingestion_leaves_a_worker_free_for_queries():
+    executor = EmbeddingExecutor(workers=2, ingestion_workers=1)
+    release = threading.Event()
+    running = threading.Semaphore(0)
+
+    def ingest():
+        running.release()
+        release.wait(5)
+
+    ingestion = [executor.submit(ingest, priority=INGESTION) for _ in range(3)]
+    assert running.acquire(timeout=5)
+    assert executor.submit(lambda: "query", priority=QUERY).result(5) == "query"
+    assert executor.queued(INGESTION) == 2
+
+    release.set()
+    for future in ingestion:
+        future.result(5)
+    executor.close()
@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from api.services.embedding_service import QueryEmbeddingService
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_are_coalesced_into_one_encode():
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(text), 1.0] for text in texts], dtype=np.float32)
+
+    service = QueryEmbeddingService(encode, max_batch_size=8, max_wait_ms=20)
+    before = service.batch_sizes.snapshot()["count"]
+    results = await asyncio.gather(*(service.embed("x" * n) for n in range(1, 6)))
+    service.close()
+
+    assert calls == [["x", "xx", "xxx", "xxxx", "xxxxx"]]
+    assert [float(result[0]) for result in results] == [1, 2, 3, 4, 5]
+    snapshot = service.batch_sizes.snapshot()
+    assert snapshot["count"] == before + 1
+    assert service.queue_wait.snapshot()["count"] >= 5
+
+
+@pytest.mark.asyncio
+async def test_batches_are_capped_and_errors_reach_every_caller():
+    calls = []
+
+    def encode(texts):
+        calls.append(len(texts))
+        if "boom" in texts:
+            raise RuntimeError("model failed")
+        return np.zeros((len(texts), 2), dtype=np.float32)
+
+    service = QueryEmbeddingService(encode, max_batch_size=3, max_wait_ms=20)
+    await asyncio.gather(*(service.embed(str(n)) for n in range(7)))
+    assert calls == [3, 3, 1]
+
+    results = await asyncio.gather(service.embed("boom"), service.embed("ok"), return_exceptions=True)
+    service.close()
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_requests_queued_during_an_encode_skip_the_batch_wait():
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def encode(texts):
+        calls.append(list(texts))
+        if texts == ["first"]:
+            started.set()
+            release.wait(5)
+        return np.zeros((len(texts), 2), dtype=np.float32)
+
+    loop = asyncio.get_running_loop()
+    service = QueryEmbeddingService(encode, max_batch_size=8, max_wait_ms=300)
+    first = asyncio.create_task(service.embed("first"))
+    await loop.run_in_executor(None, started.wait, 5)
+    second = asyncio.create_task(service.embed("second"))
+    await asyncio.sleep(0)
+
+    release.set()
+    await first
+    resumed = loop.time()
+    await second
+    service.close()
+
+    assert calls == [["first"], ["second"]]
+    assert loop.time() - resumed < 0.15
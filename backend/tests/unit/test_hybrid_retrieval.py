@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from api.services.query_engine import QueryEngine, reciprocal_rank_fusion
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    vector = [{"id": 1}, {"id": 2}, {"id": 3}]
+    keyword = [{"id": 3}, {"id": 4}]
+    fused = reciprocal_rank_fusion([vector, keyword])
+    assert [item["id"] for item in fused][:2] == [3, 1]
+    assert {item["id"] for item in fused} == {1, 2, 3, 4}
+
+
+def test_keyword_queries_are_detected():
+    assert QueryEngine._is_keyword_query("find policy POL-1234")
+    assert QueryEngine._is_keyword_query('documents mentioning "Jane Doe"')
+    assert not QueryEngine._is_keyword_query("documents about remote work")
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import time
 
-from api.services.query_cache import QueryCache
+from api.services.query_cache import EmbeddingLRU, PlanCache, QueryCache
 
 
 def test_cache_set_and_get():
@@ -26,3 +26,37 @@ def test_cache_expiration():
     cache.set("key", 123)
     time.sleep(0.01)
     assert cache.get("key") is None
+
+
+def test_embedding_lru_normalizes_text_and_tracks_hit_rate():
+    cache = EmbeddingLRU(max_size=2)
+    assert cache.get("model-a", "Show  Resumes") is None
+    cache.set("model-a", "Show  Resumes", [0.1, 0.2])
+    assert cache.get("model-a", "  show resumes ") == [0.1, 0.2]
+    assert cache.get("model-b", "show resumes") is None
+    assert cache.hits == 1 and cache.misses == 2
+    assert abs(cache.hit_rate - 1 / 3) < 1e-9
+
+
+def test_embedding_lru_evicts_least_recently_used():
+    cache = EmbeddingLRU(max_size=2)
+    cache.set("m", "a", 1)
+    cache.set("m", "b", 2)
+    assert cache.get("m", "a") == 1
+    cache.set("m", "c", 3)
+    assert cache.get("m", "b") is None
+    assert cache.get("m", "a") == 1
+    assert cache.get("m", "c") == 3
+
+
+def test_plan_cache_evicts_and_retains_only_the_current_schema():
+    cache = PlanCache(max_size=2)
+    cache.set(("list staff", "v1"), "plan-a")
+    cache.set(("count staff", "v1"), "plan-b")
+    cache.set(("list staff", "v2"), "plan-c")
+    assert cache.get(("list staff", "v1")) is None
+
+    cache.retain("v2")
+    assert cache.get(("count staff", "v1")) is None
+    assert cache.get(("list staff", "v2")) == "plan-c"
+    assert (cache.hits, cache.misses) == (1, 2)
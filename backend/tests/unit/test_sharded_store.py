@@ -0,0 +1,73 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from api.services.document_store import DocumentChunk
+from api.services.sharded_store import ShardedDocumentStore, decode_id
+
+
+def make_chunks(vectors: np.ndarray, file_name: str) -> list[DocumentChunk]:
+    return [
+        DocumentChunk(
+            file_name=file_name,
+            chunk_index=i,
+            content=f"chunk {i}",
+            embedding=vector.tolist(),
+            metadata={"doc_type": "txt"},
+        )
+        for i, vector in enumerate(vectors)
+    ]
+
+
+async def add_files(store: ShardedDocumentStore, vectors: np.ndarray, files: int) -> None:
+    for index, part in enumerate(np.array_split(vectors, files)):
+        await store.add_chunks("job", make_chunks(part, file_name=f"file-{index}.txt"))
+
+
+@pytest.mark.asyncio
+async def test_fan_out_search_matches_single_store(tmp_path):
+    rng = np.random.default_rng(11)
+    vectors = rng.normal(size=(120, 8)).astype(np.float32)
+    store = ShardedDocumentStore(db_path=tmp_path / "index.db", shards=3)
+    await add_files(store, vectors, files=12)
+    assert len({decode_id(hit["id"])[0] for hit in await store.keyword_search("chunk", limit=200)}) == 3
+
+    query = rng.normal(size=8).astype(np.float32)
+    results = await store.similarity_search(query, top_k=10)
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ query))[:10]
+    contents = [(r["file_name"], r["chunk_index"]) for r in results]
+    assert contents == [(f"file-{i // 10}.txt", i % 10) for i in expected]
+
+    scoped = await store.similarity_search(query, top_k=2, ids=[results[3]["id"], results[7]["id"]])
+    assert [r["id"] for r in scoped] == [results[3]["id"], results[7]["id"]]
+    assert await store.delete_documents(file_name="file-0.txt") == 10
+    store.close()
+
+
+@pytest.mark.asyncio
+async def test_rebalance_moves_chunks_without_reembedding(tmp_path):
+    rng = np.random.default_rng(12)
+    vectors = rng.normal(size=(60, 8)).astype(np.float32)
+    single = ShardedDocumentStore(db_path=tmp_path / "index.db", shards=1)
+    await add_files(single, vectors, files=6)
+    single.close()
+
+    grown = ShardedDocumentStore(db_path=tmp_path / "index.db", shards=4)
+    summary = await grown.rebalance()
+    assert summary["moved_chunks"] > 0
+    shard_rows = [shard["live_rows"] for shard in grown.stats()["shards"]]
+    assert sum(shard_rows) == 60 and shard_rows[0] < 60
+    hit = (await grown.similarity_search(vectors[33], top_k=1))[0]
+    assert (hit["file_name"], hit["chunk_index"]) == ("file-3.txt", 3)
+    grown.close()
+
+    shrunk = ShardedDocumentStore(db_path=tmp_path / "index.db", shards=2)
+    await shrunk.initialize()
+    assert len(shrunk.stats()["shards"]) == 4
+    await shrunk.rebalance()
+    assert [shard["shard"] for shard in shrunk.stats()["shards"]] == [0, 1]
+    assert not shrunk.shard_path(3).exists()
+    assert shrunk.stats()["live_rows"] == 60
+    shrunk.close()
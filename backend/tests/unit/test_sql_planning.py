@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import sqlite3
+from datetime import date, datetime, time
+from decimal import Decimal
+from types import SimpleNamespace
+from uuid import UUID
+
+import pytest
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from api.services.query_cache import PlanCache, QueryCache
+from api.services.query_engine import (
+    QueryEngine,
+    SQLPlan,
+    compiled_statement,
+    decode_cursor,
+    encode_cursor,
+    query_template,
+    schema_fingerprint,
+)
+from api.services.schema_discovery import SchemaDiscovery
+
+
+def make_engine() -> QueryEngine:
+    engine = QueryEngine(
+        connection_string="sqlite+aiosqlite:///./data/company.db",
+        schema_discovery=SchemaDiscovery(),
+        cache=QueryCache(),
+        document_processor=None,  # type: ignore[arg-type]
+    )
+    engine.schema = {"tables": {"employees": {"columns": [], "sample_rows": []}}}
+    return engine
+
+
+def test_plan_applies_optimizations_before_execution():
+    engine = make_engine()
+    mapping = {"primary_table": "employees", "candidate_columns": {"employees": [("full_name", 1.0)]}}
+
+    plan = engine._plan_sql("how many employees", mapping)
+    assert plan is not None
+    assert plan.sql == "SELECT COUNT(*) AS count FROM employees"
+    assert not plan.paginated and plan.optimizations == []
+    engine._validate_plan(plan)
+
+    listing = engine._plan_sql("list employees", mapping)
+    assert listing is not None and listing.optimizations == ["offset_pagination"]
+    sql, params = listing.page_statement({"offset": 20}, 11)
+    assert sql == (
+        "SELECT * FROM (SELECT full_name FROM employees) AS page "
+        "ORDER BY full_name LIMIT :page_limit OFFSET :page_offset"
+    )
+    assert params == {"page_limit": 11, "page_offset": 20}
+
+    engine.schema["tables"]["employees"]["primary_key"] = ["emp_id"]
+    keyed = engine._plan_sql("list employees", mapping)
+    assert keyed is not None and keyed.optimizations == ["keyset_pagination"]
+    assert keyed.sql == "SELECT full_name, emp_id FROM employees"
+    sql, params = keyed.page_statement({"after": [7]}, 11)
+    assert sql == (
+        "SELECT * FROM (SELECT full_name, emp_id FROM employees) AS page "
+        "WHERE (emp_id) > (:after_0) ORDER BY emp_id LIMIT :page_limit"
+    )
+    assert params == {"page_limit": 11, "after_0": 7}
+
+
+def test_validation_rejects_unknown_tables_and_unbound_parameters():
+    engine = make_engine()
+    with pytest.raises(ValueError, match="unknown table"):
+        engine._validate_plan(SQLPlan(sql="SELECT * FROM payroll", params={}, table="payroll"))
+    with pytest.raises(ValueError, match="bind parameters"):
+        engine._validate_plan(
+            SQLPlan(sql="SELECT * FROM employees WHERE role = :role", params={}, table="employees")
+        )
+    with pytest.raises(ValueError, match="SELECT"):
+        engine._validate_plan(SQLPlan(sql="DELETE FROM employees", params={}, table="employees"))
+
+
+def test_cursor_key_values_keep_their_types():
+    after = [
+        Decimal("10.50"),
+        date(2024, 2, 29),
+        datetime(2024, 2, 29, 13, 5, 1, 250),
+        time(13, 5, 1),
+        UUID("12345678-1234-5678-1234-567812345678"),
+        b"\x00\xffkey",
+        "plain",
+    ]
+    plan = SQLPlan(
+        sql="SELECT * FROM ledger", params={}, table="ledger", order_by=[f"c{i}" for i in range(len(after))]
+    )
+    position = decode_cursor(plan, encode_cursor(plan, {"after": after}))
+    assert position == {"after": after}
+    assert [type(value) for value in position["after"]] == [type(value) for value in after]
+
+    with pytest.raises(TypeError):
+        encode_cursor(plan, {"after": [object()]})
+
+
+def test_statements_are_compiled_once_per_shape():
+    sql = "SELECT full_name FROM employees WHERE LOWER(role) LIKE :param_role_role LIMIT 100"
+    assert compiled_statement(sql) is compiled_statement(sql)
+
+
+def test_query_template_replaces_slot_values():
+    assert query_template("List  staff in Department Sales") == "list staff in department {department}"
+    assert query_template("list staff in department engineering") == query_template(
+        "List staff in department sales"
+    )
+    assert query_template("list staff") == "list staff"
+
+
+class StubDiscovery:
+    def __init__(self, db_path, tables):
+        self.tables = tables
+        self.mapping_calls = 0
+        self.db = SimpleNamespace(engine=create_async_engine(f"sqlite+aiosqlite:///{db_path}"))
+
+    async def analyze_database(self, connection_string):
+        return {
+            "tables": {
+                table: {"columns": [{"name": name, "type": "TEXT"} for name in columns], "sample_rows": []}
+                for table, columns in self.tables.items()
+            }
+        }
+
+    async def map_natural_language_to_schema(self, query, schema):
+        self.mapping_calls += 1
+        return {"primary_table": "staff", "candidate_columns": {"staff": [("name", 1.0), ("dept", 1.0)]}}
+
+
+async def make_staff_engine(tmp_path, departments, plan_cache) -> QueryEngine:
+    """Engine over a SQLite ``staff`` table; ``departments`` maps name to department."""
+    db_path = tmp_path / "staff.db"
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE staff (name TEXT, dept TEXT)")
+    conn.executemany("INSERT INTO staff VALUES (?, ?)", list(departments.items()))
+    conn.commit()
+    conn.close()
+
+    engine = QueryEngine(
+        connection_string="unused",
+        schema_discovery=StubDiscovery(db_path, {"staff": ["name", "dept"]}),  # type: ignore[arg-type]
+        cache=QueryCache(),
+        document_processor=None,  # type: ignore[arg-type]
+        plan_cache=plan_cache,
+    )
+    await engine.initialize()
+    return engine
+
+
+@pytest.mark.asyncio
+async def test_plan_cache_rebinds_literals_and_invalidates_on_rediscovery(tmp_path):
+    plans = PlanCache()
+    engine = await make_staff_engine(tmp_path, {"Ada": "Engineering", "Ben": "Sales", "Cy": "Sales"}, plans)
+    discovery = engine.schema_discovery
+
+    first = await engine.process_query("list staff in department engineering")
+    second = await engine.process_query("list staff in department sales")
+    assert [row["name"] for row in first["table_results"]] == ["Ada"]
+    assert sorted(row["name"] for row in second["table_results"]) == ["Ben", "Cy"]
+    assert first["performance"]["plan_cache_hit"] is False
+    assert second["performance"]["plan_cache_hit"] is True
+    assert discovery.mapping_calls == 1
+    assert (plans.hits, plans.misses) == (1, 1)
+
+    fingerprint = engine.schema_fingerprint
+    discovery.tables["staff"].append("title")
+    await engine.initialize()
+    assert engine.schema_fingerprint != fingerprint
+    await engine.process_query("list staff in department support")
+    assert discovery.mapping_calls == 2
+    await discovery.db.engine.dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "queries",
+    [
+        ["list staff in department accounting", "list staff in department sales"],
+        ["list staff in department sales", "list staff in department accounting"],
+    ],
+)
+async def test_slot_values_do_not_change_the_cached_plan_shape(tmp_path, queries):
+    engine = await make_staff_engine(tmp_path, {"Ada": "Accounting", "Ben": "Sales", "Cy": "Sales"}, PlanCache())
+    discovery = engine.schema_discovery
+
+    results = {query: await engine.process_query(query) for query in queries}
+    accounting = results["list staff in department accounting"]
+    sales = results["list staff in department sales"]
+    assert "COUNT" not in accounting["sql"] and "COUNT" not in sales["sql"]
+    assert [row["name"] for row in accounting["table_results"]] == ["Ada"]
+    assert sorted(row["name"] for row in sales["table_results"]) == ["Ben", "Cy"]
+    assert discovery.mapping_calls == 1
+    await discovery.db.engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_streamed_and_paged_queries_share_cached_plans(tmp_path):
+    plans = PlanCache()
+    engine = await make_staff_engine(tmp_path, {"Ada": "Engineering", "Ben": "Sales"}, plans)
+
+    events = [event async for event in engine.stream_query("list staff in department engineering")]
+    assert [event["data"]["name"] for event in events if event["type"] == "row"] == ["Ada"]
+    paged = await engine.process_query("list staff in department sales")
+    assert paged["performance"]["plan_cache_hit"] is True
+    assert [row["name"] for row in paged["table_results"]] == ["Ben"]
+    assert engine.schema_discovery.mapping_calls == 1
+    await engine.schema_discovery.db.engine.dispose()
+
+
+def test_schema_fingerprint_tracks_columns():
+    schema = {"tables": {"staff": {"columns": [{"name": "name", "type": "TEXT"}]}}}
+    changed = {"tables": {"staff": {"columns": [{"name": "name", "type": "INTEGER"}]}}}
+    assert schema_fingerprint(schema) == schema_fingerprint(dict(schema))
+    assert schema_fingerprint(schema) != schema_fingerprint(changed)
+    keyed = {"tables": {"staff": {"columns": [{"name": "name", "type": "TEXT"}], "primary_key": ["name"]}}}
+    assert schema_fingerprint(schema) != schema_fingerprint(keyed)
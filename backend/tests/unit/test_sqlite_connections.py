@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+
+import pytest
+
+from api.services.sqlite_connections import SQLiteReaderPool, SQLiteWriter, transaction
+
+
+def make_writer(tmp_path) -> SQLiteWriter:
+    writer = SQLiteWriter(tmp_path / "store.db")
+
+    def create(conn: sqlite3.Connection) -> None:
+        with transaction(conn):
+            conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, value TEXT UNIQUE)")
+
+    writer.submit(create, grouped=False).result()
+    return writer
+
+
+def test_writer_uses_wal_and_group_commits(tmp_path):
+    writer = make_writer(tmp_path)
+    gate = threading.Event()
+    blocker = writer.submit(lambda conn: gate.wait(), grouped=False)
+    futures = [
+        writer.submit(lambda conn, i=i: conn.execute("INSERT INTO items (value) VALUES (?)", (str(i),)).lastrowid)
+        for i in range(10)
+    ]
+    gate.set()
+    blocker.result()
+    assert sorted(f.result() for f in futures) == list(range(1, 11))
+
+    conn = sqlite3.connect(tmp_path / "store.db")
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+    finally:
+        conn.close()
+    writer.close()
+
+
+def test_failed_write_only_rolls_back_itself(tmp_path):
+    writer = make_writer(tmp_path)
+    gate = threading.Event()
+    writer.submit(lambda conn: gate.wait(), grouped=False)
+    ok = writer.submit(lambda conn: conn.execute("INSERT INTO items (value) VALUES ('a')"))
+    duplicate = writer.submit(lambda conn: conn.execute("INSERT INTO items (value) VALUES ('a')"))
+    gate.set()
+
+    ok.result()
+    with pytest.raises(sqlite3.IntegrityError):
+        duplicate.result()
+
+    readers = SQLiteReaderPool(tmp_path / "store.db", size=2)
+    with readers.connection() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM items").fetchone()[0] == 1
+        with pytest.raises(sqlite3.OperationalError):
+            conn.execute("INSERT INTO items (value) VALUES ('b')")
+    readers.close()
+    writer.close()
+
+
+def test_cancelled_waiters_do_not_stop_the_writer(tmp_path):
+    writer = make_writer(tmp_path)
+    gate = threading.Event()
+    blocker = writer.submit(lambda conn: gate.wait(), grouped=False)
+    grouped = writer.submit(lambda conn: conn.execute("INSERT INTO items (value) VALUES ('skipped')"))
+    single = writer.submit(lambda conn: conn.execute("INSERT INTO items (value) VALUES ('also')"), grouped=False)
+    assert grouped.cancel() and single.cancel()
+    gate.set()
+    blocker.result()
+
+    after = writer.submit(lambda conn: conn.execute("INSERT INTO items (value) VALUES ('after')").lastrowid)
+    assert after.result(timeout=5) == 1
+    assert writer._thread is not None and writer._thread.is_alive()
+    writer.close()
+
+
+@pytest.mark.asyncio
+async def test_cancelled_async_waiter_leaves_writer_usable(tmp_path):
+    import asyncio
+
+    writer = make_writer(tmp_path)
+    gate = threading.Event()
+    writer.submit(lambda conn: gate.wait(), grouped=False)
+    pending = writer.submit(lambda conn: conn.execute("INSERT INTO items (value) VALUES ('x')"))
+    waiter = asyncio.wrap_future(pending)
+    waiter.cancel()
+    # Cancellation reaches the concurrent future from the loop's callbacks.
+    for _ in range(100):
+        if pending.cancelled():
+            break
+        await asyncio.sleep(0)
+    assert pending.cancelled()
+    gate.set()
+
+    row_id = await asyncio.wait_for(
+        asyncio.wrap_future(
+            writer.submit(lambda conn: conn.execute("INSERT INTO items (value) VALUES ('y')").lastrowid)
+        ),
+        timeout=5,
+    )
+    assert row_id == 1
+    writer.close()